@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+
+from .cls import INTERACTIVE_CMDS, EPoetryCmds
+from .func import color_enabled, get_info, info_dict
+from .model import Project, as_project
+from .sched import run_dag
+
+
+def scripts_data(project: Project | dict) -> list:
+    return [
+        {"name": name, "entry": entry, "cmd": "poetry run {}".format(name)}
+        for name, entry in as_project(project).scripts
+    ]
+
+
+def resolve_cmds(names: str, project: Project | dict) -> list:
+    """
+    maps a comma separated list of EPoetryCmds names (eg. 'lock,install,pytest')
+    or poetry script names to the commands to execute
+    """
+    scripts = {s["name"]: s["cmd"] for s in scripts_data(project)}
+    cmds = []
+    for name in [n.strip() for n in names.split(",") if n.strip()]:
+        member = EPoetryCmds.__members__.get(name.upper().replace("-", "_"))
+        if member is not None:
+            cmds.append(member.value)
+        elif name in scripts:
+            cmds.append(scripts[name])
+        else:
+            raise ValueError("unknown command or script '{}'".format(name))
+    return cmds
+
+
+def needs_terminal(names: str) -> list:
+    """
+    the names of a comma separated list which are interactive commands, they
+    need the terminal of the caller
+    """
+    return [
+        name.strip()
+        for name in names.split(",")
+        if EPoetryCmds.__members__.get(name.strip().upper().replace("-", "_"))
+        in INTERACTIVE_CMDS
+    ]
+
+
+def emit(data, out=None):
+    out = out or sys.stdout
+    out.write(json.dumps(data, default=str) + "\n")
+    out.flush()
+
+
+def info_json(
+    project: Project | dict, toml_dir: str, lock_index: dict | None = None
+) -> dict:
+    return dict(info_dict(project, lock_index), path=os.path.abspath(toml_dir))
+
+
+def scripts_json(project: Project | dict, toml_dir: str) -> dict:
+    return {"path": os.path.abspath(toml_dir), "scripts": scripts_data(project)}
+
+
+def info_text(project, toml_dir: str, as_json: bool = False) -> str:
+    """
+    output of `ppcheck info` for a CachedProject
+    """
+    if as_json:
+        return json.dumps(
+            info_json(project.model, toml_dir, project.lock_index()), default=str
+        )
+    return project.table(
+        "info" if color_enabled() else "info:plain",
+        lambda d: get_info(d, lock_index=project.lock_index()),
+    )
+
+
+def scripts_text(project: Project | dict, toml_dir: str, as_json: bool = False) -> str:
+    """
+    output of `ppcheck scripts`
+    """
+    if as_json:
+        return json.dumps(scripts_json(project, toml_dir), default=str)
+    return "\n".join(
+        "{}\t{}".format(script["cmd"], script["entry"])
+        for script in scripts_data(project)
+    )
+
+
+def run_batch(
+    cmds: list,
+    toml_dir: str,
+    workers: int | None = None,
+    timeout: float | None = None,
+    force: bool = False,
+) -> list:
+    """
+    runs cmds without prompts, the command output goes to stderr and every
+    result is emitted as one json line (ndjson) on stdout, path is absolute
+    """
+    path = os.path.abspath(toml_dir)
+    return run_dag(
+        cmds,
+        toml_dir,
+        workers,
+        out=sys.stderr,
+        on_result=lambda r: emit(dict(r, path=path)),
+        timeout=timeout,
+        force=force,
+    )
+
+
+def exit_code(results: list) -> int:
+    return 0 if all(r["returncode"] == 0 for r in results) else 1
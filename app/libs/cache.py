@@ -0,0 +1,340 @@
+import atexit
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+from contextlib import contextmanager
+
+CACHE_VERSION = 5
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+FINGERPRINT_FILES = ("pyproject.toml", "poetry.lock")
+
+
+def cache_dir(*parts) -> str:
+    """
+    user cache dir of ppcheck, can be overwritten with env PPCHECK_CACHE_DIR
+    """
+    base = os.environ.get("PPCHECK_CACHE_DIR")
+    if not base:
+        if platform.system() == "Windows":
+            base = os.path.join(
+                os.environ.get("LOCALAPPDATA", os.path.expanduser("~")),
+                "ppcheck",
+                "Cache",
+            )
+        elif sys.platform == "darwin":
+            base = os.path.expanduser("~/Library/Caches/ppcheck")
+        else:
+            base = os.path.join(
+                os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                "ppcheck",
+            )
+    return os.path.join(base, *parts)
+
+
+def data_dir(*parts) -> str:
+    """
+    user data dir of ppcheck, can be overwritten with env PPCHECK_DATA_DIR
+    """
+    base = os.environ.get("PPCHECK_DATA_DIR")
+    if not base:
+        if platform.system() == "Windows":
+            base = os.path.join(
+                os.environ.get("APPDATA", os.path.expanduser("~")), "ppcheck"
+            )
+        elif sys.platform == "darwin":
+            base = os.path.expanduser("~/Library/Application Support/ppcheck")
+        else:
+            base = os.path.join(
+                os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share")),
+                "ppcheck",
+            )
+    return os.path.join(base, *parts)
+
+
+def project_key(toml_dir: str) -> str:
+    """
+    file name safe key of a project, the hash of its absolute path
+    """
+    return hashlib.sha1(os.path.abspath(toml_dir).encode()).hexdigest()
+
+
+def ensure_parent(path: str) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w", encoding: str | None = None):
+    """
+    file of a temp file next to path, it replaces path once the block is done
+    without error; every call gets a temp file of its own, threads of one
+    process may write the same path
+    """
+    ensure_parent(path)
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with open(fd, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_json(path: str, data):
+    with atomic_open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str)
+
+
+def read_json(path: str, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_fingerprint(path: str, previous: dict | None = None) -> dict | None:
+    """
+    returns {mtime_ns, size, sha256} of path or None if it does not exist,
+    the content hash is only computed if mtime or size differ from previous
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if (
+        previous
+        and previous.get("mtime_ns") == st.st_mtime_ns
+        and previous.get("size") == st.st_size
+    ):
+        return previous
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": file_hash(path)}
+
+
+def project_fingerprint(toml_dir: str, previous: dict | None = None) -> dict:
+    previous = previous or {}
+    return {
+        name: file_fingerprint(os.path.join(toml_dir, name), previous.get(name))
+        for name in FINGERPRINT_FILES
+    }
+
+
+def same_fingerprint(a: dict, b: dict) -> bool:
+    for name in FINGERPRINT_FILES:
+        fa, fb = a.get(name), b.get(name)
+        if (fa is None) != (fb is None):
+            return False
+        if fa is not None and fa["sha256"] != fb["sha256"]:
+            return False
+    return True
+
+
+class CachedProject:
+    """
+    cache entry of a project, the model, lock index and tables added to it
+    are written once by flush(), at the latest when the process exits
+    """
+
+    def __init__(self, cache, toml_dir: str, entry: dict, model=None):
+        self._cache = cache
+        self.toml_dir = toml_dir
+        self.entry = entry
+        self._model = model
+        self._dirty = False
+
+    @property
+    def has_pyproject(self) -> bool:
+        """
+        False if pyproject.toml is missing or empty
+        """
+        return self.entry["has_pyproject"]
+
+    @property
+    def model(self):
+        """
+        the Project model of pyproject.toml, stored with the entry
+        """
+        if self._model is None:
+            from .model import Project
+
+            self._model = Project.from_dict(self.entry["model"])
+        return self._model
+
+    def lock_index(self) -> dict | None:
+        """
+        index of poetry.lock, parsed once per lock file fingerprint
+        """
+        if "lock_index" not in self.entry:
+            from .lock import load_lock_index
+
+            self.entry["lock_index"] = load_lock_index(self.toml_dir)
+            self.changed()
+        return self.entry["lock_index"]
+
+    def table(self, key: str, render):
+        """
+        returns the pre-rendered table `key`, render(model) is called and
+        the result stored only on a cache miss
+        """
+        tables = self.entry.setdefault("tables", {})
+        if key not in tables:
+            tables[key] = render(self.model)
+            self.changed()
+        return tables[key]
+
+    def changed(self):
+        if self._cache is not None and not self._dirty:
+            self._dirty = True
+            _unflushed.add(self)
+
+    def flush(self):
+        """
+        writes the entry if it changed since it was loaded or flushed
+        """
+        if self._dirty:
+            self._dirty = False
+            _unflushed.discard(self)
+            self._cache.store(self.toml_dir, self.entry)
+
+
+# changed entries not written yet
+_unflushed = set()
+
+
+@atexit.register
+def flush_all():
+    for project in list(_unflushed):
+        project.flush()
+
+
+def new_entry(toml_dir: str) -> tuple:
+    """
+    (entry, model) of a project parsed from pyproject.toml, the parsed dict
+    itself is not kept
+    """
+    from .model import Project
+
+    fingerprint = project_fingerprint(toml_dir)
+    pp_dict = parse_pyproject(os.path.join(toml_dir, "pyproject.toml"))
+    model = Project.from_pyproject(pp_dict)
+    entry = {
+        "fingerprint": fingerprint,
+        "has_pyproject": bool(pp_dict),
+        "model": model.to_dict(),
+        "tables": {},
+    }
+    return entry, model
+
+
+def evict_lru(
+    root: str,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+):
+    """
+    removes the least recently used (oldest mtime) .json files of root
+    beyond max_entries files or max_bytes in total
+    """
+    try:
+        files = [e for e in os.scandir(root) if e.name.endswith(".json")]
+    except OSError:
+        return
+    files.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    total = 0
+    for i, e in enumerate(files):
+        total += e.stat().st_size
+        if i >= max_entries or total > max_bytes:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+
+
+class ProjectCache:
+    """
+    per project cache of the parsed pyproject.toml and its rendered tables,
+    entries are invalidated by the fingerprint of pyproject.toml/poetry.lock
+    and evicted least recently used
+    """
+
+    def __init__(
+        self,
+        root: str | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.root = root or cache_dir("projects")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def entry_path(self, toml_dir: str) -> str:
+        return os.path.join(self.root, project_key(toml_dir) + ".json")
+
+    def get(self, toml_dir: str) -> dict | None:
+        path = self.entry_path(toml_dir)
+        entry = read_json(path)
+        if not entry or entry.get("version") != CACHE_VERSION:
+            return None
+        fingerprint = project_fingerprint(toml_dir, entry.get("fingerprint"))
+        if not same_fingerprint(fingerprint, entry.get("fingerprint", {})):
+            return None
+        if fingerprint != entry["fingerprint"]:
+            # touched but same content, remember the new stat values
+            entry["fingerprint"] = fingerprint
+            self.store(toml_dir, entry)
+        else:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return entry
+
+    def store(self, toml_dir: str, entry: dict):
+        entry["version"] = CACHE_VERSION
+        entry["path"] = os.path.abspath(toml_dir)
+        try:
+            write_json(self.entry_path(toml_dir), entry)
+            self.evict()
+        except OSError:
+            pass
+
+    def evict(self):
+        evict_lru(self.root, self.max_entries, self.max_bytes)
+
+    def load(self, toml_dir: str) -> CachedProject:
+        entry = self.get(toml_dir)
+        if entry is not None:
+            return CachedProject(self, toml_dir, entry)
+        project = CachedProject(self, toml_dir, *new_entry(toml_dir))
+        project.changed()
+        return project
+
+
+def parse_pyproject(toml_file: str) -> dict:
+    if not os.path.isfile(toml_file):
+        return {}
+    import tomli
+
+    with open(toml_file, "rb") as f:
+        return tomli.load(f)
+
+
+def load_project(toml_dir: str, use_cache: bool = True) -> CachedProject:
+    if use_cache:
+        return ProjectCache().load(toml_dir)
+    return CachedProject(None, toml_dir, *new_entry(toml_dir))
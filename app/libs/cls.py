@@ -12,3 +12,7 @@ class EPoetryCmds(Enum):
     INIT = "poetry init"
     BLACK = "poetry run black ."
     ISORT = "poetry run isort ."
+
+
+# commands that need the terminal for themselves
+INTERACTIVE_CMDS = (EPoetryCmds.INIT,)
@@ -0,0 +1,277 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from .cache import cache_dir, ensure_parent
+
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+CONNECT_TIMEOUT = 0.2
+DAEMON_CMDS = ("info", "scripts", "run")
+
+
+def socket_path() -> str:
+    """
+    unix socket of the daemon, can be overwritten with env PPCHECK_SOCKET
+    """
+    return os.environ.get("PPCHECK_SOCKET") or cache_dir("daemon.sock")
+
+
+def connect(path: str | None = None) -> socket.socket | None:
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(path or socket_path())
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def forward(cmd: str, toml_dir: str, **args) -> int | None:
+    """
+    sends the request to a running daemon and writes its output to
+    stdout/stderr, returns the exit code or None if no daemon is running
+    (or env PPCHECK_NO_DAEMON is set)
+    """
+    if os.environ.get("PPCHECK_NO_DAEMON"):
+        return None
+    sock = connect()
+    if sock is None:
+        return None
+    from .func import color_enabled, set_color
+
+    set_color()
+    request = {
+        "cmd": cmd,
+        "path": os.path.abspath(toml_dir),
+        "color": color_enabled(),
+        # commands run with the environment of the caller, not the daemon's
+        "env": dict(os.environ),
+        "args": args,
+    }
+    results = []
+    start = time.monotonic()
+    with sock, sock.makefile("rwb") as f:
+        f.write((json.dumps(request) + "\n").encode())
+        f.flush()
+        for line in f:
+            message = json.loads(line)
+            if "cmds" in message:
+                if not args.get("as_json"):
+                    from .func import print_title
+
+                    print_title(
+                        "Execute {}".format(
+                            ", ".join("'%s'" % c for c in message["cmds"])
+                        ),
+                        args["line_len"],
+                    )
+            elif "stream" in message:
+                out = sys.stdout if message["stream"] == "out" else sys.stderr
+                out.write(message["data"])
+                out.flush()
+            elif "result" in message:
+                if args.get("as_json"):
+                    sys.stdout.write(json.dumps(message["result"]) + "\n")
+                    sys.stdout.flush()
+                else:
+                    results.append(message["result"])
+            elif "exit" in message:
+                if results:
+                    from .sched import print_dag_report
+
+                    print_dag_report(
+                        results, time.monotonic() - start, args["line_len"]
+                    )
+                return message["exit"]
+    # the daemon went away mid request
+    return 1
+
+
+class _Writer:
+    def __init__(self, send, stream: str):
+        self._send = send
+        self._stream = stream
+
+    def write(self, data: str):
+        self._send({"stream": self._stream, "data": data})
+
+    def flush(self):
+        pass
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    keeps the parsed projects in memory, a project is loaded again as soon
+    as the fingerprint of its pyproject.toml/poetry.lock changed
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        super().__init__(path, DaemonHandler)
+        self.idle_timeout = idle_timeout
+        self.last_active = time.monotonic()
+        self.active = 0
+        self.projects = {}
+        self.lock = threading.Lock()
+        # info/scripts render with the global cout() colors, so they are
+        # serialized; run passes its color to run_dag instead
+        self.render_lock = threading.Lock()
+
+    def project(self, toml_dir: str, use_cache: bool = True):
+        from .cache import load_project, project_fingerprint, same_fingerprint
+
+        with self.lock:
+            fingerprint, project = self.projects.get(toml_dir, (None, None))
+            current = project_fingerprint(toml_dir, fingerprint)
+            if project is None or not same_fingerprint(current, fingerprint):
+                project = load_project(toml_dir, use_cache)
+            self.projects[toml_dir] = (current, project)
+            return project
+
+    def idle(self) -> bool:
+        with self.lock:
+            return (
+                self.active == 0
+                and time.monotonic() - self.last_active > self.idle_timeout
+            )
+
+    def begin(self):
+        with self.lock:
+            self.active += 1
+
+    def end(self):
+        with self.lock:
+            self.active -= 1
+            self.last_active = time.monotonic()
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def send(self, message: dict):
+        self.wfile.write((json.dumps(message, default=str) + "\n").encode())
+        self.wfile.flush()
+
+    def handle(self):
+        self.server.begin()
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+            self.send({"exit": self.dispatch(request)})
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.server.end()
+
+    def dispatch(self, request: dict) -> int:
+        from .func import set_color
+
+        cmd = request.get("cmd")
+        if cmd not in DAEMON_CMDS:
+            self.send({"stream": "err", "data": "Error: unknown request\n"})
+            return 2
+        toml_dir = request["path"]
+        args = request.get("args", {})
+        project = self.server.project(toml_dir, not args.get("no_cache"))
+        if not project.has_pyproject:
+            self.send(
+                {
+                    "stream": "err",
+                    "data": f"Error: No pyproject.toml available in {toml_dir}.\n",
+                }
+            )
+            return 1
+        if cmd == "run":
+            project.flush()
+            return self.run(
+                project, toml_dir, args, request.get("env"), request.get("color")
+            )
+        from .batch import info_text, scripts_text
+
+        with self.server.render_lock:
+            set_color(request.get("color", False))
+            if cmd == "info":
+                text = info_text(project, toml_dir, args.get("as_json"))
+            else:
+                text = scripts_text(project.model, toml_dir, args.get("as_json"))
+            project.flush()
+        self.send({"stream": "out", "data": text + "\n"})
+        return 0
+
+    def run(
+        self,
+        project,
+        toml_dir: str,
+        args: dict,
+        env: dict | None = None,
+        color: bool | None = None,
+    ) -> int:
+        from .batch import exit_code, needs_terminal, resolve_cmds
+        from .sched import run_dag
+
+        try:
+            cmds = resolve_cmds(args["cmds"], project.model)
+            for name in needs_terminal(args["cmds"]):
+                raise ValueError(
+                    "'{}' needs the terminal, run it without the daemon".format(name)
+                )
+        except ValueError as e:
+            self.send({"stream": "err", "data": "Error: {}\n".format(e)})
+            return 2
+        self.send({"cmds": cmds})
+        results = run_dag(
+            cmds,
+            toml_dir,
+            args.get("workers"),
+            out=_Writer(self.send, "err" if args.get("as_json") else "out"),
+            on_result=lambda r: self.send({"result": dict(r, path=toml_dir)}),
+            timeout=args.get("timeout"),
+            force=args.get("force", False),
+            env=env,
+            color=bool(color),
+        )
+        return exit_code(results)
+
+
+def serve(
+    path: str | None = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, ready=None
+):
+    """
+    runs the daemon until it was idle for idle_timeout seconds
+    """
+    path = path or socket_path()
+    sock = connect(path)
+    if sock is not None:
+        sock.close()
+        raise OSError("a ppcheck daemon is already listening on {}".format(path))
+    if os.path.exists(path):
+        # stale socket of a daemon which did not shut down
+        os.remove(path)
+    ensure_parent(path)
+    # keep the modules of the served commands loaded
+    import colored  # noqa: F401
+    import terminaltables  # noqa: F401
+    import tomli  # noqa: F401
+
+    from . import batch, sched  # noqa: F401
+
+    server = DaemonServer(path, idle_timeout)
+    server.timeout = min(1.0, idle_timeout)
+    os.chmod(path, 0o600)
+    if ready:
+        ready()
+    try:
+        while not server.idle():
+            server.handle_request()
+    finally:
+        server.server_close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
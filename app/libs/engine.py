@@ -0,0 +1,208 @@
+import asyncio
+import codecs
+import os
+import platform
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# commands containing one of these need a shell to be executed
+SHELL_CHARS = set("|&;<>()$`*?~%\n")
+KILL_GRACE_SECONDS = 5.0
+READ_CHUNK = 64 * 1024
+MAX_LINE_BYTES = 1024 * 1024
+# ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+MAXRSS_DIVISOR = 1024 if sys.platform == "darwin" else 1
+
+# number of running and ever started commands, to know whether the
+# RUSAGE_CHILDREN delta of a command contains other commands too
+_running = 0
+_started = 0
+
+
+def split_cmd(cmd: str) -> list | None:
+    """
+    returns the argv of cmd to launch it directly or None if cmd needs a shell
+    """
+    if not cmd.strip() or any(c in SHELL_CHARS for c in cmd):
+        return None
+    try:
+        argv = shlex.split(cmd, posix=platform.system() != "Windows")
+    except ValueError:
+        return None
+    exe = shutil.which(argv[0])
+    if exe is None:
+        # let the shell report "command not found" the usual way
+        return None
+    return [exe] + argv[1:]
+
+
+def cmd_text(cmd: str | list) -> str:
+    """
+    printable command line of an argv list
+    """
+    if isinstance(cmd, str):
+        return cmd
+    if platform.system() == "Windows":
+        return subprocess.list2cmdline(cmd)
+    return shlex.join(cmd)
+
+
+async def _spawn(cmd: str | list, cwd: str, piped: bool, env: dict | None = None):
+    kwargs = {"cwd": cwd, "env": env}
+    if piped:
+        kwargs.update(
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        if os.name == "posix":
+            # own process group, so a shell and its children can be terminated
+            kwargs["start_new_session"] = True
+    argv = cmd if isinstance(cmd, list) else split_cmd(cmd)
+    if argv is None:
+        return await asyncio.create_subprocess_shell(cmd or ":", **kwargs)
+    return await asyncio.create_subprocess_exec(*argv, **kwargs)
+
+
+async def _pump(stream, name: str, on_line):
+    # read in chunks rather than readline(), which fails on lines longer than
+    # the stream limit; such lines are passed on in pieces of MAX_LINE_BYTES
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = b""
+    while True:
+        chunk = await stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            on_line(name, decoder.decode(line + b"\n"))
+        if len(pending) >= MAX_LINE_BYTES:
+            on_line(name, decoder.decode(pending))
+            pending = b""
+    if pending:
+        on_line(name, decoder.decode(pending, final=True))
+
+
+def _signal(proc, sig, group: bool):
+    try:
+        if group:
+            os.killpg(proc.pid, sig)
+        else:
+            proc.send_signal(sig)
+    except ProcessLookupError:
+        pass
+
+
+async def _terminate(proc, group: bool):
+    if proc.returncode is not None:
+        return
+    _signal(proc, signal.SIGTERM, group)
+    try:
+        await asyncio.wait_for(proc.wait(), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        _signal(proc, getattr(signal, "SIGKILL", signal.SIGTERM), group)
+        await proc.wait()
+
+
+def print_line(name: str, line: str):
+    out = sys.stderr if name == "stderr" else sys.stdout
+    out.write(line)
+    out.flush()
+
+
+def children_rusage():
+    return resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+
+
+def rusage_delta(before, after, exclusive: bool) -> dict:
+    """
+    cpu times and context switches of the children finished between before
+    and after; RUSAGE_CHILDREN only keeps the largest rss of all children, so
+    peak_rss_kb is the highest peak of the session so far, the command's own
+    only if it is the first one or raised it
+    """
+    if before is None or after is None:
+        return {
+            "utime": None,
+            "stime": None,
+            "peak_rss_kb": None,
+            "nvcsw": None,
+            "nivcsw": None,
+            "exclusive": None,
+        }
+    return {
+        "utime": after.ru_utime - before.ru_utime,
+        "stime": after.ru_stime - before.ru_stime,
+        "nvcsw": after.ru_nvcsw - before.ru_nvcsw,
+        "nivcsw": after.ru_nivcsw - before.ru_nivcsw,
+        "peak_rss_kb": after.ru_maxrss // MAXRSS_DIVISOR,
+        "exclusive": exclusive,
+    }
+
+
+async def run_command(
+    cmd: str | list,
+    cwd: str,
+    timeout: float | None = None,
+    on_line=None,
+    interactive: bool = False,
+    env: dict | None = None,
+) -> dict:
+    """
+    runs cmd (a command line or an argv list) in cwd, stdout/stderr lines
+    are passed to on_line(name, line)
+    as soon as they arrive, interactive commands inherit the terminal;
+    on timeout or cancellation the process is terminated
+    """
+    global _running, _started
+    on_line = on_line or print_line
+    exclusive = _running == 0
+    started = _started = _started + 1
+    _running += 1
+    usage = children_rusage()
+    start = time.monotonic()
+    try:
+        proc = await _spawn(cmd, cwd, not interactive, env)
+    except BaseException:
+        _running -= 1
+        raise
+    waits = [proc.wait()]
+    if not interactive:
+        waits = [
+            _pump(proc.stdout, "stdout", on_line),
+            _pump(proc.stderr, "stderr", on_line),
+        ] + waits
+    group = not interactive and os.name == "posix"
+    timed_out = False
+    try:
+        await asyncio.wait_for(asyncio.gather(*waits), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        await _terminate(proc, group)
+    except BaseException:
+        # cancelled or failed while reading, never leave the process behind
+        await _terminate(proc, group)
+        raise
+    finally:
+        _running -= 1
+    duration = time.monotonic() - start
+    exclusive = exclusive and _started == started
+    return dict(
+        {
+            "cmd": cmd,
+            "returncode": proc.returncode,
+            "duration": duration,
+            "timed_out": timed_out,
+        },
+        **rusage_delta(usage, children_rusage(), exclusive),
+    )
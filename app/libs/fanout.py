@@ -0,0 +1,242 @@
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .cache import data_dir, ensure_parent, project_key
+from .func import cout, create_table
+
+CANCELLED = "cancelled"
+
+
+def log_dir() -> str:
+    """
+    new directory for the per project logs of one fan-out run, microseconds
+    keep runs started in the same second apart
+    """
+    now = time.time()
+    return data_dir(
+        "fanout",
+        "{}-{:06d}".format(
+            time.strftime("%Y%m%d-%H%M%S", time.localtime(now)),
+            int(now * 1e6) % 1000000,
+        ),
+    )
+
+
+def log_name(toml_dir: str, root: str = "") -> str:
+    """
+    readable log file name of a project, with a short hash of its absolute
+    path so projects of the same name do not share a log
+    """
+    rel = os.path.relpath(toml_dir, root) if root else os.path.abspath(toml_dir)
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", rel).strip("_.") or "project"
+    return "{}-{}.log".format(name, project_key(toml_dir)[:8])
+
+
+def check_cmds(names: str):
+    """
+    raises ValueError for commands which need the terminal, they can not run
+    in the background
+    """
+    from .batch import needs_terminal
+
+    for name in needs_terminal(names):
+        raise ValueError("'{}' is interactive, it can not fan out".format(name))
+
+
+def run_project(
+    toml_dir: str,
+    names: str,
+    log_path: str,
+    timeout: float | None = None,
+    force: bool = False,
+) -> dict:
+    """
+    runs the commands `names` in one project with their output in log_path,
+    executed in a worker process
+    """
+    from .batch import exit_code, resolve_cmds
+    from .cache import load_project
+    from .func import set_color
+    from .sched import run_dag
+
+    set_color(False)
+    start = time.monotonic()
+    summary = {
+        "path": toml_dir,
+        "name": None,
+        "returncode": None,
+        "duration": 0.0,
+        "results": [],
+        "log": log_path,
+        "error": None,
+    }
+    with open(ensure_parent(log_path), "w", encoding="utf-8", buffering=1) as log:
+        try:
+            project = load_project(toml_dir)
+            summary["name"] = project.model.name
+            cmds = resolve_cmds(names, project.model)
+            # worker processes exit without running atexit
+            project.flush()
+        except Exception as e:
+            log.write("Error: {}\n".format(e))
+            summary.update(
+                error=str(e), returncode=2, duration=time.monotonic() - start
+            )
+            return summary
+        log.write("# {} in {}\n".format(", ".join(cmds), toml_dir))
+        results = run_dag(cmds, toml_dir, 1, out=log, timeout=timeout, force=force)
+    summary.update(
+        results=[
+            {
+                "cmd": r["cmd"],
+                "returncode": r["returncode"],
+                "duration": r["duration"],
+                "timed_out": r["timed_out"],
+                "skipped": r.get("skipped", False),
+                "up_to_date": r.get("up_to_date", False),
+            }
+            for r in results
+        ],
+        returncode=exit_code(results),
+        duration=time.monotonic() - start,
+    )
+    return summary
+
+
+def _not_run(toml_dir: str, log_path: str, error: str = CANCELLED) -> dict:
+    return {
+        "path": toml_dir,
+        "name": None,
+        "returncode": None if error == CANCELLED else 2,
+        "duration": 0.0,
+        "results": [],
+        "log": log_path,
+        "error": error,
+    }
+
+
+def _error(e: Exception) -> str:
+    return "{}: {}".format(type(e).__name__, e)
+
+
+def failed(summary: dict) -> bool:
+    return summary["error"] != CANCELLED and summary["returncode"] != 0
+
+
+def progress_line(done: int, total: int, summary: dict, counts: dict) -> str:
+    state = (
+        cout("ok", fore_256="light_green")
+        if summary["returncode"] == 0
+        else cout("failed", fore_256="light_red")
+    )
+    return "[{}/{}] {} {} {:.2f}s  (ok {}, failed {}, left {})".format(
+        done,
+        total,
+        state,
+        summary["name"] or summary["path"],
+        summary["duration"],
+        counts["ok"],
+        counts["failed"],
+        counts["left"],
+    )
+
+
+def fan_out(
+    paths: list,
+    names: str,
+    workers: int | None = None,
+    fail_fast: bool = False,
+    logs: str | None = None,
+    timeout: float | None = None,
+    force: bool = False,
+    root: str = "",
+    out=None,
+) -> list:
+    """
+    runs the commands `names` in every project of paths in a pool of at most
+    `workers` processes, the output of each project goes to its own log file
+    in logs; progress is written to out as projects finish, with fail_fast
+    the projects not started yet are cancelled after the first failure;
+    returns the summaries in the order of paths
+    """
+    out = out or sys.stderr
+    logs = logs or log_dir()
+    workers = min(workers or os.cpu_count() or 1, max(1, len(paths)))
+    log_paths = [os.path.join(logs, log_name(p, root)) for p in paths]
+    summaries = [None] * len(paths)
+    counts = {"ok": 0, "failed": 0, "left": len(paths)}
+    queue = iter(range(len(paths)))
+    stop = False
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def submit():
+            # only `workers` projects are handed to the pool at a time, so the
+            # others can still be cancelled
+            i = next(queue, None)
+            if i is None:
+                return
+            args = (paths[i], names, log_paths[i], timeout, force)
+            try:
+                pending[pool.submit(run_project, *args)] = i
+            except BrokenProcessPool as e:
+                summaries[i] = _not_run(paths[i], log_paths[i], _error(e))
+
+        for _ in range(workers):
+            submit()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = pending.pop(future)
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    # the worker died or failed outside run_project's own
+                    # error handling, only this project is lost
+                    summary = _not_run(paths[i], log_paths[i], _error(e))
+                summaries[i] = summary
+                counts["left"] -= 1
+                counts["failed" if failed(summary) else "ok"] += 1
+                out.write(
+                    progress_line(
+                        counts["ok"] + counts["failed"], len(paths), summary, counts
+                    )
+                    + "\n"
+                )
+                out.flush()
+                stop = stop or (fail_fast and failed(summary))
+                if not stop:
+                    submit()
+    for i, summary in enumerate(summaries):
+        if summary is None:
+            summaries[i] = _not_run(paths[i], log_paths[i])
+    return summaries
+
+
+def fanout_table(summaries: list, root: str = "") -> str:
+    """
+    duration and exit code of every project, rendered with create_table
+    """
+    entries = {}
+    for s in summaries:
+        path = os.path.relpath(s["path"], root) if root else s["path"]
+        if s["error"] == CANCELLED:
+            state = cout(CANCELLED, fore_256="light_yellow")
+        elif s["error"]:
+            state = cout("error: {}".format(s["error"]), fore_256="light_red")
+        elif s["returncode"] == 0:
+            state = cout("ok", fore_256="light_green")
+        else:
+            failed_cmds = [
+                r["cmd"] for r in s["results"] if r["returncode"] not in (0, None)
+            ]
+            state = cout(
+                "exit {} ({})".format(s["returncode"], ", ".join(failed_cmds)),
+                fore_256="light_red",
+            )
+        entries[path] = "{} {:.2f}s".format(state, s["duration"])
+    return create_table(entries, " fan-out ", heading_border=False)
@@ -1,29 +1,132 @@
-import platform
-import subprocess
+import os
 import sys
-import time
+from itertools import zip_longest
 
-import inquirer
-import inquirer.themes
-import jmespath
-import pyperclip
-from colored import Fore, Style
-from terminaltables import AsciiTable
+from .model import Project, as_project, lookup
 
+# NOTE: third-party modules (inquirer, pyperclip, colored, terminaltables)
+# are imported inside the functions that need them, so `ppcheck` starts
+# without paying for imports it may never use.
+
+# above this number of rows get_info only summarizes the dependencies,
+# `ppcheck deps` pages through them
+LARGE_DEPS = 100
+# colored output of cout, see set_color()
+_color = True
+
+
+def run_exec(
+    cmd,
+    exec_path,
+    line_len: int = 72,
+    timeout: float | None = None,
+    force: bool = False,
+):
+    from .cls import INTERACTIVE_CMDS
+    from .profiling import note_run
+    from .runlog import save_run
+    from .stats import record_run
+    from .uptodate import UP_TO_DATE, after_run, is_up_to_date, skipped_result
 
-def run_exec(cmd, exec_path, line_len: int = 72):
-    start_time = time.time()
     print_title(f"Execute '{cmd}'", line_len)
-    execute_cmd(exec_path, cmd)
-    print_title(".. it tooks %s seconds" % (time.time() - start_time), line_len)
+    if not force and is_up_to_date(cmd, exec_path):
+        print(cout(f"'{cmd}' {UP_TO_DATE} (--force to run it)", fore_256="light_green"))
+        return skipped_result(cmd)
+    _interactive = cmd in [c.value for c in INTERACTIVE_CMDS]
+    result = execute_cmd(exec_path, cmd, timeout, _interactive)
+    output = result.pop("output", None)
+    record_run(result, exec_path)
+    note_run(result, exec_path)
+    result["log"] = save_run(result, exec_path, output)
+    after_run(result, exec_path)
+    _state = ""
+    if result["timed_out"]:
+        _state = ", timed out"
+    elif result["returncode"] != 0:
+        _state = ", exit code %s" % result["returncode"]
+    if result.get("via") == "venv":
+        _state += ", direct from venv"
+    print_title(".. it tooks %s seconds%s" % (result["duration"], _state), line_len)
+    return result
+
+
+def show_help(script: str, entry_point, toml_dir, line_len: int = 72, prefetcher=None):
+    """
+    prints `poetry run <script> --help` from the help cache, it is executed
+    (and cached) only on a miss
+    """
+    from .helpcache import cached_help, fetch_help
+
+    cmd = "poetry run {} --help".format(script)
+    # a cache hit does not wait for the prefetcher, it may still be busy with
+    # the other scripts
+    output = cached_help(toml_dir, script, entry_point)
+    if output is None and prefetcher:
+        output = prefetcher.get(script)
+    if output is None:
+        output = fetch_help(toml_dir, script, entry_point)
+    if output is None:
+        # failed, run it again visibly to show the error
+        return run_exec(cmd, toml_dir, line_len)
+    print_title(f"'{cmd}' (cached)", line_len)
+    print(output, end="")
+
+
+def run_scripts(
+    project: Project | dict, toml_dir, line_len: int = 72, prefetch_help: bool = False
+):
+    from .introspect import inspect_scripts
+
+    _scripts = dict(as_project(project).scripts)
+    prefetcher = None
+    if prefetch_help:
+        from .helpcache import HelpPrefetcher
+
+        prefetcher = HelpPrefetcher(toml_dir, _scripts)
+    try:
+        # read from the sources, nothing is run
+        infos = inspect_scripts(toml_dir, _scripts)
+        _run_scripts(_scripts, toml_dir, line_len, prefetcher, infos)
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+
+def script_choice(script: str, info: dict | None, line_len: int = 72):
+    """
+    (label, value) of a script in the menu, the label carries the first
+    docstring line or why the entry point is broken
+    """
+    from .introspect import summary
+
+    cmd = "poetry run {}".format(script)
+    text = summary(info)
+    if not text:
+        return cmd, cmd
+    return "{}  - {}".format(cmd, short(text, max(line_len - len(cmd) - 4, 8))), cmd
+
+
+def show_info(script: str, info: dict, line_len: int = 72):
+    """
+    prints docstring and options of a script read from its source
+    """
+    from .introspect import info_text
+
+    print_title(f"'{script}' (from source)", line_len)
+    text = info_text(info)
+    print(text if info["ok"] else cout(text, fore_256="light_red"), end="")
+
 
+def _run_scripts(
+    _scripts: dict, toml_dir, line_len: int, prefetcher, infos: dict | None = None
+):
+    import inquirer
+    import inquirer.themes
+    import pyperclip
 
-def run_scripts(pp_dict, toml_dir, line_len: int = 72):
+    infos = infos or {}
     _sub_continue = True
-    _choices = [
-        "poetry run {}".format(cmd)
-        for cmd in list(jmespath.search("tool.poetry.scripts", pp_dict).keys())
-    ]
+    _choices = [script_choice(cmd, infos.get(cmd), line_len) for cmd in _scripts]
     _choices.append("< back")
     while _sub_continue:
         questions = [
@@ -39,6 +142,7 @@ def run_scripts(pp_dict, toml_dir, line_len: int = 72):
             _sub_continue = False
         else:
             sub_choices = [
+                "> show info",
                 "> show --help",
                 "> copy command to clipboard",
                 "< back",
@@ -61,9 +165,15 @@ def run_scripts(pp_dict, toml_dir, line_len: int = 72):
                 for cmd in answers_sub["use"]:
                     if cmd == "> copy command to clipboard":
                         pyperclip.copy("{}".format(answers["script"]))
+                    elif cmd == "> show info":
+                        script = answers["script"][len("poetry run ") :]
+                        if script in infos:
+                            show_info(script, infos[script], line_len)
                     elif cmd == "> show --help":
-                        cmd = "{} {}".format(answers["script"], "--help")
-                        run_exec(cmd, toml_dir, line_len)
+                        script = answers["script"][len("poetry run ") :]
+                        show_help(
+                            script, _scripts[script], toml_dir, line_len, prefetcher
+                        )
                     elif cmd == "< exit":
                         _exit_end = True
                     elif cmd == "< back":
@@ -74,43 +184,101 @@ def run_scripts(pp_dict, toml_dir, line_len: int = 72):
                     _sub_continue = False
 
 
-def get_info(pp_dict: dict, short_info: bool = False):
-    _info = jmespath.search("tool.poetry", pp_dict)
+def get_info(
+    project: Project | dict, short_info: bool = False, lock_index: dict | None = None
+):
     info = {}
     if not short_info:
-        _packages = [list(dict(p).values())[0] for p in _info["packages"]]
-        _deps_list = deps(pp_dict, "dependencies", "green")
-        _deps_dev_list = deps(
-            pp_dict,
-            [
-                "dev-dependencies",
-                "dev.dependencies",
-                "group.dev.dependencies",
-                "group.test.dependencies",
-            ],
-            "blue",
-        )
-        _dependencies = tabs(_deps_list, _deps_dev_list)
+        _info = as_project(project, lock_index is not None)
+        _deps_list = deps(_info, "dependencies", "green", lock_index)
+        _deps_dev_list = deps(_info, _info.dev_sections(), "blue", lock_index)
+        if max(len(_deps_list), len(_deps_dev_list)) > LARGE_DEPS:
+            _dependencies = "{} deps, {} dev-deps\nsee: ppcheck deps --help".format(
+                len(_deps_list), len(_deps_dev_list)
+            )
+        else:
+            _dependencies = tabs(_deps_list, _deps_dev_list)
         info.update(
             {
-                "name": cout(_info["name"], fore_256="light_green"),
-                "version": cout(_info["version"], fore_256="light_blue"),
+                "name": cout(_info.name, fore_256="light_green"),
+                "version": cout(_info.version, fore_256="light_blue"),
                 "description": cout(
-                    short(_info["description"], 72), fore_256="light_magenta"
+                    short(_info.description or "", 72), fore_256="light_magenta"
                 ),
-                "authors": cout("\n".join(_info["authors"]), fore_256="blue"),
-                "packages": "\n".join(_packages),
+                "authors": cout("\n".join(_info.authors), fore_256="blue"),
+                "packages": "\n".join(_info.packages),
             }
         )
         if len(_dependencies) > 0:
             info.update({"dependencies": _dependencies})
+        _fresh = _lock_fresh(_info, lock_index)
+        if _fresh is not None:
+            info["poetry.lock"] = (
+                cout("up to date", fore_256="light_green")
+                if _fresh
+                else cout("stale, run 'poetry lock'", fore_256="light_red")
+            )
     if len(info) > 0:
         return create_table(info, "")
     else:
         return ""
 
 
-def cout(val, fore_256: str = "white"):
+def info_dict(project: Project | dict, lock_index: dict | None = None) -> dict:
+    """
+    the data of get_info as plain dict, eg. for json output
+    """
+    _info = as_project(project, lock_index is not None)
+    _locked = {}
+    if lock_index:
+        from .lock import locked_version
+
+        for _, name, _ in _info.iter_deps():
+            _version = locked_version(lock_index, name)
+            if _version:
+                _locked[name] = _version
+    return {
+        "name": _info.name,
+        "version": _info.version,
+        "description": _info.description,
+        "authors": list(_info.authors),
+        "packages": list(_info.packages),
+        "dependencies": dict(deps(_info, "dependencies", None)),
+        "dev_dependencies": dict(deps(_info, _info.dev_sections(), None)),
+        "locked": _locked,
+        "lock_fresh": _lock_fresh(_info, lock_index),
+    }
+
+
+def _lock_fresh(project: Project, lock_index: dict | None) -> bool | None:
+    if not lock_index:
+        return None
+    return project.lock_is_fresh(lock_index.get("content_hash"))
+
+
+def set_color(enabled: bool | None = None):
+    """
+    enables/disables colored output, None: only if stdout is a terminal and
+    NO_COLOR is not set
+    """
+    global _color
+    if enabled is None:
+        enabled = sys.stdout.isatty() and "NO_COLOR" not in os.environ
+    _color = enabled
+
+
+def color_enabled() -> bool:
+    return _color
+
+
+def cout(val, fore_256: str = "white", color: bool | None = None):
+    """
+    val in fore_256 if colors are enabled, color overrides set_color()
+    """
+    if not (_color if color is None else color):
+        return str(val)
+    from colored import Fore, Style
+
     return "{}{}{}".format(getattr(Fore, fore_256), str(val), getattr(Style, "reset"))
 
 
@@ -122,36 +290,58 @@ def print_title(title: str, width: int, str_repeat: str = "~"):
     print(cout(_lines, fore_256="grey_0"))
 
 
-def execute_cmd(exec_path: str, cmd: str):
-    _dest = "" if platform.system() == "Windows" else " > /dev/null"
-    _cmd = "pushd {}{} && ".format(exec_path, _dest) + cmd + " && popd{}".format(_dest)
-    subprocess.run(_cmd, shell=True, stderr=sys.stderr, stdout=sys.stdout)
+def execute_cmd(
+    exec_path: str, cmd: str, timeout: float | None = None, interactive: bool = False
+) -> dict:
+    """
+    runs cmd in exec_path with the asyncio engine, `poetry run` commands
+    directly from the project's venv if possible, returns
+    {cmd, returncode, duration, timed_out, via, exec, output}, output is the
+    RingBuffer of the streamed lines (None for interactive commands)
+    """
+    import asyncio
+
+    from .engine import cmd_text, print_line, run_command
+    from .runlog import RingBuffer
+    from .venv import direct_cmd
+
+    _exec, env, via = direct_cmd(cmd, exec_path)
+    output = None if interactive else RingBuffer()
+    result = asyncio.run(
+        run_command(
+            _exec,
+            exec_path,
+            timeout,
+            output.tee(print_line) if output else None,
+            interactive=interactive,
+            env=env,
+        )
+    )
+    return dict(result, cmd=cmd, via=via, exec=cmd_text(_exec), output=output)
+
+
+_MISSING = object()
 
 
 def attr_exists(obj_dct, should_type, *keys):
-    keys = list(keys)
-    while keys:
-        match = keys.pop(0)
-        if isinstance(obj_dct, dict):
-            if match in obj_dct:
-                if not keys:
-                    return (
-                        (True if isinstance(obj_dct[match], should_type) else False)
-                        if should_type
-                        else True
-                    )
-                else:
-                    obj_dct = obj_dct[match]
-            else:
-                return False
-        else:
-            return False
+    """
+    True if the keys exist in the nested dicts, with should_type only if
+    the value is an instance of it
+    """
+    if not keys:
+        return False
+    value = lookup(obj_dct, keys, _MISSING)
+    if value is _MISSING:
+        return False
+    return isinstance(value, should_type) if should_type else True
 
 
 def create_table(entries: dict, title: str = "", heading_border: bool = True):
     """
     check: https://robpol86.github.io/terminaltables/
     """
+    from terminaltables import AsciiTable
+
     tab = []
     for k, v in entries.items():
         tab.append([k, v])
@@ -168,18 +358,33 @@ def short(input_str: str, char_length: int, ends: str = "..."):
 
 
 def deps(
-    pp_dict: dict, sections: str | list = "dependencies", col: str = "white"
+    project: Project | dict,
+    sections: str | tuple | list = "dependencies",
+    col: str | None = "white",
+    lock_index: dict | None = None,
 ) -> list:
-    if isinstance(sections, str):
+    """
+    [[name, constraint], ..] of the sections, with a lock_index the locked
+    version is added to the constraint, eg. '^1.0 (1.2.3)'
+    """
+    if lock_index:
+        from .lock import locked_version
+
+    project = as_project(project)
+    if isinstance(sections, (str, tuple)):
         sections = [sections]
     _dl = []
     for section in sections:
-        use = ["tool", "poetry"]
-        use.extend(str(section).split("."))
-        if attr_exists(pp_dict, dict, *use):
-            _dlist = jmespath.search(".".join(use[:-1]), pp_dict)[use[-1:][0]]
-            for k, v in _dlist.items():
-                _dl.append([cout(k, fore_256=col), v])
+        _deps = project.section(section)
+        if not lock_index and not col:
+            _dl += [[k, v] for k, v in _deps]
+            continue
+        for k, v in _deps:
+            if lock_index:
+                _locked = locked_version(lock_index, k)
+                if _locked:
+                    v = "{} ({})".format(v, cout(_locked, fore_256="yellow"))
+            _dl.append([cout(k, fore_256=col) if col else k, v])
     return _dl
 
 
@@ -194,35 +399,17 @@ def tabs(_deps_list: list, _deps_dev_list: list, as_table: bool = True):
                 "",
             ]
         ]
-        if len(_deps_list) >= len(_deps_dev_list):
-            i = 0
-            for i in range(len(_deps_list)):
-                if 0 <= i < len(_deps_dev_list):
-                    tab.append(_deps_list[i] + _deps_dev_list[i])
-                else:
-                    tab.append(_deps_list[i] + ["", ""])
-                i += 1
-        else:
-            i = 0
-            for i in range(len(_deps_dev_list)):
-                if 0 <= i < len(_deps_list):
-                    tab.append(_deps_list[i] + _deps_dev_list[i])
-                else:
-                    tab.append(["", ""] + _deps_dev_list[i])
-                i += 1
+        tab.extend(
+            [*d, *dd]
+            for d, dd in zip_longest(_deps_list, _deps_dev_list, fillvalue=("", ""))
+        )
     elif len(_deps_list) > 0 and len(_deps_dev_list) < 1:
-        tab = [["deps", ""]]
-        i = 0
-        for i in range(len(_deps_list)):
-            tab.append(_deps_list[i])
-            i += 1
+        tab = [["deps", ""], *_deps_list]
     elif len(_deps_dev_list) > 0 and len(_deps_list) < 1:
-        tab = [["dev-deps", ""]]
-        i = 0
-        for i in range(len(_deps_dev_list)):
-            tab.append(_deps_dev_list[i])
-            i += 1
+        tab = [["dev-deps", ""], *_deps_dev_list]
     if as_table and len(tab) > 0:
+        from terminaltables import AsciiTable
+
         table = AsciiTable(table_data=tab)
         return table.table
     else:
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import cache_dir, evict_lru, file_fingerprint, read_json, write_json
+from .uptodate import venv_state
+
+HELP_TIMEOUT = 30
+DEFAULT_PREFETCH_WORKERS = 4
+# every lock or venv change orphans the entries of a project
+HELP_MAX_ENTRIES = 512
+HELP_MAX_BYTES = 16 * 1024 * 1024
+
+
+def help_key(toml_dir: str, script: str, entry_point: str) -> str:
+    """
+    cache key of the --help output of a script: its entry point plus the
+    fingerprint of poetry.lock and the state of the venv the script runs in
+    """
+    lock = file_fingerprint(os.path.join(toml_dir, "poetry.lock"))
+    parts = [
+        os.path.abspath(toml_dir),
+        script,
+        str(entry_point),
+        lock["sha256"] if lock else "",
+        json.dumps(venv_state(toml_dir), sort_keys=True),
+    ]
+    return hashlib.sha1("\0".join(parts).encode()).hexdigest()
+
+
+def help_path(key: str) -> str:
+    return cache_dir("help", key + ".json")
+
+
+def _read(key: str) -> dict | None:
+    path = help_path(key)
+    entry = read_json(path)
+    if entry:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return entry
+
+
+def cached_help(toml_dir: str, script: str, entry_point: str) -> str | None:
+    entry = _read(help_key(toml_dir, script, entry_point))
+    return entry["output"] if entry else None
+
+
+def fetch_help(
+    toml_dir: str, script: str, entry_point: str, timeout: float = HELP_TIMEOUT
+) -> str | None:
+    """
+    returns the output of `poetry run <script> --help` from the cache or runs
+    it, only successful runs are cached
+    """
+    key = help_key(toml_dir, script, entry_point)
+    entry = _read(key)
+    if entry:
+        return entry["output"]
+    from .engine import split_cmd
+    from .venv import direct_cmd
+
+    cmd, env, _ = direct_cmd("poetry run {} --help".format(script), toml_dir)
+    argv = cmd if isinstance(cmd, list) else split_cmd(cmd)
+    try:
+        proc = subprocess.run(
+            argv or cmd,
+            shell=argv is None,
+            cwd=toml_dir,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0:
+        return None
+    try:
+        write_json(help_path(key), {"script": script, "output": proc.stdout})
+        evict_lru(cache_dir("help"), HELP_MAX_ENTRIES, HELP_MAX_BYTES)
+    except OSError:
+        pass
+    return proc.stdout
+
+
+class HelpPrefetcher:
+    """
+    fetches the --help output of all scripts in a background thread pool,
+    get() waits only for the requested script
+    """
+
+    def __init__(
+        self, toml_dir: str, scripts: dict, workers: int = DEFAULT_PREFETCH_WORKERS
+    ):
+        self.toml_dir = toml_dir
+        self.scripts = scripts
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._futures = {
+            script: self._pool.submit(fetch_help, toml_dir, script, entry_point)
+            for script, entry_point in scripts.items()
+        }
+
+    def get(self, script: str) -> str | None:
+        future = self._futures.get(script)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
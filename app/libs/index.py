@@ -0,0 +1,291 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .cache import data_dir, ensure_parent, project_fingerprint, same_fingerprint
+from .lock import load_lock_index, locked_version, normalize
+from .model import Project
+from .prescan import parse_sections
+from .table import constraint, section_group
+from .workspace import POOL_THRESHOLD, find_projects
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    name TEXT,
+    version TEXT,
+    fingerprint TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deps (
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    package TEXT NOT NULL,
+    name TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    locked TEXT
+);
+CREATE INDEX IF NOT EXISTS deps_package ON deps(package);
+CREATE INDEX IF NOT EXISTS deps_project ON deps(project_id);
+"""
+_CLAUSE_RE = re.compile(r"^\s*(<=|>=|==|!=|<|>|~=)?\s*([0-9][0-9A-Za-z.*+!-]*)\s*$")
+
+
+def index_path() -> str:
+    return data_dir("index.sqlite")
+
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(ensure_parent(path or index_path()))
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def project_rows(toml_dir: str) -> dict:
+    """
+    {path, name, version, fingerprint, deps: [(package, name, group, spec,
+    locked)]} of one project
+    """
+    fingerprint = project_fingerprint(toml_dir)
+    project = Project.from_pyproject(
+        parse_sections(os.path.join(toml_dir, "pyproject.toml")), False
+    )
+    lock_index = load_lock_index(toml_dir)
+    rows = [
+        (
+            normalize(name),
+            name,
+            section_group(section),
+            constraint(value),
+            locked_version(lock_index, name),
+        )
+        for section, name, value in project.iter_deps()
+    ]
+    return {
+        "path": toml_dir,
+        "name": project.name,
+        "version": project.version,
+        "fingerprint": fingerprint,
+        "deps": rows,
+    }
+
+
+def _safe_project_rows(toml_dir: str) -> dict:
+    """
+    project_rows, a broken project has no deps and "failed" set, its old
+    rows go and it is not parsed again until it changes
+    """
+    try:
+        return project_rows(toml_dir)
+    except Exception:
+        pass
+    return {
+        "path": toml_dir,
+        "name": None,
+        "version": None,
+        "fingerprint": project_fingerprint(toml_dir),
+        "deps": [],
+        "failed": True,
+    }
+
+
+def update_index(
+    conn: sqlite3.Connection, root: str, workers: int | None = None
+) -> dict:
+    """
+    (re)indexes the projects below root whose pyproject.toml/poetry.lock
+    changed and drops the ones which are gone, returns the counts
+    """
+    root = os.path.abspath(os.path.expanduser(root))
+    paths = find_projects(root)
+    known = {
+        path: (pid, json.loads(fingerprint))
+        for pid, path, fingerprint in conn.execute(
+            "SELECT id, path, fingerprint FROM projects"
+        )
+    }
+    changed = []
+    for path in paths:
+        if path in known:
+            previous = known[path][1]
+            if same_fingerprint(project_fingerprint(path, previous), previous):
+                continue
+        changed.append(path)
+    if len(changed) < POOL_THRESHOLD or workers == 1:
+        indexed = [_safe_project_rows(p) for p in changed]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            indexed = list(pool.map(_safe_project_rows, changed))
+    current = set(paths)
+    removed = [
+        pid
+        for path, (pid, _) in known.items()
+        if (path == root or path.startswith(root + os.sep)) and path not in current
+    ]
+    now = time.time()
+    with conn:
+        conn.executemany("DELETE FROM projects WHERE id = ?", [(i,) for i in removed])
+        for project in indexed:
+            conn.execute("DELETE FROM projects WHERE path = ?", (project["path"],))
+            pid = conn.execute(
+                "INSERT INTO projects (path, name, version, fingerprint, indexed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    project["path"],
+                    project["name"],
+                    project["version"],
+                    json.dumps(project["fingerprint"]),
+                    now,
+                ),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO deps (project_id, package, name, grp, spec, locked)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(pid,) + row for row in project["deps"]],
+            )
+    return {
+        "projects": len(paths),
+        "indexed": sum(1 for p in indexed if not p.get("failed")),
+        "failed": sum(1 for p in indexed if p.get("failed")),
+        "removed": len(removed),
+    }
+
+
+def parse_version(version: str) -> tuple:
+    """
+    comparable release tuple, eg. '2.31.0' -> (2, 31, 0), suffixes like
+    'rc1' or '.post1' are ignored
+    """
+    release = []
+    for part in version.strip().lstrip("vV").split("+")[0].split("."):
+        m = re.match(r"\d+", part)
+        if not m:
+            break
+        release.append(int(m.group()))
+        if m.end() != len(part):
+            break
+    return tuple(release)
+
+
+def _pad(a: tuple, b: tuple) -> tuple:
+    n = max(len(a), len(b))
+    return a + (0,) * (n - len(a)), b + (0,) * (n - len(b))
+
+
+def parse_spec(spec: str) -> list:
+    """
+    [(op, version), ..] of the comma separated clauses of spec, raises
+    ValueError for an invalid clause
+    """
+    clauses = []
+    for clause in spec.split(","):
+        if not clause.strip():
+            continue
+        m = _CLAUSE_RE.match(clause)
+        if not m:
+            raise ValueError("invalid version clause '{}'".format(clause.strip()))
+        clauses.append((m.group(1) or "==", m.group(2)))
+    return clauses
+
+
+def version_matches(version: str | None, spec: str | list) -> bool:
+    """
+    True if version satisfies all comma separated clauses of spec, eg.
+    '>=2,<2.31'; '==2.*' matches on the prefix; spec may be parsed already
+    """
+    clauses = parse_spec(spec) if isinstance(spec, str) else spec
+    if not version:
+        return False
+    current = parse_version(version)
+    for op, target in clauses:
+        if target.endswith(".*") and op in ("==", "!="):
+            prefix = parse_version(target[:-2])
+            hit = _pad(current, prefix)[0][: len(prefix)] == prefix
+            if hit != (op == "=="):
+                return False
+            continue
+        other = parse_version(target)
+        a, b = _pad(current, other)
+        if op == "~=":
+            prefix = other[:-1] if len(other) > 1 else other
+            ok = a >= b and _pad(current, prefix)[0][: len(prefix)] == prefix
+        else:
+            ok = {
+                "<": a < b,
+                "<=": a <= b,
+                ">": a > b,
+                ">=": a >= b,
+                "==": a == b,
+                "!=": a != b,
+            }[op]
+        if not ok:
+            return False
+    return True
+
+
+def query(
+    conn: sqlite3.Connection,
+    package: str,
+    spec: str | None = None,
+    group: str | None = None,
+) -> list:
+    """
+    projects depending on package ('*' globs allowed), optionally only those
+    whose locked version matches spec and of one group; an invalid spec
+    raises ValueError
+    """
+    clauses = parse_spec(spec) if spec else None
+    sql = (
+        "SELECT p.path, p.name, d.grp, d.name, d.spec, d.locked"
+        " FROM deps d JOIN projects p ON p.id = d.project_id"
+    )
+    package = normalize(package)
+    if "*" in package or "?" in package:
+        sql += " WHERE d.package GLOB ?"
+    else:
+        sql += " WHERE d.package = ?"
+    params = [package]
+    if group:
+        sql += " AND d.grp = ?"
+        params.append(group)
+    sql += " ORDER BY p.path, d.package"
+    results = [
+        {
+            "path": path,
+            "project": name,
+            "group": grp,
+            "package": dep,
+            "constraint": dep_spec,
+            "locked": locked,
+        }
+        for path, name, grp, dep, dep_spec, locked in conn.execute(sql, params)
+    ]
+    if clauses is not None:
+        results = [r for r in results if version_matches(r["locked"], clauses)]
+    return results
+
+
+def query_table(results: list) -> str:
+    from terminaltables import AsciiTable
+
+    from .func import cout
+
+    tab = [["project", "group", "package", "constraint", "locked", "path"]]
+    for r in results:
+        tab.append(
+            [
+                cout(r["project"] or "?", fore_256="light_green"),
+                r["group"],
+                r["package"],
+                r["constraint"],
+                cout(r["locked"] or "", fore_256="light_blue"),
+                r["path"],
+            ]
+        )
+    return AsciiTable(table_data=tab).table
@@ -0,0 +1,334 @@
+import ast
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from importlib.machinery import PathFinder
+
+DEFAULT_WORKERS = 4
+# re-exports followed from one module to the next, e.g. `from .cli import main`
+MAX_HOPS = 3
+CLICK_PARAMS = {
+    "option",
+    "argument",
+    "password_option",
+    "confirmation_option",
+    "version_option",
+    "help_option",
+}
+CLICK_COMMANDS = {"command", "group"}
+
+
+def search_path(toml_dir: str) -> list:
+    """
+    directories entry point modules are looked up in: the project dir, its
+    src/ layout, the site-packages of the project's venv and the directories
+    listed in their .pth files (editable installs); only an already known
+    venv is used, poetry is not asked before the menu shows up
+    """
+    paths = [toml_dir]
+    src = os.path.join(toml_dir, "src")
+    if os.path.isdir(src):
+        paths.append(src)
+    try:
+        from .venv import cached_venv
+
+        venv = cached_venv(toml_dir)
+    except Exception:
+        venv = None
+    if not venv:
+        return paths
+    site_dirs = glob.glob(os.path.join(venv, "lib", "python*", "site-packages"))
+    site_dirs += glob.glob(os.path.join(venv, "Lib", "site-packages"))
+    for site in site_dirs:
+        paths.append(site)
+        for pth in glob.glob(os.path.join(site, "*.pth")):
+            try:
+                with open(pth, encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                line = line.strip()
+                if (
+                    line
+                    and not line.startswith(("#", "import"))
+                    and os.path.isdir(line)
+                ):
+                    paths.append(line)
+    return paths
+
+
+def find_source(module: str, paths: list):
+    """
+    spec of a dotted module found on paths with PathFinder, one part at a time,
+    so neither the module nor its parent packages are imported
+    """
+    spec = None
+    for part in module.split("."):
+        if spec is not None:
+            paths = spec.submodule_search_locations
+            if paths is None:
+                return None
+        spec = PathFinder.find_spec(part, list(paths))
+        if spec is None:
+            return None
+    return spec
+
+
+def split_entry_point(entry_point) -> tuple:
+    """
+    (module, attribute) of `module:function`, also of the table form with a
+    `callable` key; raises ValueError for anything else
+    """
+    if isinstance(entry_point, dict):
+        entry_point = entry_point.get("callable") or entry_point.get("reference")
+    if not isinstance(entry_point, str):
+        raise ValueError("not a module:function entry point")
+    reference = entry_point.split("[", 1)[0].strip()
+    module, sep, attr = reference.partition(":")
+    module, attr = module.strip(), attr.strip()
+    names = module.split(".") + attr.split(".")
+    if not sep or not all(n.isidentifier() for n in names):
+        raise ValueError("'{}' is not a module:function entry point".format(reference))
+    return module, attr
+
+
+@lru_cache(maxsize=64)
+def _parse(path: str, mtime_ns: int) -> ast.Module:
+    with open(path, "rb") as f:
+        return ast.parse(f.read(), filename=path)
+
+
+def parse_source(path: str) -> ast.Module:
+    return _parse(path, os.stat(path).st_mtime_ns)
+
+
+def _statements(body: list):
+    # module level statements, also the ones inside if/try blocks
+    for node in body:
+        yield node
+        if isinstance(node, ast.If):
+            yield from _statements(node.body)
+            yield from _statements(node.orelse)
+        elif isinstance(node, ast.Try):
+            for block in (node.body, node.orelse, node.finalbody):
+                yield from _statements(block)
+            for handler in node.handlers:
+                yield from _statements(handler.body)
+
+
+def _defines(node, name: str) -> bool:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return node.name == name
+    if isinstance(node, ast.Assign):
+        return any(isinstance(t, ast.Name) and t.id == name for t in node.targets)
+    if isinstance(node, ast.AnnAssign):
+        return isinstance(node.target, ast.Name) and node.target.id == name
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return any((a.asname or a.name.split(".")[0]) == name for a in node.names)
+    return False
+
+
+def _definition(tree: ast.Module, name: str):
+    # the last definition wins, like at runtime
+    found = None
+    for node in _statements(tree.body):
+        if _defines(node, name):
+            found = node
+    return found
+
+
+def _imported_from(node: ast.ImportFrom, name: str, module: str, is_package: bool):
+    """
+    (module, name) a `from x import name` refers to, relative imports are
+    resolved against the importing module
+    """
+    alias = next(a for a in node.names if (a.asname or a.name) == name)
+    base = node.module or ""
+    if node.level:
+        parts = module.split(".")
+        if not is_package:
+            parts = parts[:-1]
+        parts = parts[: len(parts) - (node.level - 1)] if node.level > 1 else parts
+        base = ".".join(p for p in parts + [base] if p)
+    return base, alias.name
+
+
+def _call_name(node) -> str:
+    func = node.func if isinstance(node, ast.Call) else node
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return ""
+
+
+def _literal(node):
+    return node.value if isinstance(node, ast.Constant) else None
+
+
+def _keyword(call: ast.Call, name: str):
+    for kw in call.keywords:
+        if kw.arg == name:
+            return _literal(kw.value)
+    return None
+
+
+def _param(call: ast.Call, kind: str) -> tuple:
+    decls = [a for a in (_literal(arg) for arg in call.args) if isinstance(a, str)]
+    if kind == "argument":
+        decls = [d.upper() for d in decls]
+    else:
+        # a click option may also name its python parameter, other positional
+        # literals are values, e.g. the version of version_option("1.0")
+        decls = [d for d in decls if d.startswith("-")]
+        if kind != "option" and not decls:
+            decls = ["--" + kind.replace("_option", "")]
+    return ", ".join(decls), _keyword(call, "help") or ""
+
+
+def click_params(node) -> tuple:
+    """
+    (options, command help) of the click decorators of a function
+    """
+    options, command_help = [], None
+    for dec in getattr(node, "decorator_list", ()):
+        if not isinstance(dec, ast.Call):
+            continue
+        name = _call_name(dec)
+        if name in CLICK_PARAMS:
+            options.append(_param(dec, name))
+        elif name in CLICK_COMMANDS:
+            command_help = _keyword(dec, "help") or command_help
+    return options, command_help
+
+
+def argparse_params(node) -> list:
+    options = []
+    for call in ast.walk(node):
+        if isinstance(call, ast.Call) and _call_name(call) == "add_argument":
+            options.append(_param(call, "option"))
+    return options
+
+
+def _inspect(module: str, attr: str, paths: list, hops: int = 0) -> dict:
+    spec = find_source(module, paths)
+    if spec is None:
+        raise LookupError("module '{}' not found".format(module))
+    origin = spec.origin
+    if not origin or not origin.endswith(".py"):
+        # extension module or namespace package, there is no source to read
+        return {"origin": origin, "doc": None, "framework": None, "options": []}
+    try:
+        tree = parse_source(origin)
+    except (OSError, ValueError) as e:
+        raise LookupError("can not read {}: {}".format(origin, e))
+    except SyntaxError as e:
+        raise LookupError("syntax error in {} line {}".format(origin, e.lineno))
+    name, _, rest = attr.partition(".")
+    node = _definition(tree, name)
+    if node is None:
+        raise LookupError("'{}' is not defined in {}".format(name, origin))
+    if isinstance(node, ast.ImportFrom) and hops < MAX_HOPS:
+        is_package = os.path.basename(origin) == "__init__.py"
+        target, target_name = _imported_from(node, name, module, is_package)
+        try:
+            return _inspect(
+                target, ".".join(filter(None, [target_name, rest])), paths, hops + 1
+            )
+        except LookupError:
+            # the name exists, the package it comes from is just not on paths
+            return {"origin": origin, "doc": None, "framework": None, "options": []}
+    if isinstance(node, ast.Assign) and isinstance(node.value, ast.Name):
+        alias = _definition(tree, node.value.id)
+        node = alias if alias is not None and alias is not node else node
+    if isinstance(node, ast.ClassDef) and rest:
+        method = next(
+            (
+                n
+                for n in node.body
+                if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and n.name == rest
+            ),
+            None,
+        )
+        if method is None:
+            raise LookupError("'{}' is not defined in {}".format(attr, origin))
+        node = method
+    info = {"origin": origin, "doc": None, "framework": None, "options": []}
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return info
+    options, command_help = click_params(node)
+    if (
+        options
+        or command_help is not None
+        or any(_call_name(d) in CLICK_COMMANDS for d in node.decorator_list)
+    ):
+        info["framework"] = "click"
+    else:
+        # the parser is often built in a helper next to the entry point
+        options = argparse_params(node) or argparse_params(tree)
+        info["framework"] = "argparse" if options else None
+    info["options"] = options
+    info["doc"] = ast.get_docstring(node) or command_help or ast.get_docstring(tree)
+    return info
+
+
+def inspect_entry(entry_point, paths: list) -> dict:
+    """
+    docstring and options of a script read from the source of its entry
+    point, nothing is imported or run; "error" says why it is broken
+    """
+    info = {"ok": False, "error": None, "origin": None, "doc": None}
+    info.update(framework=None, options=[])
+    try:
+        module, attr = split_entry_point(entry_point)
+        info.update(_inspect(module, attr, paths))
+    except (ValueError, LookupError) as e:
+        info["error"] = str(e)
+        return info
+    info["ok"] = True
+    return info
+
+
+def inspect_scripts(
+    toml_dir: str, scripts: dict, workers: int = DEFAULT_WORKERS
+) -> dict:
+    """
+    inspect_entry of all scripts in a thread pool, {script: info}
+    """
+    if not scripts:
+        return {}
+    paths = search_path(toml_dir)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        infos = pool.map(lambda e: inspect_entry(e, paths), scripts.values())
+        return dict(zip(scripts, infos))
+
+
+def summary(info: dict | None) -> str:
+    """
+    one line for the script menu: the first docstring line or why it is broken
+    """
+    if not info:
+        return ""
+    if not info["ok"]:
+        return "broken: {}".format(info["error"])
+    return (info["doc"] or "").strip().split("\n", 1)[0]
+
+
+def info_text(info: dict) -> str:
+    """
+    docstring and options of a script, like a short --help
+    """
+    if not info["ok"]:
+        return "broken entry point: {}\n".format(info["error"])
+    lines = [info["doc"] or "(no docstring)", ""]
+    if info["options"]:
+        width = max(len(flags) for flags, _ in info["options"])
+        lines.append("{} options:".format(info["framework"]))
+        for flags, text in info["options"]:
+            lines.append("  {}  {}".format(flags.ljust(width), text).rstrip())
+        lines.append("")
+    lines.append("source: {}".format(info["origin"]))
+    return "\n".join(lines) + "\n"
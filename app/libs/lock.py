@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import re
+
+LOCK_FILE = "poetry.lock"
+_KEY_RE = re.compile(r'^\s*("(?:[^"\\]|\\.)*"|\'[^\']*\'|[A-Za-z0-9_.-]+)\s*=\s*(.*)$')
+_NORMALIZE_RE = re.compile(r"[-_.]+")
+# package keys kept in the index, everything else (files, description, ...)
+# is skipped without being parsed
+_PACKAGE_KEYS = ("name", "version", "category", "groups", "optional")
+_CONTENT_HASH_RE = re.compile(r'^content-hash\s*=\s*"([0-9a-f]+)"')
+# tool.poetry keys poetry hashes into metadata.content-hash, the legacy keys
+# are hashed even if they are missing
+_LEGACY_HASH_KEYS = ("dependencies", "source", "extras", "dev-dependencies")
+_HASH_KEYS = _LEGACY_HASH_KEYS + ("group",)
+# [project] keys hashed by poetry 2
+_PROJECT_HASH_KEYS = ("requires-python", "dependencies", "optional-dependencies")
+
+
+def normalize(name: str) -> str:
+    """
+    PEP 503 normalized package name
+    """
+    return _NORMALIZE_RE.sub("-", name).lower()
+
+
+def _value(raw: str):
+    import tomli
+
+    return tomli.loads("v = " + raw)["v"]
+
+
+def _open_brackets(raw: str) -> int:
+    """
+    bracket depth at the end of a toml value line, strings are ignored
+    """
+    depth = 0
+    quote = None
+    escaped = False
+    for c in raw:
+        if quote:
+            if escaped:
+                escaped = False
+            elif c == "\\" and quote == '"':
+                escaped = True
+            elif c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c == "#":
+            break
+        elif c in "[{":
+            depth += 1
+        elif c in "]}":
+            depth -= 1
+    return depth
+
+
+def iter_lock(lines):
+    """
+    streams (table, key, raw_value) over the lines of a poetry.lock, values
+    spanning several lines (eg. files = [...]) are joined only if they belong
+    to a key that is parsed later, package tables start with ('[[package]]',
+    None, None)
+    """
+    table = None
+    pending = None
+    depth = 0
+    for line in lines:
+        if pending is not None or depth > 0:
+            if pending is not None:
+                pending[2] += line.strip()
+            depth += _open_brackets(line)
+            if depth <= 0 and pending is not None:
+                yield tuple(pending)
+                pending = None
+            continue
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("["):
+            table = stripped.split("#")[0].strip()
+            if table == "[[package]]":
+                yield table, None, None
+            continue
+        m = _KEY_RE.match(line)
+        if not m:
+            continue
+        key, raw = m.group(1).strip("\"'"), m.group(2).strip()
+        depth = _open_brackets(raw)
+        wanted = table == "[package.dependencies]" or (
+            table in ("[[package]]", "[metadata]") and key in _PACKAGE_KEYS
+        )
+        if depth > 0:
+            # keep only what is needed, skip eg. files = [...] line by line
+            pending = [table, key, raw] if wanted else None
+            continue
+        yield table, key, raw
+
+
+def parse_lock(path: str) -> dict:
+    """
+    memory-lean index of a poetry.lock:
+    {"packages": {normalized name: {name, version, groups, optional,
+    dependencies}}, "content_hash": .., "lock_version": ..}
+    """
+    packages = {}
+    metadata = {}
+    current = None
+    with open(path, "r", encoding="utf-8") as f:
+        for table, key, raw in iter_lock(f):
+            if key is None:
+                current = {
+                    "name": None,
+                    "version": None,
+                    "groups": [],
+                    "optional": False,
+                    "dependencies": [],
+                }
+                continue
+            if table == "[metadata]":
+                if key in ("content-hash", "lock-version", "python-versions"):
+                    metadata[key] = _value(raw)
+            elif current is None:
+                continue
+            elif table == "[[package]]" and key in _PACKAGE_KEYS:
+                value = _value(raw)
+                if key == "name":
+                    current["name"] = value
+                    packages[normalize(value)] = current
+                elif key == "category":
+                    current["groups"] = [value]
+                elif key == "groups":
+                    current["groups"] = list(value)
+                else:
+                    current[key] = value
+            elif table == "[package.dependencies]":
+                current["dependencies"].append(normalize(key))
+    return {
+        "packages": packages,
+        "content_hash": metadata.get("content-hash"),
+        "lock_version": metadata.get("lock-version"),
+        "python_versions": metadata.get("python-versions"),
+    }
+
+
+def load_lock_index(toml_dir: str) -> dict | None:
+    path = os.path.join(toml_dir, LOCK_FILE)
+    if not os.path.isfile(path):
+        return None
+    return parse_lock(path)
+
+
+def locked_version(lock_index: dict | None, name: str) -> str | None:
+    if not lock_index:
+        return None
+    package = lock_index["packages"].get(normalize(name))
+    return package["version"] if package else None
+
+
+def content_hash(pp_dict: dict) -> str:
+    """
+    the relevant-content hash poetry stores as metadata.content-hash
+    """
+    project = pp_dict.get("project", {})
+    relevant_project = {
+        key: project[key] for key in _PROJECT_HASH_KEYS if project.get(key) is not None
+    }
+    poetry = pp_dict.get("tool", {}).get("poetry", {})
+    relevant = {}
+    for key in _HASH_KEYS:
+        data = poetry.get(key)
+        if data is None and (key not in _LEGACY_HASH_KEYS or relevant_project):
+            continue
+        relevant[key] = data
+    if relevant_project:
+        relevant = {"project": relevant_project, "tool": {"poetry": relevant}}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()
+
+
+def read_content_hash(path: str) -> str | None:
+    """
+    metadata.content-hash of a poetry.lock without parsing the rest
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                m = _CONTENT_HASH_RE.match(line)
+                if m:
+                    return m.group(1)
+    except OSError:
+        pass
+    return None
+
+
+def lock_is_fresh(pp_dict: dict, locked_hash: str | None) -> bool | None:
+    """
+    True if poetry.lock matches pyproject.toml, None without a lock hash
+    """
+    if not locked_hash:
+        return None
+    return content_hash(pp_dict) == locked_hash
@@ -0,0 +1,190 @@
+# legacy dev sections, groups are discovered from tool.poetry.group.*
+DEV_SECTIONS = [
+    "dev-dependencies",
+    "dev.dependencies",
+]
+
+
+def _keys(section) -> tuple:
+    return tuple(section.split(".")) if isinstance(section, str) else section
+
+
+def lookup(obj, section, default=None):
+    """
+    value of a dotted path ('tool.poetry.scripts' or a tuple of keys) in
+    nested dicts, default if a key is missing
+    """
+    for key in _keys(section):
+        if not isinstance(obj, dict) or key not in obj:
+            return default
+        obj = obj[key]
+    return obj
+
+
+class Project:
+    """
+    normalized view of a pyproject.toml, parsed once by from_pyproject():
+    metadata, packages, scripts ((name, entry), ..) and the dependency
+    sections ((section, ((name, spec), ..)), ..) as tuples, so it can be
+    shared between threads; to_dict()/from_dict() for the json cache
+    """
+
+    __slots__ = (
+        "is_poetry",
+        "name",
+        "version",
+        "description",
+        "authors",
+        "packages",
+        "scripts",
+        "groups",
+        "sections",
+        "content_hash",
+    )
+
+    def __init__(
+        self,
+        is_poetry: bool = False,
+        name=None,
+        version=None,
+        description=None,
+        authors: tuple = (),
+        packages: tuple = (),
+        scripts: tuple = (),
+        groups: tuple = (),
+        sections: tuple = (),
+        content_hash: str | None = None,
+    ):
+        self.is_poetry = is_poetry
+        self.name = name
+        self.version = version
+        self.description = description
+        self.authors = authors
+        self.packages = packages
+        self.scripts = scripts
+        self.groups = groups
+        self.sections = sections
+        self.content_hash = content_hash
+
+    @classmethod
+    def from_pyproject(cls, pp_dict: dict, hash_content: bool = True) -> "Project":
+        """
+        hash_content: compute the poetry.lock content-hash of pp_dict
+        """
+        content_hash = None
+        if hash_content:
+            from .lock import content_hash as _content_hash
+
+            content_hash = _content_hash(pp_dict)
+        poetry = lookup(pp_dict, ("tool", "poetry"))
+        if not isinstance(poetry, dict):
+            return cls(content_hash=content_hash)
+        groups = poetry.get("group")
+        groups = tuple(groups) if isinstance(groups, dict) else ()
+        sections = []
+        for section in (
+            ["dependencies"]
+            + DEV_SECTIONS
+            + [("group", name, "dependencies") for name in groups]
+        ):
+            _deps = lookup(poetry, section)
+            if isinstance(_deps, dict):
+                sections.append((section, tuple(_deps.items())))
+        scripts = poetry.get("scripts")
+        return cls(
+            is_poetry=True,
+            name=poetry.get("name"),
+            version=poetry.get("version"),
+            description=poetry.get("description"),
+            authors=tuple(poetry.get("authors", ())),
+            packages=tuple(
+                list(dict(p).values())[0] for p in poetry.get("packages", ()) if p
+            ),
+            scripts=tuple(scripts.items()) if isinstance(scripts, dict) else (),
+            groups=groups,
+            sections=tuple(sections),
+            content_hash=content_hash,
+        )
+
+    def dev_sections(self) -> list:
+        """
+        legacy dev sections plus the dependencies of every tool.poetry.group.*
+        """
+        return DEV_SECTIONS + [("group", name, "dependencies") for name in self.groups]
+
+    def section(self, section) -> tuple:
+        """
+        ((name, spec), ..) of a section, () if it does not exist
+        """
+        keys = _keys(section)
+        for key, _deps in self.sections:
+            if _keys(key) == keys:
+                return _deps
+        return ()
+
+    def iter_deps(self, sections=None):
+        """
+        yields (section, name, spec) of the sections, all if None
+        """
+        if sections is None:
+            sections = [key for key, _ in self.sections]
+        elif isinstance(sections, (str, tuple)):
+            sections = [sections]
+        for section in sections:
+            for name, spec in self.section(section):
+                yield section, name, spec
+
+    def lock_is_fresh(self, locked_hash: str | None) -> bool | None:
+        """
+        True if poetry.lock matches, None without a lock or content hash
+        """
+        if not locked_hash or self.content_hash is None:
+            return None
+        return self.content_hash == locked_hash
+
+    def to_dict(self) -> dict:
+        return {
+            "is_poetry": self.is_poetry,
+            "name": self.name,
+            "version": self.version,
+            "description": self.description,
+            "authors": list(self.authors),
+            "packages": list(self.packages),
+            "scripts": [list(s) for s in self.scripts],
+            "groups": list(self.groups),
+            "sections": [
+                [list(key) if isinstance(key, tuple) else key, [list(d) for d in _deps]]
+                for key, _deps in self.sections
+            ],
+            "content_hash": self.content_hash,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Project":
+        return cls(
+            is_poetry=data["is_poetry"],
+            name=data["name"],
+            version=data["version"],
+            description=data["description"],
+            authors=tuple(data["authors"]),
+            packages=tuple(data["packages"]),
+            scripts=tuple(tuple(s) for s in data["scripts"]),
+            groups=tuple(data["groups"]),
+            sections=tuple(
+                (
+                    tuple(key) if isinstance(key, list) else key,
+                    tuple(tuple(d) for d in _deps),
+                )
+                for key, _deps in data["sections"]
+            ),
+            content_hash=data["content_hash"],
+        )
+
+
+def as_project(obj, hash_content: bool = False) -> Project:
+    """
+    obj if it is a Project already, otherwise the Project of a pp_dict
+    """
+    if isinstance(obj, Project):
+        return obj
+    return Project.from_pyproject(obj or {}, hash_content)
@@ -0,0 +1,73 @@
+import mmap
+import os
+import re
+
+# a table header alone on its line, eg. [tool.poetry] or [[tool.poetry.source]]
+_HEADER_RE = re.compile(
+    rb"^[ \t]*\[\[?[ \t]*([^\[\]\r\n]+?)[ \t]*\]\]?[ \t]*(?:#[^\n]*)?\r?$", re.M
+)
+_BARE_KEY_RE = re.compile(rb"^[A-Za-z0-9_-]+$")
+# headers are not recognized inside multi-line strings
+_MULTILINE_STRINGS = (b'"""', b"'''")
+
+
+def wanted(keys: tuple) -> bool:
+    """
+    the tables a project summary needs: [tool] (it may hold dotted
+    poetry.* keys), [tool.poetry*] and [project*] for the content-hash
+    """
+    return (
+        keys == (b"tool",) or keys[:2] == (b"tool", b"poetry") or keys[0] == b"project"
+    )
+
+
+def scan_sections(data) -> bytes | None:
+    """
+    the toml text of the root keys and the wanted() tables of data, None if
+    the layout is ambiguous (multi-line strings, quoted table names)
+    """
+    if any(data.find(s) != -1 for s in _MULTILINE_STRINGS):
+        return None
+    headers = []
+    for m in _HEADER_RE.finditer(data):
+        keys = tuple(k.strip() for k in m.group(1).split(b"."))
+        if not all(_BARE_KEY_RE.match(k) for k in keys):
+            return None
+        headers.append((m.start(), keys))
+    # everything before the first header are root keys, eg. tool.poetry.name
+    end = headers[0][0] if headers else len(data)
+    chunks = [data[:end]]
+    for i, (start, keys) in enumerate(headers):
+        if wanted(keys):
+            end = headers[i + 1][0] if i + 1 < len(headers) else len(data)
+            chunks.append(data[start:end])
+    return b"\n".join(chunks)
+
+
+def parse_sections(toml_file: str) -> dict:
+    """
+    parses only the [tool.poetry*]/[project*] tables of a pyproject.toml,
+    the file is memory-mapped so the skipped tables are never copied; falls
+    back to the full parser if the layout is ambiguous or the selection
+    does not parse
+    """
+    import tomli
+
+    from .cache import parse_pyproject
+
+    if not os.path.isfile(toml_file):
+        return {}
+    with open(toml_file, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            return {}
+        with mm:
+            text = scan_sections(mm)
+    if text is not None:
+        try:
+            return tomli.loads(text.decode("utf-8"))
+        except (tomli.TOMLDecodeError, UnicodeDecodeError):
+            pass
+    return parse_pyproject(toml_file)
@@ -0,0 +1,136 @@
+import io
+import os
+import time
+
+# number of functions/allocation sites in the report
+TOP = 30
+
+# the running session profile, see start()
+_session = None
+
+
+class Session:
+    """
+    cProfile and tracemalloc of one ppcheck session plus the resource usage
+    of every command it launched
+    """
+
+    def __init__(self, path: str, top: int = TOP):
+        import cProfile
+        import tracemalloc
+
+        self.path = path
+        self.top = top
+        self.runs = []
+        self.start = time.monotonic()
+        tracemalloc.start()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def note_run(self, result: dict, exec_path: str):
+        self.runs.append(dict(result, path=os.path.abspath(exec_path)))
+
+    def stop(self) -> str:
+        """
+        stops profiling, writes the report to path and returns it
+        """
+        import tracemalloc
+
+        self.profiler.disable()
+        wall = time.monotonic() - self.start
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report = report_text(self.profiler, snapshot, peak, wall, self.runs, self.top)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(report)
+        return report
+
+
+def _value(value, fmt: str = "{:.3f}") -> str:
+    return "-" if value is None else fmt.format(value)
+
+
+def runs_text(runs: list) -> str:
+    lines = [
+        "{:<40} {:>9} {:>9} {:>9} {:>11} {:>8} {:>8}  {}".format(
+            "cmd",
+            "wall s",
+            "user s",
+            "sys s",
+            "peak rss kB",
+            "vol cs",
+            "invol cs",
+            "via",
+        )
+    ]
+    for r in runs:
+        lines.append(
+            "{:<40} {:>9} {:>9} {:>9} {:>11} {:>8} {:>8}  {}".format(
+                r["cmd"][:40],
+                _value(r.get("duration")),
+                _value(r.get("utime")),
+                _value(r.get("stime")),
+                _value(r.get("peak_rss_kb"), "{}"),
+                _value(r.get("nvcsw"), "{}"),
+                _value(r.get("nivcsw"), "{}"),
+                r.get("via") or "",
+            )
+        )
+    lines.append(
+        "peak rss is the highest of all commands so far in the session, not only"
+        " the command's own"
+    )
+    shared = [r["cmd"] for r in runs if r.get("exclusive") is False]
+    if shared:
+        lines.append(
+            "cpu of commands which ran in parallel include each other: "
+            + ", ".join(shared)
+        )
+    return "\n".join(lines)
+
+
+def report_text(
+    profiler, snapshot, peak: int, wall: float, runs: list, top: int
+) -> str:
+    import pstats
+
+    out = io.StringIO()
+    spawned = sum(r.get("duration") or 0.0 for r in runs)
+    out.write("ppcheck profile\n\n")
+    out.write("wall time         {:10.3f} s\n".format(wall))
+    out.write("in commands       {:10.3f} s\n".format(spawned))
+    out.write("peak python memory {:9.1f} kB\n".format(peak / 1024))
+    out.write("\n== commands ==\n")
+    out.write((runs_text(runs) if runs else "no commands executed") + "\n")
+    out.write("\n== top functions (cumulative) ==\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    out.write("== top allocations ==\n")
+    for stat in snapshot.statistics("lineno")[:top]:
+        out.write("{}\n".format(stat))
+    return out.getvalue()
+
+
+def start(path: str, top: int = TOP) -> Session:
+    global _session
+    _session = Session(path, top)
+    return _session
+
+
+def stop() -> str | None:
+    global _session
+    session, _session = _session, None
+    return session.stop() if session else None
+
+
+def active() -> bool:
+    return _session is not None
+
+
+def note_run(result: dict, exec_path: str):
+    """
+    remembers a command result for the report if a session is profiled
+    """
+    if _session is not None:
+        _session.note_run(result, exec_path)
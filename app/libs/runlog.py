@@ -0,0 +1,230 @@
+import gzip
+import json
+import os
+import sys
+import time
+import uuid
+from collections import deque
+
+from .cache import atomic_open, data_dir
+from .func import cout
+
+LOG_DIR = "logs"
+LOG_SUFFIX = ".log.gz"
+# output kept per run, older lines are dropped while the command is running
+RING_BYTES = 1024 * 1024
+# all logs together, the oldest are evicted
+MAX_TOTAL_BYTES = 64 * 1024 * 1024
+
+
+def _nbytes(line: str) -> int:
+    # one byte per char for ascii, which most output is
+    return len(line) if line.isascii() else len(line.encode("utf-8", "replace"))
+
+
+class RingBuffer:
+    """
+    the last `max_bytes` of (stream, line) output of a command, counted as
+    utf-8 like the lines are saved
+    """
+
+    __slots__ = ("max_bytes", "lines", "size", "dropped")
+
+    def __init__(self, max_bytes: int = RING_BYTES):
+        self.max_bytes = max_bytes
+        self.lines = deque()
+        self.size = 0
+        self.dropped = 0
+
+    def append(self, name: str, line: str):
+        self.lines.append((name, line))
+        self.size += _nbytes(line)
+        while self.size > self.max_bytes and len(self.lines) > 1:
+            _, old = self.lines.popleft()
+            self.size -= _nbytes(old)
+            self.dropped += 1
+
+    def tee(self, on_line):
+        """
+        on_line callback which also keeps the line
+        """
+
+        def _on_line(name, line):
+            self.append(name, line)
+            on_line(name, line)
+
+        return _on_line
+
+
+def log_dir() -> str:
+    return data_dir(LOG_DIR)
+
+
+def new_run_id() -> str:
+    # sorts by time, the random part keeps concurrent runs apart
+    now = time.time()
+    return "{}-{:06d}-{}".format(
+        time.strftime("%Y%m%d-%H%M%S", time.localtime(now)),
+        int(now * 1e6) % 1000000,
+        uuid.uuid4().hex[:4],
+    )
+
+
+def save_run(
+    result: dict,
+    project: str,
+    output: RingBuffer | None,
+    max_total: int = MAX_TOTAL_BYTES,
+) -> str | None:
+    """
+    writes the captured output with the run metadata gzip compressed, the
+    first line is the metadata, every further line one [stream, line];
+    returns the run id
+    """
+    if output is None:
+        return None
+    run_id = new_run_id()
+    meta = {
+        "id": run_id,
+        "ts": time.time(),
+        "cmd": result["cmd"],
+        "project": os.path.abspath(project),
+        "returncode": result["returncode"],
+        "duration": result["duration"],
+        "timed_out": result.get("timed_out", False),
+        "lines": len(output.lines),
+        "dropped": output.dropped,
+    }
+    path = os.path.join(log_dir(), run_id + LOG_SUFFIX)
+    try:
+        with atomic_open(path, "wb") as raw:
+            with gzip.open(raw, "wt", encoding="utf-8") as f:
+                f.write(json.dumps(meta) + "\n")
+                for entry in output.lines:
+                    f.write(json.dumps(entry) + "\n")
+        evict(max_total)
+    except OSError:
+        return None
+    return run_id
+
+
+def evict(max_total: int = MAX_TOTAL_BYTES):
+    """
+    removes the oldest logs until all together fit into max_total bytes
+    """
+    try:
+        files = sorted(
+            (e for e in os.scandir(log_dir()) if e.name.endswith(LOG_SUFFIX)),
+            key=lambda e: e.name,
+            reverse=True,
+        )
+    except OSError:
+        return
+    total = 0
+    for e in files:
+        try:
+            total += e.stat().st_size
+            if total > max_total:
+                os.remove(e.path)
+        except OSError:
+            pass
+
+
+def read_meta(path: str) -> dict | None:
+    """
+    metadata of a log, only its first line is decompressed
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.loads(f.readline())
+    except (OSError, EOFError, ValueError):
+        return None
+
+
+def list_runs(
+    project: str | None = None, cmd: str | None = None, limit: int | None = None
+) -> list:
+    """
+    metadata of the newest `limit` stored runs, newest first
+    """
+    try:
+        names = sorted(
+            (n for n in os.listdir(log_dir()) if n.endswith(LOG_SUFFIX)), reverse=True
+        )
+    except OSError:
+        return []
+    runs = []
+    for name in names:
+        meta = read_meta(os.path.join(log_dir(), name))
+        if meta is None:
+            continue
+        if project and meta["project"] != os.path.abspath(project):
+            continue
+        if cmd and meta["cmd"] != cmd:
+            continue
+        runs.append(meta)
+        if limit and len(runs) >= limit:
+            break
+    return runs
+
+
+def find_run(run_id: str) -> str:
+    """
+    path of the log with this id (prefix) or the newest one for 'last',
+    raises ValueError if there is none or the prefix is ambiguous
+    """
+    try:
+        names = sorted(n for n in os.listdir(log_dir()) if n.endswith(LOG_SUFFIX))
+    except OSError:
+        names = []
+    if run_id == "last":
+        matches = names[-1:]
+    else:
+        matches = [n for n in names if n.startswith(run_id)]
+    if not matches:
+        raise ValueError("no stored run '{}'".format(run_id))
+    if len(matches) > 1:
+        raise ValueError("run id '{}' is ambiguous".format(run_id))
+    return os.path.join(log_dir(), matches[0])
+
+
+def replay(path: str, out=None, err=None) -> dict:
+    """
+    writes the stored output to out/err again, returns the metadata
+    """
+    out = out or sys.stdout
+    err = err or sys.stderr
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        meta = json.loads(f.readline())
+        for line in f:
+            name, text = json.loads(line)
+            (err if name == "stderr" else out).write(text)
+    out.flush()
+    return meta
+
+
+def runs_table(runs: list) -> str:
+    from terminaltables import AsciiTable
+
+    tab = [["id", "cmd", "exit", "duration", "lines", "project"]]
+    for r in runs:
+        if r["timed_out"]:
+            state = cout("timed out", fore_256="light_red")
+        elif r["returncode"] == 0:
+            state = cout("0", fore_256="light_green")
+        else:
+            state = cout(r["returncode"], fore_256="light_red")
+        lines = str(r["lines"])
+        if r["dropped"]:
+            lines += " (+{} dropped)".format(r["dropped"])
+        tab.append(
+            [
+                r["id"],
+                r["cmd"],
+                state,
+                "{:.2f}s".format(r["duration"]),
+                lines,
+                r["project"],
+            ]
+        )
+    return AsciiTable(table_data=tab).table
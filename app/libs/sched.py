@@ -0,0 +1,231 @@
+import asyncio
+import os
+import sys
+import time
+
+from .cls import INTERACTIVE_CMDS, EPoetryCmds
+from .engine import cmd_text, run_command
+from .func import cout, create_table, print_title
+from .profiling import note_run
+from .runlog import RingBuffer, save_run
+from .stats import record_run
+from .uptodate import UP_TO_DATE, after_run, is_up_to_date, skipped_result
+from .venv import direct_cmd
+
+# cmd -> commands which have to finish first if they are selected too,
+# the edges follow the serial order of EPoetryCmds
+CMD_DEPENDENCIES = {
+    EPoetryCmds.LOCK: (EPoetryCmds.UPDATE,),
+    EPoetryCmds.INSTALL: (EPoetryCmds.UPDATE, EPoetryCmds.LOCK),
+    EPoetryCmds.SHOW_TREE: (
+        EPoetryCmds.UPDATE,
+        EPoetryCmds.LOCK,
+        EPoetryCmds.INSTALL,
+    ),
+    EPoetryCmds.PYTEST: (EPoetryCmds.UPDATE, EPoetryCmds.LOCK, EPoetryCmds.INSTALL),
+    # black and isort rewrite the same files, pytest should not read them meanwhile
+    EPoetryCmds.BLACK: (EPoetryCmds.PYTEST,),
+    EPoetryCmds.ISORT: (EPoetryCmds.PYTEST, EPoetryCmds.BLACK),
+}
+# cmd -> commands it runs after if they are selected too, but also when they
+# failed: clearing the cache is how a failed lock is usually recovered
+CMD_ORDER = {
+    EPoetryCmds.CACHE: (EPoetryCmds.UPDATE, EPoetryCmds.LOCK, EPoetryCmds.INSTALL),
+}
+
+
+def cmd_label(cmd: str) -> str:
+    member = EPoetryCmds._value2member_map_.get(cmd)
+    return member.name.lower() if member else cmd.split()[-1]
+
+
+def order_only(cmd: str, need: str) -> bool:
+    """
+    True if cmd only runs after need (CMD_ORDER) and does not depend on it
+    """
+    member = EPoetryCmds._value2member_map_.get(cmd)
+    return EPoetryCmds._value2member_map_.get(need) in CMD_ORDER.get(member, ())
+
+
+def build_dag(cmds: list) -> dict:
+    """
+    returns {cmd: set(cmds it waits for)} restricted to the selected cmds,
+    interactive commands wait for everything before and block everything after
+    """
+    order = list(EPoetryCmds._value2member_map_)
+    cmds = sorted(set(cmds), key=lambda c: order.index(c) if c in order else len(order))
+    graph = {}
+    for i, cmd in enumerate(cmds):
+        member = EPoetryCmds._value2member_map_.get(cmd)
+        if member is None and cmd.startswith("poetry run "):
+            # project scripts run in the venv like pytest
+            member = EPoetryCmds.PYTEST
+        needs = {
+            d.value
+            for d in CMD_DEPENDENCIES.get(member, ()) + CMD_ORDER.get(member, ())
+            if d.value in cmds
+        }
+        for before in cmds[:i]:
+            if member in INTERACTIVE_CMDS or (
+                EPoetryCmds._value2member_map_.get(before) in INTERACTIVE_CMDS
+            ):
+                needs.add(before)
+        graph[cmd] = needs
+    return graph
+
+
+async def run_prefixed(
+    cmd: str,
+    exec_path: str,
+    out=None,
+    timeout: float | None = None,
+    env: dict | None = None,
+    color: bool | None = None,
+) -> dict:
+    """
+    runs cmd with its output prefixed line by line by its label
+    """
+    prefix = cout(
+        "[{}]".format(cmd_label(cmd)), fore_256="deep_sky_blue_4a", color=color
+    )
+    out = out or sys.stdout
+    output = RingBuffer()
+
+    def on_line(name, line):
+        out.write("{} {}".format(prefix, line))
+        out.flush()
+
+    _exec, env, via = await asyncio.to_thread(direct_cmd, cmd, exec_path, env)
+    result = await run_command(_exec, exec_path, timeout, output.tee(on_line), env=env)
+    return dict(result, cmd=cmd, via=via, exec=cmd_text(_exec), output=output)
+
+
+async def _run_one(
+    cmd: str,
+    exec_path: str,
+    out=None,
+    timeout=None,
+    force: bool = False,
+    env: dict | None = None,
+    color: bool | None = None,
+) -> dict:
+    if not force and await asyncio.to_thread(is_up_to_date, cmd, exec_path):
+        return dict(skipped_result(cmd), skipped=False)
+    if EPoetryCmds._value2member_map_.get(cmd) in INTERACTIVE_CMDS:
+        result = await run_command(cmd, exec_path, timeout, interactive=True, env=env)
+    else:
+        result = await run_prefixed(cmd, exec_path, out, timeout, env, color)
+    after_run(result, exec_path)
+    return dict(result, skipped=False)
+
+
+async def run_dag_async(
+    cmds: list,
+    exec_path: str,
+    workers: int | None = None,
+    out=None,
+    on_result=None,
+    timeout: float | None = None,
+    force: bool = False,
+    env: dict | None = None,
+    color: bool | None = None,
+) -> list:
+    graph = build_dag(cmds)
+    results = {}
+    done = {cmd: asyncio.Event() for cmd in graph}
+    sem = asyncio.Semaphore(workers or os.cpu_count() or 1)
+
+    async def _schedule(cmd):
+        for need in graph[cmd]:
+            await done[need].wait()
+        if any(
+            results[n]["returncode"] != 0 and not order_only(cmd, n) for n in graph[cmd]
+        ):
+            result = {
+                "cmd": cmd,
+                "returncode": None,
+                "duration": 0.0,
+                "timed_out": False,
+                "skipped": True,
+            }
+        else:
+            async with sem:
+                result = await _run_one(cmd, exec_path, out, timeout, force, env, color)
+            output = result.pop("output", None)
+            if not result.get("up_to_date"):
+                record_run(result, exec_path)
+                note_run(result, exec_path)
+                result["log"] = await asyncio.to_thread(
+                    save_run, result, exec_path, output
+                )
+        results[cmd] = result
+        done[cmd].set()
+        if on_result:
+            on_result(result)
+
+    await asyncio.gather(*(_schedule(cmd) for cmd in graph))
+    return [results[cmd] for cmd in graph]
+
+
+def run_dag(
+    cmds: list,
+    exec_path: str,
+    workers: int | None = None,
+    out=None,
+    on_result=None,
+    timeout: float | None = None,
+    force: bool = False,
+    env: dict | None = None,
+    color: bool | None = None,
+) -> list:
+    """
+    runs cmds concurrently as far as CMD_DEPENDENCIES/CMD_ORDER allow, commands
+    whose CMD_DEPENDENCIES failed are skipped, lock/install are skipped if they are up
+    to date (unless force), results are returned in serial order,
+    on_result(result) is called as soon as a command is finished or skipped;
+    env and color are used instead of os.environ and set_color() if given
+    """
+    return asyncio.run(
+        run_dag_async(
+            cmds, exec_path, workers, out, on_result, timeout, force, env, color
+        )
+    )
+
+
+def print_dag_report(results: list, wall: float, line_len: int = 72):
+    entries = {}
+    for r in results:
+        if r["skipped"]:
+            state = cout("skipped", fore_256="light_yellow")
+        elif r.get("up_to_date"):
+            state = cout(UP_TO_DATE, fore_256="light_green")
+        elif r["timed_out"]:
+            state = cout("timed out", fore_256="light_red")
+        elif r["returncode"] == 0:
+            state = cout("ok", fore_256="light_green")
+        else:
+            state = cout("exit {}".format(r["returncode"]), fore_256="light_red")
+        entries[r["cmd"]] = "{} {:.2f}s{}".format(
+            state, r["duration"], " (venv)" if r.get("via") == "venv" else ""
+        )
+    print(create_table(entries, heading_border=False))
+    serial = sum(r["duration"] for r in results)
+    print_title(
+        ".. it tooks {:.2f} seconds (serial sum {:.2f} seconds)".format(wall, serial),
+        line_len,
+    )
+
+
+def run_cmds(
+    cmds: list,
+    exec_path: str,
+    workers: int | None = None,
+    line_len: int = 72,
+    timeout: float | None = None,
+    force: bool = False,
+):
+    start = time.monotonic()
+    print_title("Execute {}".format(", ".join("'%s'" % c for c in cmds)), line_len)
+    results = run_dag(cmds, exec_path, workers, timeout=timeout, force=force)
+    print_dag_report(results, time.monotonic() - start, line_len)
+    return results
@@ -0,0 +1,179 @@
+import json
+import os
+import time
+
+from .cache import data_dir, ensure_parent
+from .func import cout
+
+HISTORY_FILE = "history.jsonl"
+# a run is flagged if it took REGRESSION_FACTOR times the median of the
+# previous runs of the same command in the same project
+REGRESSION_FACTOR = 3.0
+REGRESSION_MIN_RUNS = 3
+
+
+def history_path() -> str:
+    return data_dir(HISTORY_FILE)
+
+
+def record_run(result: dict, project: str):
+    """
+    appends one execution result of the engine to the history
+    """
+    record = {
+        "ts": time.time(),
+        "cmd": result["cmd"],
+        "project": os.path.abspath(project),
+        "duration": result["duration"],
+        "returncode": result["returncode"],
+        "timed_out": result.get("timed_out", False),
+        "utime": result.get("utime"),
+        "stime": result.get("stime"),
+        "peak_rss_kb": result.get("peak_rss_kb"),
+        "exclusive": result.get("exclusive"),
+        "via": result.get("via"),
+    }
+    path = history_path()
+    try:
+        ensure_parent(path)
+        # one write per line with O_APPEND keeps concurrent writers intact
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(record) + "\n").encode())
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def read_history(path: str | None = None) -> list:
+    records = []
+    try:
+        with open(path or history_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+def percentile(values: list, pct: float) -> float:
+    """
+    nearest-rank percentile of values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def cmd_label(record: dict) -> str:
+    """
+    command of a record, runs directly from the venv are kept apart from
+    the `poetry run` ones
+    """
+    if record.get("via") == "venv":
+        return record["cmd"] + " (venv)"
+    return record["cmd"]
+
+
+def summarize(records: list, key) -> dict:
+    """
+    returns {records[key]: {runs, failed, p50, p95, max, peak_rss_kb}}, key
+    may also be a function of the record; peak_rss_kb is the highest session
+    peak of the runs, see engine.rusage_delta
+    """
+    groups = {}
+    for r in records:
+        groups.setdefault(key(r) if callable(key) else r[key], []).append(r)
+    summary = {}
+    for name, runs in groups.items():
+        durations = [r["duration"] for r in runs]
+        # maxrss_kb of older records was only set if it was the run's own peak
+        peaks = [r.get("peak_rss_kb", r.get("maxrss_kb")) for r in runs]
+        peaks = [p for p in peaks if p is not None]
+        summary[name] = {
+            "runs": len(runs),
+            "failed": sum(1 for r in runs if r["returncode"] != 0),
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "max": max(durations),
+            "peak_rss_kb": max(peaks) if peaks else None,
+        }
+    return summary
+
+
+def regressions(
+    records: list,
+    factor: float = REGRESSION_FACTOR,
+    min_runs: int = REGRESSION_MIN_RUNS,
+) -> list:
+    """
+    returns the latest runs which took factor times longer than the median
+    of the previous successful runs of the same command in the same project
+    """
+    groups = {}
+    for r in records:
+        groups.setdefault((r["project"], cmd_label(r)), []).append(r)
+    found = []
+    for (project, cmd), runs in groups.items():
+        previous = [r["duration"] for r in runs[:-1] if r["returncode"] == 0]
+        if len(previous) < min_runs:
+            continue
+        median = percentile(previous, 50)
+        last = runs[-1]["duration"]
+        if median > 0 and last >= factor * median:
+            found.append(
+                {
+                    "project": project,
+                    "cmd": cmd,
+                    "last": last,
+                    "median": median,
+                    "factor": last / median,
+                }
+            )
+    return found
+
+
+def stats_table(summary: dict, title: str) -> str:
+    from terminaltables import AsciiTable
+
+    tab = [[title, "runs", "failed", "p50", "p95", "max", "session peak rss"]]
+    for name, s in sorted(summary.items()):
+        tab.append(
+            [
+                name,
+                s["runs"],
+                s["failed"],
+                "{:.2f}s".format(s["p50"]),
+                "{:.2f}s".format(s["p95"]),
+                "{:.2f}s".format(s["max"]),
+                (
+                    "-"
+                    if s.get("peak_rss_kb") is None
+                    else "{:.1f} MiB".format(s["peak_rss_kb"] / 1024)
+                ),
+            ]
+        )
+    return AsciiTable(table_data=tab).table
+
+
+def regressions_table(found: list) -> str:
+    from terminaltables import AsciiTable
+
+    tab = [["project", "cmd", "last", "median", "factor"]]
+    for r in found:
+        tab.append(
+            [
+                r["project"],
+                r["cmd"],
+                "{:.2f}s".format(r["last"]),
+                "{:.2f}s".format(r["median"]),
+                cout("{:.1f}x".format(r["factor"]), fore_256="light_red"),
+            ]
+        )
+    return AsciiTable(table_data=tab).table
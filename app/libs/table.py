@@ -0,0 +1,138 @@
+import re
+from itertools import chain, islice
+
+from .func import cout
+from .lock import locked_version
+from .model import Project, as_project
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+# column widths are computed from the first SAMPLE_ROWS rows only
+SAMPLE_ROWS = 500
+MAX_COL_WIDTH = 60
+DEFAULT_PAGE_SIZE = 50
+
+
+def visible_len(cell: str) -> int:
+    return len(ANSI_RE.sub("", cell)) if "\x1b" in cell else len(cell)
+
+
+def fit(cell, width: int) -> str:
+    """
+    pads cell to width, longer cells are cut (and lose their colors)
+    """
+    cell = str(cell)
+    length = visible_len(cell)
+    if length > width:
+        plain = ANSI_RE.sub("", cell)
+        return plain[: max(0, width - 3)] + "..."[:width]
+    return cell + " " * (width - length)
+
+
+def column_widths(rows: list, headers: list, max_width: int = MAX_COL_WIDTH) -> list:
+    widths = [visible_len(str(h)) for h in headers]
+    for row in rows:
+        for i, cell in enumerate(row):
+            length = visible_len(str(cell))
+            if length > widths[i]:
+                widths[i] = length
+    return [min(w, max_width) for w in widths]
+
+
+def stream_table(
+    rows,
+    headers: list,
+    widths: list | None = None,
+    sample: int = SAMPLE_ROWS,
+    max_width: int = MAX_COL_WIDTH,
+):
+    """
+    yields the lines of an ascii table (terminaltables look) while rows are
+    consumed lazily, the widths are taken from the first `sample` rows
+    """
+    rows = iter(rows)
+    head = []
+    if widths is None:
+        head = list(islice(rows, sample))
+        widths = column_widths(head, headers, max_width)
+    border = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+
+    def line(row):
+        return "| " + " | ".join(fit(c, w) for c, w in zip(row, widths)) + " |"
+
+    yield border
+    yield line(headers)
+    yield border
+    for row in chain(head, rows):
+        yield line(row)
+    yield border
+
+
+def page(rows, number: int = 0, size: int = DEFAULT_PAGE_SIZE):
+    """
+    returns the 1-based page `number` of rows, 0 returns all rows
+    """
+    if number < 1:
+        return rows
+    return islice(rows, (number - 1) * size, number * size)
+
+
+def constraint(value) -> str:
+    """
+    poetry dependency spec as string, eg. {version = "^1.0", extras = [..]}
+    """
+    if isinstance(value, dict):
+        return ", ".join("{}={}".format(k, v) for k, v in value.items())
+    if isinstance(value, list):
+        return " | ".join(constraint(v) for v in value)
+    return str(value)
+
+
+def section_group(section) -> str:
+    if section == "dependencies":
+        return "main"
+    if isinstance(section, tuple):
+        return section[1]
+    # legacy dev-dependencies
+    return "dev"
+
+
+def dep_rows(
+    project: Project | dict,
+    name: str | None = None,
+    group: str | None = None,
+    lock_index: dict | None = None,
+):
+    """
+    yields [group, name, constraint(, locked)] of all dependencies, lazily
+    filtered by a case insensitive name part and the group ('main' for
+    dependencies), the locked version is added with a lock_index
+    """
+    name = name.lower() if name else None
+    for section, _deps in as_project(project).sections:
+        _group = section_group(section)
+        if group and _group != group:
+            continue
+        col = "green" if _group == "main" else "blue"
+        for dep, value in _deps:
+            if name and name not in dep.lower():
+                continue
+            row = [_group, cout(dep, fore_256=col), constraint(value)]
+            if lock_index:
+                row.append(locked_version(lock_index, dep) or "")
+            yield row
+
+
+def deps_table(
+    project: Project | dict,
+    name: str | None = None,
+    group: str | None = None,
+    number: int = 0,
+    size: int = DEFAULT_PAGE_SIZE,
+    lock_index: dict | None = None,
+):
+    headers = ["group", "name", "constraint"]
+    if lock_index:
+        headers.append("locked")
+    return stream_table(
+        page(dep_rows(project, name, group, lock_index), number, size), headers
+    )
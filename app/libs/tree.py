@@ -0,0 +1,135 @@
+from .func import cout
+from .lock import normalize
+from .model import Project, as_project
+
+BRANCH, LAST = "├── ", "└── "
+PIPE, SPACE = "│   ", "    "
+
+
+def root_packages(project: Project | dict) -> list:
+    """
+    normalized names of the direct dependencies of the project, python excluded
+    """
+    roots = []
+    for _, name, _ in as_project(project).iter_deps():
+        name = normalize(name)
+        if name != "python" and name not in roots:
+            roots.append(name)
+    return roots
+
+
+def dependency_graph(lock_index: dict) -> dict:
+    return {
+        name: [d for d in package["dependencies"]]
+        for name, package in lock_index["packages"].items()
+    }
+
+
+def reverse_graph(graph: dict) -> dict:
+    reverse = {name: [] for name in graph}
+    for name, children in graph.items():
+        for child in children:
+            reverse.setdefault(child, []).append(name)
+    return reverse
+
+
+class TreeRenderer:
+    """
+    renders the (sub)trees of a graph {name: [children]}, subtrees are
+    memoized per (name, remaining depth) unless they contain a cycle back
+    into their ancestors, cycles are cut and marked
+    """
+
+    def __init__(self, graph: dict, label, max_depth: int | None = None):
+        self.graph = graph
+        self.label = label
+        self.max_depth = max_depth
+        self._memo = {}
+        self._stack = []
+
+    def render(self, name: str) -> list:
+        self._stack = []
+        lines, _ = self._render(name, self.max_depth)
+        return list(lines)
+
+    def _render(self, name: str, depth: int | None):
+        key = (name, depth)
+        if key in self._memo:
+            return self._memo[key], len(self._stack)
+        level = len(self._stack)
+        children = self.graph.get(name, [])
+        lines = [self.label(name)]
+        if depth is not None and depth <= 0:
+            if children:
+                lines[0] += " ..."
+            return tuple(lines), level
+        self._stack.append(name)
+        # lowest stack level a cycle inside this subtree points back to
+        lowest = level
+        for i, child in enumerate(children):
+            last = i == len(children) - 1
+            if child in self._stack:
+                lowest = min(lowest, self._stack.index(child))
+                sub = (self.label(child) + cout(" (circular)", fore_256="light_red"),)
+            else:
+                sub, hit = self._render(child, None if depth is None else depth - 1)
+                lowest = min(lowest, hit)
+            lines.append((LAST if last else BRANCH) + sub[0])
+            lines.extend((SPACE if last else PIPE) + line for line in sub[1:])
+        self._stack.pop()
+        lines = tuple(lines)
+        if lowest >= level:
+            self._memo[key] = lines
+        return lines, lowest
+
+
+def _label(lock_index: dict):
+    def label(name):
+        package = lock_index["packages"].get(name)
+        if package is None:
+            return "{} {}".format(cout(name, fore_256="light_red"), "(not locked)")
+        return "{} {}".format(
+            cout(package["name"], fore_256="green"),
+            cout(package["version"], fore_256="light_blue"),
+        )
+
+    return label
+
+
+def dependency_tree(
+    project: Project | dict,
+    lock_index: dict,
+    max_depth: int | None = None,
+    package=None,
+) -> str:
+    """
+    the `poetry show --tree` view of the project (or of one package),
+    computed from the lock index
+    """
+    renderer = TreeRenderer(dependency_graph(lock_index), _label(lock_index), max_depth)
+    roots = [normalize(package)] if package else root_packages(project)
+    return "\n".join(line for root in roots for line in renderer.render(root))
+
+
+def why_tree(
+    project: Project | dict,
+    lock_index: dict,
+    package: str,
+    max_depth: int | None = None,
+) -> str:
+    """
+    reverse tree: which packages require `package`, up to the direct
+    dependencies of the project
+    """
+    roots = set(root_packages(project))
+    label = _label(lock_index)
+
+    def why_label(name):
+        if name in roots:
+            return label(name) + cout(" (direct dependency)", fore_256="yellow")
+        return label(name)
+
+    renderer = TreeRenderer(
+        reverse_graph(dependency_graph(lock_index)), why_label, max_depth
+    )
+    return "\n".join(renderer.render(normalize(package)))
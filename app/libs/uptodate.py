@@ -0,0 +1,110 @@
+import glob
+import os
+
+from .cache import data_dir, project_fingerprint, project_key, read_json, write_json
+from .cls import EPoetryCmds
+
+# commands which do nothing if their inputs did not change since their last
+# successful run, update is left out as it looks for new releases
+SKIPPABLE_CMDS = (EPoetryCmds.LOCK.value, EPoetryCmds.INSTALL.value)
+UP_TO_DATE = "up to date, skipped"
+
+
+def venv_state(toml_dir: str) -> dict | None:
+    """
+    path and mtimes of pyvenv.cfg and site-packages of the project's venv,
+    installing or removing a package changes the site-packages mtime
+    """
+    from .venv import bin_dir, resolve_venv
+
+    venv = resolve_venv(toml_dir)
+    if not venv:
+        return None
+    state = {"path": venv}
+    paths = [os.path.join(venv, "pyvenv.cfg"), bin_dir(venv)]
+    paths += glob.glob(os.path.join(venv, "lib", "python*", "site-packages"))
+    paths += glob.glob(os.path.join(venv, "Lib", "site-packages"))
+    for path in paths:
+        try:
+            state[os.path.relpath(path, venv)] = os.stat(path).st_mtime_ns
+        except OSError:
+            pass
+    return state
+
+
+def cmd_fingerprint(cmd: str, toml_dir: str) -> dict:
+    files = project_fingerprint(toml_dir)
+    fingerprint = {
+        name: f["sha256"] if f else None for name, f in sorted(files.items())
+    }
+    if cmd == EPoetryCmds.INSTALL.value:
+        fingerprint["venv"] = venv_state(toml_dir)
+    return fingerprint
+
+
+def state_path(toml_dir: str) -> str:
+    return data_dir("uptodate", project_key(toml_dir) + ".json")
+
+
+def is_up_to_date(cmd: str, toml_dir: str) -> bool:
+    """
+    True if cmd is skippable and nothing it depends on changed since its
+    last successful run
+    """
+    if cmd not in SKIPPABLE_CMDS:
+        return False
+    recorded = read_json(state_path(toml_dir), {}).get(cmd)
+    if recorded is None:
+        return False
+    current = cmd_fingerprint(cmd, toml_dir)
+    if cmd == EPoetryCmds.INSTALL.value and current["venv"] is None:
+        return False
+    return recorded == current
+
+
+def record_success(cmd: str, toml_dir: str):
+    """
+    remembers the fingerprint after a successful run, a failed run forgets it
+    """
+    if cmd not in SKIPPABLE_CMDS:
+        return
+    path = state_path(toml_dir)
+    state = read_json(path, {})
+    state[cmd] = cmd_fingerprint(cmd, toml_dir)
+    try:
+        write_json(path, state)
+    except OSError:
+        pass
+
+
+def forget(cmd: str, toml_dir: str):
+    path = state_path(toml_dir)
+    state = read_json(path, {})
+    if state.pop(cmd, None) is not None:
+        try:
+            write_json(path, state)
+        except OSError:
+            pass
+
+
+def skipped_result(cmd: str) -> dict:
+    return {
+        "cmd": cmd,
+        "returncode": 0,
+        "duration": 0.0,
+        "timed_out": False,
+        "up_to_date": True,
+    }
+
+
+def after_run(result: dict, toml_dir: str):
+    if result["cmd"] in (EPoetryCmds.INSTALL.value, EPoetryCmds.UPDATE.value):
+        from .venv import forget_missing_venv
+
+        forget_missing_venv(toml_dir)
+    if result["cmd"] not in SKIPPABLE_CMDS:
+        return
+    if result["returncode"] == 0:
+        record_success(result["cmd"], toml_dir)
+    else:
+        forget(result["cmd"], toml_dir)
@@ -0,0 +1,155 @@
+import os
+import platform
+import shlex
+import subprocess
+
+from .cache import (
+    cache_dir,
+    project_fingerprint,
+    project_key,
+    read_json,
+    same_fingerprint,
+    write_json,
+)
+
+POETRY_RUN = "poetry run "
+ENV_INFO_TIMEOUT = 30
+
+
+def bin_dir(venv: str) -> str:
+    return os.path.join(venv, "Scripts" if platform.system() == "Windows" else "bin")
+
+
+def is_venv(path: str | None) -> bool:
+    return bool(path) and os.path.isfile(os.path.join(path, "pyvenv.cfg"))
+
+
+def _poetry_env_path(toml_dir: str) -> str | None:
+    try:
+        proc = subprocess.run(
+            ["poetry", "env", "info", "--path"],
+            cwd=toml_dir,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            timeout=ENV_INFO_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    path = proc.stdout.strip()
+    return path if proc.returncode == 0 and is_venv(path) else None
+
+
+def venv_cache_path(toml_dir: str) -> str:
+    return cache_dir("venv", project_key(toml_dir) + ".json")
+
+
+def _cached_entry(toml_dir: str) -> dict | None:
+    # the cached poetry lookup, None if there is none or it is stale
+    entry = read_json(venv_cache_path(toml_dir))
+    if entry:
+        fingerprint = project_fingerprint(toml_dir, entry.get("fingerprint"))
+        if same_fingerprint(fingerprint, entry["fingerprint"]) and (
+            entry["venv"] is None or is_venv(entry["venv"])
+        ):
+            return entry
+    return None
+
+
+def cached_venv(toml_dir: str) -> str | None:
+    """
+    resolve_venv without asking poetry: the in-project .venv or the cached
+    lookup, None if neither is there
+    """
+    local = os.path.join(toml_dir, ".venv")
+    if is_venv(local):
+        return local
+    entry = _cached_entry(toml_dir)
+    return entry["venv"] if entry else None
+
+
+def resolve_venv(toml_dir: str, use_cache: bool = True) -> str | None:
+    """
+    virtualenv of the project: an in-project .venv or the one poetry reports,
+    the poetry lookup is cached until pyproject.toml/poetry.lock change, a
+    project without a venv too
+    """
+    local = os.path.join(toml_dir, ".venv")
+    if is_venv(local):
+        return local
+    entry = _cached_entry(toml_dir) if use_cache else None
+    if entry:
+        return entry["venv"]
+    path = venv_cache_path(toml_dir)
+    venv = _poetry_env_path(toml_dir)
+    if use_cache:
+        try:
+            write_json(
+                path, {"fingerprint": project_fingerprint(toml_dir), "venv": venv}
+            )
+        except OSError:
+            pass
+    return venv
+
+
+def forget_missing_venv(toml_dir: str):
+    """
+    drops a cached "no venv", after `poetry install` there may be one
+    """
+    path = venv_cache_path(toml_dir)
+    entry = read_json(path)
+    if entry and entry.get("venv") is None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def venv_env(venv: str, base: dict | None = None) -> dict:
+    """
+    environment of `poetry run`: VIRTUAL_ENV set and its bin dir first in PATH,
+    based on base or os.environ
+    """
+    env = dict(os.environ if base is None else base)
+    env.pop("PYTHONHOME", None)
+    env["VIRTUAL_ENV"] = venv
+    env["PATH"] = bin_dir(venv) + os.pathsep + env.get("PATH", "")
+    return env
+
+
+def direct_cmd(cmd: str, toml_dir: str, env: dict | None = None) -> tuple:
+    """
+    rewrites `poetry run <exe> ...` to the executable in the project's venv,
+    returns (cmd, env, via) with via "venv" or "poetry" if the command is
+    left as it is; the rewritten cmd is an argv list, or a string for the
+    shell if the arguments need one; PPCHECK_POETRY_RUN=1 disables the
+    rewrite; env is the environment to start from (os.environ if None)
+    """
+    base = os.environ if env is None else env
+    if not cmd.startswith(POETRY_RUN) or base.get("PPCHECK_POETRY_RUN"):
+        return cmd, env, "poetry"
+    rest = cmd[len(POETRY_RUN) :].strip()
+    exe = rest.split(" ", 1)[0]
+    if not exe or os.sep in exe or "/" in exe:
+        return cmd, env, "poetry"
+    venv = resolve_venv(toml_dir)
+    if not venv:
+        return cmd, env, "poetry"
+    for name in (exe, exe + ".exe"):
+        path = os.path.join(bin_dir(venv), name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return _with_args(path, rest[len(exe) :]), venv_env(venv, env), "venv"
+    return cmd, env, "poetry"
+
+
+def _with_args(path: str, args: str):
+    from .engine import SHELL_CHARS
+
+    windows = platform.system() == "Windows"
+    if not any(c in SHELL_CHARS for c in args):
+        try:
+            return [path] + shlex.split(args, posix=not windows)
+        except ValueError:
+            pass
+    quoted = subprocess.list2cmdline([path]) if windows else shlex.quote(path)
+    return quoted + args
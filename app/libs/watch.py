@@ -0,0 +1,353 @@
+import asyncio
+import os
+import struct
+import sys
+import time
+from fnmatch import fnmatch
+
+from .cls import EPoetryCmds
+from .func import cout, print_title
+from .workspace import PRUNE_DIRS
+
+DEBOUNCE_SECONDS = 0.3
+POLL_INTERVAL = 0.5
+IGNORED_SUFFIXES = (".pyc", ".pyo", ".swp", ".swx", ".tmp", "~")
+# commands writing into the project and the paths they write, changes of
+# those paths while they run are their own
+WRITING_CMDS = {
+    EPoetryCmds.UPDATE.value: ("poetry.lock",),
+    EPoetryCmds.LOCK.value: ("poetry.lock",),
+    EPoetryCmds.BLACK.value: ("*.py", "*.pyi"),
+    EPoetryCmds.ISORT.value: ("*.py", "*.pyi"),
+}
+
+# linux/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+
+def relevant(path: str, root: str) -> bool:
+    """
+    False for editor/bytecode files and everything below PRUNE_DIRS
+    """
+    name = os.path.basename(path)
+    if name.endswith(IGNORED_SUFFIXES) or name.startswith(".#"):
+        return False
+    rel = os.path.relpath(path, root)
+    return not any(part in PRUNE_DIRS for part in rel.split(os.sep)[:-1])
+
+
+def own_write(path: str, root: str, cmds) -> bool:
+    """
+    True if path is written by one of the WRITING_CMDS in cmds
+    """
+    rel = os.path.relpath(path, root)
+    return any(
+        fnmatch(rel, pattern) for c in cmds for pattern in WRITING_CMDS.get(c, ())
+    )
+
+
+def walk_dirs(root: str):
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        yield path
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name not in PRUNE_DIRS and entry.is_dir(
+                        follow_symlinks=False
+                    ):
+                        stack.append(entry.path)
+        except OSError:
+            continue
+
+
+class PollingWatcher:
+    """
+    compares (mtime_ns, size) snapshots of all files every interval
+    """
+
+    def __init__(self, root: str, interval: float = POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self._snapshot = self.snapshot()
+        # bumped by flush(), a snapshot taken meanwhile is outdated
+        self._generation = 0
+
+    def snapshot(self) -> dict:
+        files = {}
+        for path in walk_dirs(self.root):
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            files[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return files
+
+    def _diff(self, current: dict) -> set:
+        return {
+            p
+            for p in current.keys() | self._snapshot.keys()
+            if current.get(p) != self._snapshot.get(p)
+        }
+
+    async def get(self) -> set:
+        while True:
+            await asyncio.sleep(self.interval)
+            generation = self._generation
+            # walking the tree must not block the loop pumping command output
+            current = await asyncio.to_thread(self.snapshot)
+            if generation != self._generation:
+                continue
+            changed = self._diff(current)
+            self._snapshot = current
+            if changed:
+                return changed
+
+    async def flush(self) -> set:
+        """
+        changes not returned by get() yet, they will not be returned by it
+        """
+        self._generation += 1
+        current = await asyncio.to_thread(self.snapshot)
+        changed = self._diff(current)
+        self._snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    inotify(7) through ctypes, every directory below root is watched and new
+    directories are added as they appear
+    """
+
+    def __init__(self, root: str):
+        import ctypes
+        import ctypes.util
+
+        self.root = root
+        self._libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+        )
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        self._queue = asyncio.Queue()
+        for path in walk_dirs(root):
+            self._add(path)
+        asyncio.get_running_loop().add_reader(self.fd, self._on_readable)
+
+    def _add(self, path: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def _read(self) -> set:
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    changed.add(self.root)
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                base = self._dirs.get(wd)
+                if base is None:
+                    continue
+                path = os.path.join(base, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and (
+                        os.path.basename(path) not in PRUNE_DIRS
+                    ):
+                        for sub in walk_dirs(path):
+                            self._add(sub)
+                    continue
+                changed.add(path)
+
+    def _on_readable(self):
+        changed = self._read()
+        if changed:
+            self._queue.put_nowait(changed)
+
+    async def get(self) -> set:
+        changed = await self._queue.get()
+        while not self._queue.empty():
+            changed |= self._queue.get_nowait()
+        return changed
+
+    async def flush(self) -> set:
+        """
+        changes not returned by get() yet, they will not be returned by it
+        """
+        changed = self._read()
+        while not self._queue.empty():
+            changed |= self._queue.get_nowait()
+        return changed
+
+    def close(self):
+        asyncio.get_running_loop().remove_reader(self.fd)
+        os.close(self.fd)
+
+
+def make_watcher(root: str, polling: bool = False):
+    """
+    inotify on linux, polling everywhere else or if inotify is not available
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root)
+
+
+async def next_changes(watcher, root: str, debounce: float = DEBOUNCE_SECONDS) -> set:
+    """
+    waits for relevant changes and collects them until no new one arrived
+    for `debounce` seconds
+    """
+    changed = set()
+    while not changed:
+        changed = {p for p in await watcher.get() if relevant(p, root)}
+    while True:
+        try:
+            more = await asyncio.wait_for(watcher.get(), debounce)
+        except asyncio.TimeoutError:
+            return changed
+        changed |= {p for p in more if relevant(p, root)}
+
+
+def _finished(task: asyncio.Task) -> set:
+    """
+    result of a finished run, its error is printed instead of being lost
+    """
+    if task.cancelled():
+        return set()
+    try:
+        return task.result()
+    except Exception as e:
+        print(cout("run failed: {}".format(e), fore_256="light_red"))
+        return set()
+
+
+async def watch_async(
+    toml_dir: str,
+    names: str,
+    workers: int | None = None,
+    debounce: float = DEBOUNCE_SECONDS,
+    polling: bool = False,
+    timeout: float | None = None,
+    line_len: int = 72,
+):
+    """
+    runs the commands `names` (see batch.resolve_cmds) once and again after
+    every change below toml_dir, a running run is cancelled by newer changes
+    unless it writes into the project itself, then it is run again once it
+    finished
+    """
+    from .batch import resolve_cmds
+    from .cache import load_project
+    from .sched import print_dag_report, run_dag_async
+
+    root = os.path.abspath(toml_dir)
+    pyproject = os.path.join(root, "pyproject.toml")
+    cmds = resolve_cmds(names, load_project(root).model)
+    watcher = make_watcher(root, polling)
+
+    async def _run(cmds) -> set:
+        start = time.monotonic()
+        print_title("Execute {}".format(", ".join("'%s'" % c for c in cmds)), line_len)
+        results = await run_dag_async(cmds, root, workers, timeout=timeout)
+        print_dag_report(results, time.monotonic() - start, line_len)
+        changed = set()
+        if any(c in WRITING_CMDS for c in cmds):
+            # the changes not picked up yet, without the commands' own ones
+            changed = {
+                p
+                for p in await watcher.flush()
+                if relevant(p, root) and not own_write(p, root, cmds)
+            }
+        print(cout("watching {} ...".format(root), fore_256="grey_50"))
+        return changed
+
+    running = asyncio.create_task(_run(cmds))
+    changes = None
+    # commands whose own writes are ignored in the changes collected now
+    own = ()
+    pending = set()
+    try:
+        while True:
+            if changes is None:
+                own = cmds if running is not None else ()
+                changes = asyncio.create_task(next_changes(watcher, root, debounce))
+            waits = {changes} if running is None else {changes, running}
+            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+            if running is not None and running.done():
+                pending |= _finished(running)
+                running = None
+            changed = set()
+            if changes.done():
+                changed = {p for p in changes.result() if not own_write(p, root, own)}
+                changes = None
+            if running is not None:
+                if not changed:
+                    continue
+                if any(c in WRITING_CMDS for c in cmds):
+                    # run again once it finished
+                    pending |= changed
+                    continue
+                running.cancel()
+                try:
+                    await running
+                except asyncio.CancelledError:
+                    pass
+                running = None
+                print(cout("cancelled, files changed", fore_256="light_yellow"))
+            changed |= pending
+            pending = set()
+            if not changed:
+                continue
+            if pyproject in changed or root in changed:
+                try:
+                    cmds = resolve_cmds(names, load_project(root).model)
+                except ValueError as e:
+                    print(cout(str(e), fore_256="light_red"))
+                    continue
+                print(cout("pyproject.toml reloaded", fore_256="light_blue"))
+            running = asyncio.create_task(_run(cmds))
+            if changes is not None:
+                own = tuple(own) + tuple(cmds)
+    finally:
+        tasks = [t for t in (running, changes) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        watcher.close()
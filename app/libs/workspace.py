@@ -0,0 +1,124 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .func import cout
+from .lock import LOCK_FILE, read_content_hash
+from .model import Project
+from .prescan import parse_sections
+
+PRUNE_DIRS = {
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    "node_modules",
+    "__pycache__",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    "build",
+    "dist",
+}
+# below this number of projects a process pool costs more than it saves
+POOL_THRESHOLD = 8
+
+
+def find_projects(root: str, prune: set = PRUNE_DIRS) -> list:
+    """
+    walks root with os.scandir (no symlinks followed) and returns every
+    directory containing a pyproject.toml, sorted by path
+    """
+    found = []
+    stack = [os.path.abspath(os.path.expanduser(root))]
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in prune:
+                                stack.append(entry.path)
+                        elif entry.name == "pyproject.toml" and entry.is_file():
+                            found.append(path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return sorted(found)
+
+
+def project_summary(toml_dir: str) -> dict:
+    summary = {
+        "path": toml_dir,
+        "name": None,
+        "version": None,
+        "scripts": 0,
+        "dependencies": 0,
+        "dev_dependencies": 0,
+        "lock": None,
+        "poetry": True,
+        "error": None,
+    }
+    try:
+        pp_dict = parse_sections(os.path.join(toml_dir, "pyproject.toml"))
+    except Exception as e:
+        summary["error"] = str(e)
+        return summary
+    project = Project.from_pyproject(pp_dict)
+    if not project.is_poetry:
+        summary["poetry"] = False
+        return summary
+    summary["name"] = project.name
+    summary["version"] = project.version
+    summary["scripts"] = len(project.scripts)
+    summary["dependencies"] = len(project.section("dependencies"))
+    summary["dev_dependencies"] = sum(
+        1 for _ in project.iter_deps(project.dev_sections())
+    )
+    locked_hash = read_content_hash(os.path.join(toml_dir, LOCK_FILE))
+    summary["lock"] = {None: "missing", True: "fresh", False: "stale"}[
+        project.lock_is_fresh(locked_hash)
+    ]
+    return summary
+
+
+def summarize_projects(paths: list, workers: int | None = None) -> list:
+    """
+    parses all projects concurrently, the order of paths is kept
+    """
+    if len(paths) < POOL_THRESHOLD or workers == 1:
+        return [project_summary(p) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(project_summary, paths, chunksize=chunksize))
+
+
+def workspace_table(summaries: list, root: str = "") -> str:
+    from terminaltables import AsciiTable
+
+    tab = [["name", "version", "scripts", "deps", "dev-deps", "lock", "path"]]
+    lock_colors = {"fresh": "light_green", "stale": "light_red", "missing": "yellow"}
+    for s in summaries:
+        if not s["poetry"]:
+            continue
+        path = os.path.relpath(s["path"], root) if root else s["path"]
+        if s["error"]:
+            tab.append([cout("?", fore_256="light_red"), "", "", "", "", "", path])
+            continue
+        tab.append(
+            [
+                cout(s["name"], fore_256="light_green"),
+                cout(s["version"], fore_256="light_blue"),
+                s["scripts"],
+                s["dependencies"],
+                s["dev_dependencies"],
+                cout(s["lock"], fore_256=lock_colors[s["lock"]]),
+                path,
+            ]
+        )
+    return AsciiTable(table_data=tab).table
@@ -1,12 +1,19 @@
 import os
+import sys
 
 import click
-import inquirer
-import tomli
-from pyfiglet import Figlet
 
+from .libs.cache import load_project
 from .libs.cls import EPoetryCmds
-from .libs.func import attr_exists, cout, get_info, run_exec, run_scripts
+from .libs.func import (
+    color_enabled,
+    cout,
+    get_info,
+    print_title,
+    run_exec,
+    run_scripts,
+    set_color,
+)
 
 """
 author:     dapk@gmx.net
@@ -18,10 +25,107 @@ using:      - https://python-inquirer.readthedocs.io/
 
 DEFAULT_LINE_LENGTH = 72
 
+# pre-rendered output of Figlet(font="small").renderText("PPCHECK"), so the
+# banner does not need pyfiglet and its font file at startup
+BANNER = (
+    " ___ ___  ___ _  _ ___ ___ _  __\n"
+    "| _ \\ _ \\/ __| || | __/ __| |/ /\n"
+    "|  _/  _/ (__| __ | _| (__| ' < \n"
+    "|_| |_|  \\___|_||_|___\\___|_|\\_\\\n"
+    "                                \n"
+)
 
-@click.command()
-@click.argument("check_poetry_path", type=click.Path(exists=True), required=False)
-def main(check_poetry_path):
+
+class DefaultGroup(click.Group):
+    """
+    click group which falls back to `default_cmd` if the first argument is
+    no sub command, so `ppcheck ~/poetry-project` keeps working
+    """
+
+    def __init__(self, *args, default_cmd: str = "", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_cmd = default_cmd
+
+    def parse_args(self, ctx, args):
+        group_opts = {o: p for p in self.get_params(ctx) for o in p.opts}
+        # skip the group options (and their values) in front of the command
+        i = 0
+        while i < len(args):
+            name, sep, _ = args[i].partition("=")
+            if name not in group_opts:
+                break
+            # `--opt=value` carries its value, `--opt value` consumes the next
+            i += 1 if sep or group_opts[name].is_flag else 2
+        if i >= len(args) or args[i] not in self.commands:
+            args.insert(min(i, len(args)), self.default_cmd)
+        return super().parse_args(ctx, args)
+
+
+def forward_to_daemon(cmd: str, toml_dir: str, **args):
+    """
+    lets a running `ppcheck --daemon` answer the request and exits with its
+    exit code, returns if no daemon is running or the session is profiled
+    """
+    from .libs import profiling
+    from .libs.daemon import forward
+
+    if profiling.active():
+        return
+
+    code = forward(cmd, toml_dir, **args)
+    if code is not None:
+        sys.exit(code)
+
+
+def get_toml_dir(check_poetry_path) -> str:
+    if not check_poetry_path:
+        check_poetry_path = os.getcwd()
+    return os.path.expanduser(check_poetry_path)
+
+
+path_argument = click.argument(
+    "check_poetry_path", type=click.Path(exists=True), required=False
+)
+no_cache_option = click.option(
+    "--no-cache", is_flag=True, help="Do not use the cached pyproject.toml data."
+)
+workers_option = click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of parallel workers, default: number of CPUs.",
+)
+json_option = click.option(
+    "--json", "as_json", is_flag=True, help="Print machine-readable json."
+)
+force_option = click.option(
+    "--force", is_flag=True, help="Run lock/install even if they are up to date."
+)
+
+
+@click.group(cls=DefaultGroup, default_cmd="check", invoke_without_command=True)
+@click.option(
+    "--daemon",
+    is_flag=True,
+    help="Serve info, scripts and run from a warm background process.",
+)
+@click.option(
+    "--idle-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=900,
+    show_default=True,
+    help="Seconds after which an idle daemon shuts down.",
+)
+@click.option(
+    "--profile",
+    "profile_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write a cProfile/tracemalloc report of the session and the resource"
+    " usage of the launched commands to this file.",
+)
+@click.pass_context
+def main(ctx, daemon, idle_timeout, profile_path):
     """
     This tool is used exclusively for Poetry projects.
     As soon as you have a poetry project in front of you in the console,
@@ -31,26 +135,73 @@ def main(check_poetry_path):
     set path of poetry project, eg.\n
     $ poetry run ppcheck ~/poetry-project
     """
-    print(
-        Figlet(font="small").renderText("PPCHECK"),
-        "Poetry pyproject.toml check!",
-        end="",
-    )
+    if profile_path:
+        from .libs import profiling
+
+        profiling.start(profile_path)
+        ctx.call_on_close(profiling.stop)
+    if daemon:
+        from .libs.daemon import serve, socket_path
+
+        try:
+            serve(
+                idle_timeout=idle_timeout,
+                ready=lambda: print("ppcheck daemon listening on", socket_path()),
+            )
+        except OSError as e:
+            raise click.ClickException(str(e))
+        except KeyboardInterrupt:
+            pass
+        ctx.exit()
+
+
+@main.command()
+@path_argument
+@click.option("--no-banner", is_flag=True, help="Skip the PPCHECK banner.")
+@no_cache_option
+@click.option(
+    "--workspace",
+    type=click.Path(exists=True, file_okay=False),
+    help="Summarize every Poetry project below this directory.",
+)
+@workers_option
+@click.option(
+    "--prefetch-help",
+    is_flag=True,
+    help="Fetch the --help output of all scripts in the background.",
+)
+@force_option
+def check(
+    check_poetry_path, no_banner, no_cache, workspace, workers, prefetch_help, force
+):
+    """
+    Interactive check of a poetry project (default command).
+    """
+    set_color()
+    if not no_banner:
+        print(BANNER, "Poetry pyproject.toml check!", end="")
+    if workspace:
+        from .libs.workspace import find_projects, summarize_projects, workspace_table
+
+        summaries = summarize_projects(find_projects(workspace), workers)
+        print("")
+        print(workspace_table(summaries, os.path.abspath(workspace)))
+        return
     try:
+        import inquirer
+
         # get/load pyproject.yaml
-        if not check_poetry_path:
-            check_poetry_path = os.getcwd()
-        toml_file = os.path.join(
-            os.path.expanduser(check_poetry_path), "pyproject.toml"
-        )
-        toml_dir = os.path.dirname(toml_file)
-        pp_dict = {}
-        if os.path.isfile(toml_file):
-            with open(toml_file, "rb") as f:
-                pp_dict = tomli.load(f)
+        toml_dir = get_toml_dir(check_poetry_path)
+        toml_file = os.path.join(toml_dir, "pyproject.toml")
+        project = load_project(toml_dir, not no_cache)
 
         # get title
-        print(get_info(pp_dict, True))
+        print(
+            project.table(
+                "short_info" if color_enabled() else "short_info:plain",
+                lambda d: get_info(d, True),
+            )
+        )
         _continue = True
         while _continue:
             print("")
@@ -73,8 +224,10 @@ def main(check_poetry_path):
             if start_seq["intro"] == "use poetry run scripts":
 
                 # check scripts with inputs
-                if attr_exists(pp_dict, dict, "tool", "poetry", "scripts"):
-                    run_scripts(pp_dict, toml_dir, DEFAULT_LINE_LENGTH)
+                if project.model.scripts:
+                    run_scripts(
+                        project.model, toml_dir, DEFAULT_LINE_LENGTH, prefetch_help
+                    )
                 else:
                     print(
                         cout(
@@ -95,18 +248,30 @@ def main(check_poetry_path):
                     ),
                 ]
                 tasks = inquirer.prompt(q)
+                _cmds = list(tasks["exec_cmds"])
+                # the tree is computed from poetry.lock, after the other commands
+                _show_tree = EPoetryCmds.SHOW_TREE.value in _cmds and os.path.isfile(
+                    os.path.join(toml_dir, "poetry.lock")
+                )
+                if _show_tree:
+                    _cmds.remove(EPoetryCmds.SHOW_TREE.value)
+
+                if len(_cmds) == 1:
+                    run_exec(_cmds[0], toml_dir, DEFAULT_LINE_LENGTH, force=force)
+                elif len(_cmds) > 1:
+                    from .libs.sched import run_cmds
 
-                if len(tasks["exec_cmds"]) > 0:
-                    for cmd in _choices:
-                        if cmd in tasks["exec_cmds"]:
-                            run_exec(
-                                cmd,
-                                toml_dir,
-                                DEFAULT_LINE_LENGTH,
-                            )
+                    run_cmds(_cmds, toml_dir, workers, DEFAULT_LINE_LENGTH, force=force)
+                if _show_tree:
+                    print_tree(toml_dir, not no_cache)
             elif start_seq["intro"] == "get poetry info":
-                if len(pp_dict) > 0:
-                    print(get_info(pp_dict))
+                if project.has_pyproject:
+                    print(
+                        project.table(
+                            "info" if color_enabled() else "info:plain",
+                            lambda d: get_info(d, lock_index=project.lock_index()),
+                        )
+                    )
                 else:
                     print(
                         cout(
@@ -128,5 +293,444 @@ def main(check_poetry_path):
         )
 
 
+@main.command()
+@path_argument
+@json_option
+@no_cache_option
+def info(check_poetry_path, as_json, no_cache):
+    """
+    Print the poetry info without prompts.
+    """
+    from .libs.batch import info_text
+
+    toml_dir = get_toml_dir(check_poetry_path)
+    forward_to_daemon("info", toml_dir, as_json=as_json, no_cache=no_cache)
+    project = load_project(toml_dir, not no_cache)
+    if not project.has_pyproject:
+        raise click.ClickException(f"No pyproject.toml available in {toml_dir}.")
+    set_color()
+    print(info_text(project, toml_dir, as_json))
+
+
+def print_tree(
+    toml_dir: str, use_cache: bool = True, depth=None, why=None, package=None
+):
+    from .libs.tree import dependency_tree, why_tree
+
+    project = load_project(toml_dir, use_cache)
+    lock_index = project.lock_index()
+    if lock_index is None:
+        raise click.ClickException(f"No poetry.lock available in {toml_dir}.")
+    if why:
+        print(why_tree(project.model, lock_index, why, depth))
+    else:
+        print(dependency_tree(project.model, lock_index, depth, package))
+
+
+@main.command()
+@path_argument
+@click.option(
+    "--depth", type=click.IntRange(min=0), default=None, help="Maximum tree depth."
+)
+@click.option("--why", metavar="PACKAGE", help="Show why PACKAGE is installed.")
+@click.option("--package", help="Only show the tree of this package.")
+@no_cache_option
+def tree(check_poetry_path, depth, why, package, no_cache):
+    """
+    Show the dependency tree from poetry.lock without running poetry.
+    """
+    set_color()
+    print_tree(get_toml_dir(check_poetry_path), not no_cache, depth, why, package)
+
+
+@main.command("deps")
+@path_argument
+@click.option("--filter", "name", help="Only dependencies whose name contains this.")
+@click.option(
+    "--group", help="Only this dependency group, 'main' for tool.poetry.dependencies."
+)
+@click.option(
+    "--page",
+    "number",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Show only this page, default: all.",
+)
+@click.option("--page-size", type=click.IntRange(min=1), default=50, show_default=True)
+@no_cache_option
+def deps_cmd(check_poetry_path, name, group, number, page_size, no_cache):
+    """
+    Print the dependencies without prompts, for large projects.
+    """
+    from .libs.table import deps_table
+
+    set_color()
+    toml_dir = get_toml_dir(check_poetry_path)
+    project = load_project(toml_dir, not no_cache)
+    for line in deps_table(
+        project.model, name, group, number, page_size, project.lock_index()
+    ):
+        click.echo(line)
+
+
+@main.command()
+@path_argument
+@json_option
+@no_cache_option
+def scripts(check_poetry_path, as_json, no_cache):
+    """
+    List the poetry run scripts without prompts.
+    """
+    from .libs.batch import scripts_text
+
+    toml_dir = get_toml_dir(check_poetry_path)
+    forward_to_daemon("scripts", toml_dir, as_json=as_json, no_cache=no_cache)
+    model = load_project(toml_dir, not no_cache).model
+    text = scripts_text(model, toml_dir, as_json)
+    if text:
+        print(text)
+
+
+@main.command(short_help="Run poetry commands or scripts without prompts.")
+@click.argument("cmds")
+@path_argument
+@json_option
+@no_cache_option
+@workers_option
+@click.option(
+    "--timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Terminate a command after this many seconds.",
+)
+@force_option
+def run(cmds, check_poetry_path, as_json, no_cache, workers, timeout, force):
+    """
+    Run poetry commands or scripts without prompts, eg.\n
+    $ ppcheck run lock,install,pytest ~/poetry-project
+
+    CMDS is a comma separated list of command names (update, lock, install,
+    show_tree, pytest, cache, config, init, black, isort) or script names.
+    The exit status is 1 if a command failed.
+    """
+    from .libs.batch import exit_code, needs_terminal, resolve_cmds, run_batch
+    from .libs.sched import run_cmds
+
+    set_color()
+    toml_dir = get_toml_dir(check_poetry_path)
+    if not needs_terminal(cmds):
+        # interactive commands need this terminal, the daemon has none
+        forward_to_daemon(
+            "run",
+            toml_dir,
+            cmds=cmds,
+            as_json=as_json,
+            no_cache=no_cache,
+            workers=workers,
+            timeout=timeout,
+            force=force,
+            line_len=DEFAULT_LINE_LENGTH,
+        )
+    try:
+        _cmds = resolve_cmds(cmds, load_project(toml_dir, not no_cache).model)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="CMDS")
+    if as_json:
+        results = run_batch(_cmds, toml_dir, workers, timeout, force)
+    else:
+        results = run_cmds(
+            _cmds, toml_dir, workers, DEFAULT_LINE_LENGTH, timeout, force
+        )
+    sys.exit(exit_code(results))
+
+
+@main.command(short_help="Re-run commands or scripts when project files change.")
+@click.argument("cmds")
+@path_argument
+@workers_option
+@click.option(
+    "--timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Terminate a command after this many seconds.",
+)
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0),
+    default=0.3,
+    show_default=True,
+    help="Seconds without changes before the commands are run.",
+)
+@click.option("--poll", is_flag=True, help="Poll for changes instead of inotify.")
+def watch(cmds, check_poetry_path, workers, timeout, debounce, poll):
+    """
+    Run poetry commands or scripts on every change of the project, eg.\n
+    $ ppcheck watch pytest,black ~/poetry-project
+
+    CMDS are the same as for `ppcheck run`. A run is cancelled as soon as
+    newer changes arrive, except for commands which write into the project
+    (update, lock, black, isort).
+    """
+    import asyncio
+
+    from .libs.watch import watch_async
+
+    set_color()
+    toml_dir = get_toml_dir(check_poetry_path)
+    try:
+        asyncio.run(
+            watch_async(
+                toml_dir, cmds, workers, debounce, poll, timeout, DEFAULT_LINE_LENGTH
+            )
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="CMDS")
+    except KeyboardInterrupt:
+        pass
+
+
+@main.command(short_help="Run commands or scripts in many projects in parallel.")
+@click.argument("cmds")
+@click.argument(
+    "project_paths", nargs=-1, type=click.Path(exists=True, file_okay=False)
+)
+@click.option(
+    "--workspace",
+    type=click.Path(exists=True, file_okay=False),
+    help="Run in every Poetry project below this directory.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of projects run in parallel, default: number of CPUs.",
+)
+@click.option(
+    "--fail-fast/--keep-going",
+    default=False,
+    show_default=True,
+    help="Cancel the projects not started yet after the first failure.",
+)
+@click.option(
+    "--log-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory of the per project logs, default: a new one in the data dir.",
+)
+@click.option(
+    "--timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Terminate a command after this many seconds.",
+)
+@force_option
+@json_option
+def fanout(
+    cmds, project_paths, workspace, workers, fail_fast, log_dir, timeout, force, as_json
+):
+    """
+    Run poetry commands or scripts in many projects, eg.\n
+    $ ppcheck fanout lock,pytest --workspace ~/src
+
+    CMDS are the same as for `ppcheck run`, the commands of one project run
+    one after another, the projects in a pool of --workers processes. The
+    output of every project goes to its own log file. The exit status is 1
+    if a project failed or was cancelled.
+    """
+    from .libs.batch import emit
+    from .libs.fanout import check_cmds, fan_out, fanout_table
+    from .libs.fanout import log_dir as new_log_dir
+
+    paths = [os.path.abspath(os.path.expanduser(p)) for p in project_paths]
+    root = ""
+    if workspace:
+        from .libs.workspace import find_projects
+
+        root = os.path.abspath(os.path.expanduser(workspace))
+        paths += [p for p in find_projects(root) if p not in paths]
+    if not paths:
+        raise click.UsageError("No projects, pass PROJECT_PATHS or --workspace.")
+    try:
+        check_cmds(cmds)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="CMDS")
+    set_color()
+    log_dir = log_dir or new_log_dir()
+    if not as_json:
+        print_title(
+            "Execute '{}' in {} projects, logs in {}".format(cmds, len(paths), log_dir),
+            DEFAULT_LINE_LENGTH,
+        )
+    summaries = fan_out(paths, cmds, workers, fail_fast, log_dir, timeout, force, root)
+    if as_json:
+        for summary in summaries:
+            emit(summary)
+    else:
+        print(fanout_table(summaries, root))
+    sys.exit(0 if all(s["returncode"] == 0 for s in summaries) else 1)
+
+
+@main.command()
+@click.argument("package")
+@click.option("--spec", help="Only locked versions matching, eg. '<2.31' or '>=2,<3'.")
+@click.option("--group", help="Only this dependency group, eg. 'main' or 'dev'.")
+@click.option(
+    "--workspace",
+    type=click.Path(exists=True, file_okay=False),
+    help="Index the changed projects below this directory first.",
+)
+@workers_option
+@json_option
+def query(package, spec, group, workspace, workers, as_json):
+    """
+    Find the indexed projects depending on PACKAGE, eg.\n
+    $ ppcheck query requests --spec '<2.31' --workspace ~/src
+
+    PACKAGE may contain '*' wildcards. The index is kept in the user data dir
+    and only projects whose pyproject.toml/poetry.lock changed are parsed again.
+    """
+    from .libs.batch import emit
+    from .libs.index import connect
+    from .libs.index import query as query_index
+    from .libs.index import query_table, update_index
+
+    set_color()
+    conn = connect()
+    try:
+        if workspace:
+            counts = update_index(conn, workspace, workers)
+            if not as_json:
+                print(
+                    cout(
+                        "{indexed} of {projects} projects indexed, {removed} removed".format(
+                            **counts
+                        ),
+                        fore_256="grey_50",
+                    )
+                )
+        try:
+            results = query_index(conn, package, spec, group)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--spec")
+    finally:
+        conn.close()
+    if as_json:
+        for r in results:
+            emit(r)
+    else:
+        print(query_table(results))
+
+
+@main.command()
+@click.option(
+    "--project",
+    "project_path",
+    type=click.Path(exists=True, file_okay=False),
+    help="Only show runs of this project.",
+)
+@click.option("--cmd", help="Only show runs of this command.")
+@click.option(
+    "--factor",
+    type=click.FloatRange(min=1),
+    default=3.0,
+    show_default=True,
+    help="Flag runs slower than factor x median of the previous runs.",
+)
+@json_option
+def stats(project_path, cmd, factor, as_json):
+    """
+    Show p50/p95/max durations of the executed commands.
+    """
+    from .libs.batch import emit
+    from .libs.stats import (
+        cmd_label,
+        read_history,
+        regressions,
+        regressions_table,
+        stats_table,
+        summarize,
+    )
+
+    set_color()
+    records = read_history()
+    if project_path:
+        records = [r for r in records if r["project"] == os.path.abspath(project_path)]
+    if cmd:
+        records = [r for r in records if r["cmd"] == cmd]
+    data = {
+        "commands": summarize(records, cmd_label),
+        "projects": summarize(records, "project"),
+        "regressions": regressions(records, factor),
+    }
+    if as_json:
+        emit(data)
+        return
+    if not records:
+        print(cout("No command executions recorded yet.", fore_256="light_yellow"))
+        return
+    print(stats_table(data["commands"], "command"))
+    print(stats_table(data["projects"], "project"))
+    if data["regressions"]:
+        print(regressions_table(data["regressions"]))
+
+
+@main.command("log")
+@click.argument("run_id", required=False)
+@click.option(
+    "--project",
+    "project_path",
+    type=click.Path(exists=True, file_okay=False),
+    help="Only list runs of this project.",
+)
+@click.option("--cmd", help="Only list runs of this command.")
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    default=20,
+    show_default=True,
+    help="Number of runs to list.",
+)
+@json_option
+def log_cmd(run_id, project_path, cmd, limit, as_json):
+    """
+    List the stored output of previous runs or replay one, eg.\n
+    $ ppcheck log\n
+    $ ppcheck log last
+
+    RUN_ID is the id (or a unique prefix of it) of a listed run or 'last'.
+    The output of every command is kept compressed in the user data dir, the
+    oldest logs are removed when they need more than 64 MiB.
+    """
+    from .libs.batch import emit
+    from .libs.runlog import find_run, list_runs, read_meta, replay, runs_table
+
+    set_color()
+    if run_id:
+        try:
+            path = find_run(run_id)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="RUN_ID")
+        if as_json:
+            emit(read_meta(path))
+            return
+        meta = replay(path)
+        if meta["dropped"]:
+            print(
+                cout(
+                    "{} earlier lines were dropped".format(meta["dropped"]),
+                    fore_256="light_yellow",
+                )
+            )
+        return
+    runs = list_runs(project_path, cmd, limit)
+    if as_json:
+        for r in runs:
+            emit(r)
+    elif runs:
+        print(runs_table(runs))
+    else:
+        print(cout("No command output stored yet.", fore_256="light_yellow"))
+
+
 if __name__ == "main":
     main()
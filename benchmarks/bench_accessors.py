@@ -0,0 +1,80 @@
+"""
+path accessor benchmark: jmespath.search + attr_exists (old deps) against
+the direct traversal of app.libs.model
+
+usage:
+$ poetry run python benchmarks/bench_accessors.py [--deps 10000] [--groups 50]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.libs.func import deps  # noqa: E402
+from app.libs.model import Project, lookup  # noqa: E402
+from benchmarks.synthetic import make_pp_dict  # noqa: E402
+
+
+def attr_exists(obj_dct, should_type, *keys):
+    # the old accessor, kept here as the reference
+    if not keys:
+        return False
+    for match in keys:
+        if not isinstance(obj_dct, dict) or match not in obj_dct:
+            return False
+        obj_dct = obj_dct[match]
+    return isinstance(obj_dct, should_type) if should_type else True
+
+
+def old_deps(pp_dict: dict, sections) -> list:
+    import jmespath
+
+    if isinstance(sections, str):
+        sections = [sections]
+    _dl = []
+    for section in sections:
+        use = ["tool", "poetry"]
+        use.extend(str(section).split("."))
+        if attr_exists(pp_dict, dict, *use):
+            _dlist = jmespath.search(".".join(use[:-1]), pp_dict)[use[-1:][0]]
+            for k, v in _dlist.items():
+                _dl.append([k, v])
+    return _dl
+
+
+def main(argv=None):
+    import jmespath
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--deps", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    pp_dict = make_pp_dict(args.deps, args.groups)
+    old_sections = ["dependencies"] + [
+        "group.{}.dependencies".format(g) for g in pp_dict["tool"]["poetry"]["group"]
+    ]
+    # built once per pyproject, like the cached model in production
+    project = Project.from_pyproject(pp_dict, False)
+    new_sections = ["dependencies"] + project.dev_sections()
+    assert len(old_deps(pp_dict, old_sections)) == len(
+        deps(project, new_sections, None)
+    )
+
+    lookups = {
+        "jmespath lookup": lambda: jmespath.search("tool.poetry.scripts", pp_dict),
+        "model lookup": lambda: lookup(pp_dict, "tool.poetry.scripts"),
+        "old deps()": lambda: old_deps(pp_dict, old_sections),
+        "new deps()": lambda: deps(project, new_sections, None),
+    }
+    for name, fn in lookups.items():
+        best = min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number
+        print("{:<18} {:10.3f} ms".format(name, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+pyproject.toml parsing benchmark: the full tomli parse against the
+memory-mapped pre-scan of app.libs.prescan, on a project with large
+unrelated [tool.*] tables
+
+usage:
+$ poetry run python benchmarks/bench_prescan.py [--deps 100] [--tables 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.libs.cache import parse_pyproject  # noqa: E402
+from app.libs.model import Project  # noqa: E402
+from app.libs.prescan import parse_sections  # noqa: E402
+from benchmarks.synthetic import make_pyproject  # noqa: E402
+from benchmarks.synthetic import make_tool_configs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--deps", type=int, default=100)
+    parser.add_argument("--groups", type=int, default=5)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pyproject.toml")
+        with open(path, "w") as f:
+            f.write(make_pyproject(args.deps, args.groups))
+            f.write(make_tool_configs(args.tables, args.keys))
+        full = Project.from_pyproject(parse_pyproject(path)).to_dict()
+        assert Project.from_pyproject(parse_sections(path)).to_dict() == full
+
+        print("pyproject.toml    {:10.1f} kB".format(os.path.getsize(path) / 1024))
+        for name, fn in {
+            "full parse": lambda: parse_pyproject(path),
+            "pre-scan": lambda: parse_sections(path),
+        }.items():
+            best = min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number
+            print("{:<17} {:10.3f} ms".format(name, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
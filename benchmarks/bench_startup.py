@@ -0,0 +1,96 @@
+"""
+startup benchmark for the `ppcheck` entry point
+
+usage:
+$ poetry run python benchmarks/bench_startup.py [--runs 10] [--max-ms 150]
+
+cold: no usable bytecode cache (fresh PYTHONPYCACHEPREFIX per run)
+warm: bytecode cache already populated
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = (
+    "inquirer",
+    "tomli",
+    "pyfiglet",
+    "jmespath",
+    "pyperclip",
+    "colored",
+    "terminaltables",
+)
+STARTUP_CODE = "from app.ppcheck import main; main(['--help'], standalone_mode=False)"
+
+
+def _run(args, env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return (time.perf_counter() - start) * 1000, proc.stderr
+
+
+def import_times(env):
+    """parse `-X importtime` output into {module: cumulative_us}"""
+    _, err = _run(["-X", "importtime", "-c", "import app.ppcheck"], env)
+    times = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:") :].split("|")]
+        if parts[1].isdigit():
+            times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+def measure(runs: int):
+    cold, warm = [], []
+    base_env = dict(os.environ)
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(base_env, PYTHONPYCACHEPREFIX=tmp)
+            cold.append(_run(["-c", STARTUP_CODE], env)[0])
+    _run(["-c", STARTUP_CODE], base_env)
+    for _ in range(runs):
+        warm.append(_run(["-c", STARTUP_CODE], base_env)[0])
+    return cold, warm
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--max-ms", type=float, default=None, help="fail if warm median exceeds"
+    )
+    args = parser.parse_args(argv)
+
+    cold, warm = measure(args.runs)
+    times = import_times(dict(os.environ))
+    loaded_heavy = [m for m in HEAVY_MODULES if m in times]
+
+    print(f"cold startup  median {statistics.median(cold):8.1f} ms")
+    print(f"warm startup  median {statistics.median(warm):8.1f} ms")
+    print(f"import app.ppcheck   {times.get('app.ppcheck', 0) / 1000:8.1f} ms")
+    print("heavy modules at startup:", ", ".join(loaded_heavy) or "none")
+
+    failed = bool(loaded_heavy)
+    if args.max_ms is not None and statistics.median(warm) > args.max_ms:
+        print(f"warm startup exceeds {args.max_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
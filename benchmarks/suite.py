@@ -0,0 +1,166 @@
+"""
+benchmark suite for the hot paths of app/libs/func.py and the cli startup
+
+usage:
+$ poetry run python benchmarks/suite.py                 # run and print
+$ poetry run python benchmarks/suite.py --save          # save as baseline
+$ poetry run python benchmarks/suite.py --compare       # fail on regressions
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.libs import func, model  # noqa: E402
+from benchmarks.synthetic import make_pp_dict  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+# absolute slack, sub-microsecond cases are mostly timer noise
+MIN_DELTA_SECONDS = 1e-5
+MIN_DELTA_BYTES = 4096
+# name: (deps, groups, scripts)
+SIZES = {
+    "10": (10, 1, 5),
+    "1k": (1000, 20, 100),
+    "10k": (10000, 50, 300),
+}
+
+
+def _dev_lists(pp_dict):
+    return (
+        func.deps(pp_dict, "dependencies", "green"),
+        func.deps(pp_dict, model.as_project(pp_dict).dev_sections(), "blue"),
+    )
+
+
+# name: (setup(pp_dict) -> args, fn(*args))
+CASES = {
+    "attr_exists": (
+        lambda pp: (pp,),
+        lambda pp: func.attr_exists(pp, dict, "tool", "poetry", "group", "group0"),
+    ),
+    "cout": (lambda pp: (), lambda: func.cout("dependency", fore_256="light_green")),
+    "deps": (
+        lambda pp: (pp, ["dependencies"] + model.as_project(pp).dev_sections()),
+        lambda pp, sections: func.deps(pp, sections, "green"),
+    ),
+    "tabs": (_dev_lists, lambda d, dd: func.tabs(d, dd)),
+    "create_table": (
+        lambda pp: (pp["tool"]["poetry"]["scripts"],),
+        lambda scripts: func.create_table(scripts),
+    ),
+    "get_info": (lambda pp: (pp,), lambda pp: func.get_info(pp)),
+}
+
+
+def measure_case(setup, fn, pp_dict) -> dict:
+    """
+    best time per call of 3 autoranged repeats and the tracemalloc peak of
+    a single call
+    """
+    args = setup(pp_dict)
+    timer = timeit.Timer(lambda: fn(*args))
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=3, number=number)) / number
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def measure_startup(runs: int) -> dict:
+    from benchmarks.bench_startup import measure
+
+    _, warm = measure(runs)
+    return {"seconds": statistics.median(warm) / 1000, "peak_bytes": 0}
+
+
+def run_suite(sizes: list, cases: list, startup_runs: int) -> dict:
+    func.set_color(True)
+    results = {}
+    for size in sizes:
+        pp_dict = make_pp_dict(*SIZES[size])
+        for case in cases:
+            setup, fn = CASES[case]
+            results["{}[{}]".format(case, size)] = measure_case(setup, fn, pp_dict)
+    if startup_runs:
+        results["startup"] = measure_startup(startup_runs)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    returns the (name, metric, ratio) of every measurement which is more
+    than threshold slower/bigger than the baseline
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, slack in (
+            ("seconds", MIN_DELTA_SECONDS),
+            ("peak_bytes", MIN_DELTA_BYTES),
+        ):
+            limit = max(base[metric] * (1 + threshold), base[metric] + slack)
+            if base[metric] > 0 and current[metric] > limit:
+                regressions.append((name, metric, current[metric] / base[metric]))
+    return regressions
+
+
+def print_results(results: dict, baseline: dict):
+    print("{:<22} {:>12} {:>12} {:>10}".format("case", "time", "peak mem", "vs base"))
+    for name, r in results.items():
+        base = baseline.get(name)
+        ratio = "{:.2f}x".format(r["seconds"] / base["seconds"]) if base else "-"
+        print(
+            "{:<22} {:>9.3f} ms {:>9.1f} kB {:>10}".format(
+                name, r["seconds"] * 1000, r["peak_bytes"] / 1024, ratio
+            )
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(SIZES))
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="save as baseline")
+    parser.add_argument("--compare", action="store_true", help="fail on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes.split(","), args.cases.split(","), args.startup_runs)
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print("baseline saved to", args.baseline)
+    if args.compare:
+        if not baseline:
+            print("no baseline found at", args.baseline)
+            return 1
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, ratio in regressions:
+            print("REGRESSION {} {} {:.2f}x".format(name, metric, ratio))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+synthetic pyproject data for the benchmarks
+"""
+
+
+def make_pp_dict(deps: int = 10, groups: int = 1, scripts: int = 1) -> dict:
+    """
+    returns a parsed pyproject.toml with `deps` dependencies spread over the
+    main dependencies and `groups` dependency groups
+    """
+    per_table = max(1, deps // (groups + 1))
+    poetry = {
+        "name": "synthetic",
+        "version": "1.0.0",
+        "description": "synthetic project with {} dependencies".format(deps),
+        "authors": ["Bench <bench@example.com>"],
+        "packages": [{"include": "synthetic"}],
+        "scripts": {
+            "script-{}".format(i): "synthetic.cli:cmd_{}".format(i)
+            for i in range(scripts)
+        },
+        "dependencies": {
+            "dep-{}".format(i): "^{}.0".format(i % 9 + 1) for i in range(per_table)
+        },
+        "group": {},
+    }
+    for g in range(groups):
+        poetry["group"]["group{}".format(g)] = {
+            "dependencies": {
+                "g{}-dep-{}".format(g, i): ">={}.0,<{}.0".format(i % 5, i % 5 + 1)
+                for i in range(per_table)
+            }
+        }
+    return {"tool": {"poetry": poetry}}
+
+
+def make_pyproject(deps: int = 10, groups: int = 1, scripts: int = 1) -> str:
+    """
+    the toml text of make_pp_dict
+    """
+    poetry = make_pp_dict(deps, groups, scripts)["tool"]["poetry"]
+    lines = [
+        "[tool.poetry]",
+        'name = "{}"'.format(poetry["name"]),
+        'version = "{}"'.format(poetry["version"]),
+        'description = "{}"'.format(poetry["description"]),
+        'authors = ["Bench <bench@example.com>"]',
+        'packages = [{include = "synthetic"}]',
+        "",
+        "[tool.poetry.scripts]",
+    ]
+    lines += ['{} = "{}"'.format(k, v) for k, v in poetry["scripts"].items()]
+    lines += ["", "[tool.poetry.dependencies]"]
+    lines += ['{} = "{}"'.format(k, v) for k, v in poetry["dependencies"].items()]
+    for name, group in poetry["group"].items():
+        lines += ["", "[tool.poetry.group.{}.dependencies]".format(name)]
+        lines += ['{} = "{}"'.format(k, v) for k, v in group["dependencies"].items()]
+    return "\n".join(lines) + "\n"
+
+
+def make_tool_configs(tables: int = 100, keys: int = 50) -> str:
+    """
+    toml text of `tables` unrelated [tool.*] tables with `keys` keys each,
+    like the linter/mypy configs of a monorepo
+    """
+    lines = []
+    for t in range(tables):
+        lines += ["", "[[tool.mypy.overrides]]", 'module = "pkg{}.*"'.format(t)]
+        lines += ["[tool.linter{}]".format(t), "select = ["]
+        lines += ['    "R{}",'.format(k) for k in range(keys)]
+        lines += ["]"]
+        lines += ["option-{} = {}".format(k, k) for k in range(keys)]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,60 @@
+"""
+fixtures shared by the tests
+"""
+
+import os
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.libs import venv
+
+
+def write_file(path: str, content: str = "") -> str:
+    """
+    writes content to path, missing parent dirs are created; returns path
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def make_venv(path, exe="tool"):
+    """
+    a virtualenv with a pyvenv.cfg and the executable exe, which echoes
+    $VIRTUAL_ENV and its arguments
+    """
+    os.makedirs(venv.bin_dir(path))
+    write_file(os.path.join(path, "pyvenv.cfg"), "home = /usr/bin\n")
+    script = write_file(
+        os.path.join(venv.bin_dir(path), exe), '#!/bin/sh\necho "$VIRTUAL_ENV" "$@"\n'
+    )
+    os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    self.tmp is a TemporaryDirectory holding the ppcheck cache and data dirs
+    (PPCHECK_CACHE_DIR, PPCHECK_DATA_DIR), both are undone after tearDown
+    """
+
+    # below self.tmp.name
+    CACHE_DIR = ".cache"
+    DATA_DIR = ".data"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_dir = os.path.join(self.tmp.name, self.CACHE_DIR)
+        self.data_dir = os.path.join(self.tmp.name, self.DATA_DIR)
+        env = patch.dict(
+            os.environ,
+            {"PPCHECK_CACHE_DIR": self.cache_dir, "PPCHECK_DATA_DIR": self.data_dir},
+        )
+        env.start()
+        self.addCleanup(env.stop)
+
+    def path(self, *parts) -> str:
+        return os.path.join(self.tmp.name, *parts)
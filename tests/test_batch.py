@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from app.libs.batch import exit_code, resolve_cmds, scripts_data
+from app.libs.cls import EPoetryCmds
+from app.libs.func import set_color
+from app.ppcheck import main
+from tests.helpers import TempDirTestCase, write_file
+
+PYPROJECT = """
+[tool.poetry]
+name = "example"
+version = "0.1.0"
+description = "An example package"
+authors = ["Author <author@example.com>"]
+packages = [{include = "example"}]
+
+[tool.poetry.scripts]
+hello = "example:hello"
+
+[tool.poetry.dependencies]
+python = "^3.10"
+
+[tool.poetry.group.dev.dependencies]
+pytest = "8.2.2"
+"""
+
+
+class TestBatch(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        write_file(self.path("pyproject.toml"), PYPROJECT)
+        # extra environment of the invoked commands
+        self.env = {}
+        self.runner = CliRunner(mix_stderr=False)
+
+    def invoke(self, *args):
+        return self.runner.invoke(main, list(args), env=self.env)
+
+    def test_resolve_cmds(self):
+        pp_dict = {"tool": {"poetry": {"scripts": {"hello": "example:hello"}}}}
+        self.assertEqual(
+            resolve_cmds("lock, show-tree,hello", pp_dict),
+            [EPoetryCmds.LOCK.value, EPoetryCmds.SHOW_TREE.value, "poetry run hello"],
+        )
+        with self.assertRaises(ValueError):
+            resolve_cmds("nope", pp_dict)
+
+    def test_scripts_data_without_scripts(self):
+        self.assertEqual(scripts_data({}), [])
+
+    def test_exit_code(self):
+        self.assertEqual(exit_code([{"returncode": 0}]), 0)
+        self.assertEqual(exit_code([{"returncode": 0}, {"returncode": None}]), 1)
+
+    def test_info_json(self):
+        result = self.invoke("info", self.tmp.name, "--json")
+        self.assertEqual(result.exit_code, 0)
+        data = json.loads(result.stdout)
+        self.assertEqual(data["name"], "example")
+        self.assertEqual(data["dependencies"], {"python": "^3.10"})
+        self.assertEqual(data["dev_dependencies"], {"pytest": "8.2.2"})
+
+    def test_info_without_pyproject(self):
+        empty = os.path.join(self.tmp.name, "empty")
+        os.makedirs(empty)
+        self.assertEqual(self.invoke("info", empty, "--json").exit_code, 1)
+
+    def test_scripts_json(self):
+        result = self.invoke("scripts", self.tmp.name, "--json")
+        data = json.loads(result.stdout)
+        self.assertEqual(data["scripts"][0]["cmd"], "poetry run hello")
+
+    @patch("app.libs.sched.run_prefixed")
+    def test_run_json(self, mock_run):
+        mock_run.side_effect = lambda cmd, *args: {
+            "cmd": cmd,
+            "returncode": 0 if "lock" in cmd else 2,
+            "duration": 0.0,
+            "timed_out": False,
+        }
+        result = self.invoke(
+            "run", "lock,install,config", os.path.relpath(self.tmp.name), "--json"
+        )
+        lines = [json.loads(l) for l in result.stdout.splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual({l["path"] for l in lines}, {os.path.abspath(self.tmp.name)})
+        self.assertEqual(result.exit_code, 1)
+        by_cmd = {l["cmd"]: l for l in lines}
+        self.assertEqual(by_cmd[EPoetryCmds.INSTALL.value]["returncode"], 2)
+
+    def test_run_unknown_cmd(self):
+        self.assertEqual(self.invoke("run", "nope", self.tmp.name).exit_code, 2)
+
+    def test_no_colors_when_piped(self):
+        # colors left enabled by an earlier command of the same process
+        set_color(True)
+        self.addCleanup(set_color, True)
+        self.env["PPCHECK_NO_DAEMON"] = "1"
+        for args in (
+            ("run", "hello", self.tmp.name),
+            ("stats",),
+            ("--workspace", self.tmp.name, "--no-banner"),
+        ):
+            result = self.invoke(*args)
+            self.assertNotIn("\x1b[", result.stdout + result.stderr, args)
+
+    def test_default_command_is_check(self):
+        result = self.invoke("--workspace", self.tmp.name, "--no-banner")
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("example", result.stdout)
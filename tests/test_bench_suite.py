@@ -0,0 +1,33 @@
+import unittest
+
+from benchmarks import suite
+
+
+class TestBenchSuite(unittest.TestCase):
+
+    def test_run_suite_small(self):
+        results = suite.run_suite(["10"], ["deps", "get_info"], 0)
+        self.assertEqual(list(results), ["deps[10]", "get_info[10]"])
+        for r in results.values():
+            self.assertGreater(r["seconds"], 0)
+            self.assertGreater(r["peak_bytes"], 0)
+
+    def test_compare(self):
+        baseline = {
+            "a": {"seconds": 0.01, "peak_bytes": 100000},
+            "b": {"seconds": 0.01, "peak_bytes": 100000},
+        }
+        results = {
+            "a": {"seconds": 0.02, "peak_bytes": 100000},
+            "b": {"seconds": 0.011, "peak_bytes": 200000},
+            "new": {"seconds": 1, "peak_bytes": 1},
+        }
+        self.assertEqual(
+            [(n, m) for n, m, _ in suite.compare(results, baseline, 0.25)],
+            [("a", "seconds"), ("b", "peak_bytes")],
+        )
+
+    def test_compare_ignores_timer_noise(self):
+        baseline = {"a": {"seconds": 1e-6, "peak_bytes": 100}}
+        results = {"a": {"seconds": 2e-6, "peak_bytes": 200}}
+        self.assertEqual(suite.compare(results, baseline, 0.25), [])
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from app.libs.cache import (
+    ProjectCache,
+    atomic_open,
+    file_fingerprint,
+    flush_all,
+    load_project,
+    project_key,
+    read_json,
+    write_json,
+)
+from tests.helpers import TempDirTestCase, write_file
+
+PYPROJECT = """
+[tool.poetry]
+name = "example"
+version = "0.1.0"
+
+[tool.poetry.dependencies]
+python = "^3.10"
+"""
+
+
+class TestProjectCache(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.path("project")
+        self.write("pyproject.toml", PYPROJECT)
+        self.cache = ProjectCache(os.path.join(self.cache_dir, "projects"))
+
+    def write(self, name, content):
+        write_file(os.path.join(self.project, name), content)
+
+    def test_load_parses_and_stores(self):
+        project = self.cache.load(self.project)
+        self.assertEqual(project.model.name, "example")
+        self.assertTrue(project.has_pyproject)
+        self.assertIsNone(self.cache.get(self.project))
+        project.flush()
+        entry = self.cache.get(self.project)
+        self.assertEqual(entry["model"]["name"], "example")
+        self.assertNotIn("pp_dict", entry)
+
+    def test_entry_written_once(self):
+        project = self.cache.load(self.project)
+        project.table("info", lambda model: "table")
+        project.table("short_info", lambda model: "short")
+        project.lock_index()
+        with patch.object(self.cache, "store", wraps=self.cache.store) as store:
+            project.flush()
+            project.flush()
+        self.assertEqual(store.call_count, 1)
+        entry = self.cache.get(self.project)
+        self.assertEqual(sorted(entry["tables"]), ["info", "short_info"])
+        self.assertIn("lock_index", entry)
+
+    def test_table_rendered_once(self):
+        calls = []
+        render = lambda d: calls.append(1) or "table"
+        self.cache.load(self.project).table("info", render)
+        flush_all()
+        self.assertEqual(self.cache.load(self.project).table("info", render), "table")
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidated_on_change(self):
+        self.cache.load(self.project).flush()
+        self.write("pyproject.toml", PYPROJECT.replace("0.1.0", "0.2.0"))
+        self.assertIsNone(self.cache.get(self.project))
+        project = self.cache.load(self.project)
+        self.assertEqual(project.model.version, "0.2.0")
+
+    def test_invalidated_on_lock_change(self):
+        self.cache.load(self.project).flush()
+        self.write("poetry.lock", "# lock")
+        self.assertIsNone(self.cache.get(self.project))
+
+    def test_touch_keeps_entry(self):
+        self.cache.load(self.project).flush()
+        path = os.path.join(self.project, "pyproject.toml")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self.assertIsNotNone(self.cache.get(self.project))
+
+    def test_lru_eviction(self):
+        self.cache.max_entries = 2
+        projects = []
+        for i in range(3):
+            path = self.path(f"p{i}")
+            os.makedirs(path)
+            projects.append(path)
+            self.cache.load(path).flush()
+            entry = self.cache.entry_path(path)
+            os.utime(entry, (i, i))
+        self.cache.evict()
+        self.assertFalse(os.path.exists(self.cache.entry_path(projects[0])))
+        self.assertTrue(os.path.exists(self.cache.entry_path(projects[2])))
+
+    def test_file_fingerprint_missing(self):
+        self.assertIsNone(file_fingerprint(os.path.join(self.project, "nope")))
+
+    def test_load_project_without_cache(self):
+        project = load_project(self.project, use_cache=False)
+        self.assertEqual(project.table("x", lambda d: "y"), "y")
+
+    def test_write_json_from_threads(self):
+        path = self.path("shared", "entry.json")
+        errors = []
+
+        def write(i):
+            try:
+                for _ in range(50):
+                    write_json(path, {"writer": i, "data": "x" * 10000})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(read_json(path)["data"]), 10000)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["entry.json"])
+
+    def test_atomic_open_keeps_old_content_on_error(self):
+        path = self.path("atomic", "data.txt")
+        with atomic_open(path) as f:
+            f.write("old")
+        with self.assertRaises(RuntimeError):
+            with atomic_open(path) as f:
+                f.write("half")
+                raise RuntimeError()
+        with open(path) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["data.txt"])
+
+    def test_project_key(self):
+        self.assertEqual(
+            project_key(self.project), project_key(self.project + os.sep + ".")
+        )
+        self.assertNotEqual(project_key(self.project), project_key(self.tmp.name))
@@ -0,0 +1,114 @@
+import json
+import os
+import socket
+import threading
+import unittest
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from app.libs import daemon
+from app.ppcheck import main
+from tests.helpers import TempDirTestCase, make_venv, write_file
+from tests.test_batch import PYPROJECT
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "unix sockets only")
+class TestDaemon(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.path("project")
+        write_file(os.path.join(self.project, "pyproject.toml"), PYPROJECT)
+        make_venv(os.path.join(self.project, ".venv"), "hello")
+        self.socket = self.path("d.sock")
+        os.environ["PPCHECK_SOCKET"] = self.socket
+        os.environ.pop("PPCHECK_NO_DAEMON", None)
+        ready = threading.Event()
+        self.thread = threading.Thread(
+            target=daemon.serve, args=(self.socket, 0.5, ready.set), daemon=True
+        )
+        self.thread.start()
+        self.assertTrue(ready.wait(5))
+
+    def tearDown(self):
+        self.thread.join(10)
+
+    def invoke(self, *args):
+        return CliRunner(mix_stderr=False).invoke(main, list(args))
+
+    def test_info_and_scripts(self):
+        result = self.invoke("info", "--json", self.project)
+        self.assertEqual(result.exit_code, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout)["name"], "example")
+        result = self.invoke("scripts", self.project)
+        self.assertEqual(result.stdout, "poetry run hello\texample:hello\n")
+
+    def test_project_is_reloaded_on_change(self):
+        self.invoke("info", "--json", self.project)
+        with open(os.path.join(self.project, "pyproject.toml"), "w") as f:
+            f.write(PYPROJECT.replace('name = "example"', 'name = "changed"'))
+        result = self.invoke("info", "--json", self.project)
+        self.assertEqual(json.loads(result.stdout)["name"], "changed")
+
+    def test_run_streams_output(self):
+        result = self.invoke("run", "hello", "--json", self.project)
+        self.assertEqual(result.exit_code, 0, result.stderr)
+        data = json.loads(result.stdout)
+        self.assertEqual(data["cmd"], "poetry run hello")
+        self.assertEqual(data["via"], "venv")
+        self.assertIn(".venv", result.stderr)
+
+    def test_errors(self):
+        result = self.invoke("run", "nope", self.project)
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("unknown command or script 'nope'", result.stderr)
+        result = self.invoke("info", self.tmp.name)
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("No pyproject.toml", result.stderr)
+
+    def request(self, **request):
+        sock = daemon.connect(self.socket)
+        with sock, sock.makefile("rwb") as f:
+            f.write((json.dumps(request) + "\n").encode())
+            f.flush()
+            return [json.loads(line) for line in f]
+
+    def test_run_refuses_interactive(self):
+        messages = self.request(
+            cmd="run", path=self.project, args={"cmds": "init"}, env={}
+        )
+        self.assertIn("needs the terminal", messages[0]["data"])
+        self.assertEqual(messages[-1], {"exit": 2})
+
+    @patch("app.libs.sched.run_cmds", return_value=[])
+    @patch("app.libs.daemon.forward")
+    def test_interactive_is_not_forwarded(self, mock_forward, mock_run_cmds):
+        result = self.invoke("run", "init", self.project)
+        self.assertEqual(result.exit_code, 0, result.stderr)
+        mock_forward.assert_not_called()
+        mock_run_cmds.assert_called_once()
+
+    def test_run_uses_client_env_and_color(self):
+        args = {"cmds": "hello", "workers": 1, "force": True}
+        messages = self.request(
+            cmd="run", path=self.project, args=args, env=dict(os.environ), color=True
+        )
+        output = "".join(m["data"] for m in messages if "stream" in m)
+        self.assertIn("\x1b[", output)
+        self.assertEqual(messages[-2]["result"]["via"], "venv")
+        env = dict(os.environ, PPCHECK_POETRY_RUN="1")
+        messages = self.request(
+            cmd="run", path=self.project, args=args, env=env, color=False
+        )
+        output = "".join(m["data"] for m in messages if "stream" in m)
+        self.assertNotIn("\x1b[", output)
+        self.assertEqual(messages[-2]["result"]["via"], "poetry")
+
+    def test_second_daemon_and_idle_shutdown(self):
+        with self.assertRaises(OSError):
+            daemon.serve(self.socket, 0.5)
+        self.thread.join(10)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket))
+        self.assertIsNone(daemon.forward("info", self.project))
@@ -1,77 +1,125 @@
-import subprocess
+import asyncio
+import os
 import sys
+import tempfile
+import time
 import unittest
+from types import SimpleNamespace
 from unittest.mock import patch
 
+from app.libs.engine import MAXRSS_DIVISOR, run_command, rusage_delta, split_cmd
 from app.libs.func import execute_cmd
 
+PY = '"{}"'.format(sys.executable)
+
 
 class TestExecuteCmd(unittest.TestCase):
 
-    @patch("subprocess.run")
-    @patch("platform.system", return_value="Linux")
-    def test_execute_cmd_success_linux(self, mock_platform, mock_subprocess):
-        exec_path = "/some/path"
-        cmd = "echo Hello"
-        execute_cmd(exec_path, cmd)
+    @patch("app.libs.engine.print_line")
+    def test_execute_cmd_success(self, mock_print_line):
+        result = execute_cmd(os.getcwd(), f"{PY} -c \"print('Hello')\"")
+        self.assertEqual(result["returncode"], 0)
+        self.assertFalse(result["timed_out"])
+        self.assertGreaterEqual(result["duration"], 0)
 
-        expected_cmd = "pushd /some/path > /dev/null && echo Hello && popd > /dev/null"
-        mock_subprocess.assert_called_once_with(
-            expected_cmd, shell=True, stderr=sys.stderr, stdout=sys.stdout
-        )
+    def test_execute_cmd_cwd(self):
+        lines = []
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(
+                run_command(
+                    f'{PY} -c "import os; print(os.getcwd())"',
+                    tmp,
+                    on_line=lambda name, line: lines.append(line.strip()),
+                )
+            )
+            self.assertEqual(result["returncode"], 0)
+            self.assertEqual(os.path.realpath(lines[0]), os.path.realpath(tmp))
+
+    @patch("app.libs.engine.print_line")
+    def test_execute_cmd_failure(self, mock_print_line):
+        result = execute_cmd(os.getcwd(), f'{PY} -c "raise SystemExit(3)"')
+        self.assertEqual(result["returncode"], 3)
+
+    @patch("app.libs.engine.print_line")
+    def test_execute_cmd_shell_fallback(self, mock_print_line):
+        self.assertEqual(execute_cmd(os.getcwd(), "exit 1")["returncode"], 1)
+
+    @patch("app.libs.engine.print_line")
+    def test_execute_cmd_empty_command(self, mock_print_line):
+        self.assertEqual(execute_cmd(os.getcwd(), "")["returncode"], 0)
 
-    @patch("subprocess.run")
-    @patch("platform.system", return_value="Windows")
-    def test_execute_cmd_success_windows(self, mock_platform, mock_subprocess):
-        exec_path = "C:\\some\\path"
-        cmd = "echo Hello"
-        execute_cmd(exec_path, cmd)
+    def test_execute_cmd_streams_stderr(self):
+        lines = []
+        asyncio.run(
+            run_command(
+                f"{PY} -c \"import sys; print('out'); print('err', file=sys.stderr)\"",
+                os.getcwd(),
+                on_line=lambda name, line: lines.append((name, line.strip())),
+            )
+        )
+        self.assertEqual(sorted(lines), [("stderr", "err"), ("stdout", "out")])
 
-        expected_cmd = "pushd C:\\some\\path && echo Hello && popd"
-        mock_subprocess.assert_called_once_with(
-            expected_cmd, shell=True, stderr=sys.stderr, stdout=sys.stdout
+    def test_execute_cmd_timeout(self):
+        result = execute_cmd(
+            os.getcwd(), f'{PY} -c "import time; time.sleep(10)"', timeout=0.5
         )
+        self.assertTrue(result["timed_out"])
+        self.assertLess(result["duration"], 5)
+
+    def test_rusage_peak_is_the_session_peak(self):
+        def usage(utime, maxrss):
+            return SimpleNamespace(
+                ru_utime=utime,
+                ru_stime=0.0,
+                ru_nvcsw=0,
+                ru_nivcsw=0,
+                ru_maxrss=maxrss * MAXRSS_DIVISOR,
+            )
+
+        # a smaller child does not raise RUSAGE_CHILDREN's maximum
+        delta = rusage_delta(usage(1.0, 5000), usage(1.5, 5000), True)
+        self.assertEqual(delta["peak_rss_kb"], 5000)
+        self.assertEqual(delta["utime"], 0.5)
+        self.assertIsNone(rusage_delta(None, None, True)["peak_rss_kb"])
 
-    @patch("subprocess.run")
-    @patch("platform.system", return_value="Linux")
-    def test_execute_cmd_failure(self, mock_platform, mock_subprocess):
-        mock_subprocess.side_effect = subprocess.CalledProcessError(1, "cmd")
-        exec_path = "/some/path"
-        cmd = "exit 1"
-
-        with self.assertRaises(subprocess.CalledProcessError):
-            execute_cmd(exec_path, cmd)
-
-    @patch("subprocess.run")
-    @patch("platform.system", return_value="Windows")
-    def test_execute_cmd_failure_windows(self, mock_platform, mock_subprocess):
-        mock_subprocess.side_effect = subprocess.CalledProcessError(1, "cmd")
-        exec_path = "C:\\some\\path"
-        cmd = "exit 1"
-
-        with self.assertRaises(subprocess.CalledProcessError):
-            execute_cmd(exec_path, cmd)
-
-    @patch("subprocess.run")
-    @patch("platform.system", return_value="Linux")
-    def test_execute_cmd_empty_command(self, mock_platform, mock_subprocess):
-        exec_path = "/some/path"
-        cmd = ""
-        execute_cmd(exec_path, cmd)
-
-        expected_cmd = "pushd /some/path > /dev/null &&  && popd > /dev/null"
-        mock_subprocess.assert_called_once_with(
-            expected_cmd, shell=True, stderr=sys.stderr, stdout=sys.stdout
+    def test_split_cmd(self):
+        self.assertIsNone(split_cmd("echo a && echo b"))
+        self.assertIsNone(split_cmd("not-a-command-ppcheck"))
+        self.assertEqual(split_cmd(f"{PY} -V")[1:], ["-V"])
+
+    def test_long_line(self):
+        lines = []
+        result = asyncio.run(
+            run_command(
+                f"{PY} -c \"print('x' * 100000); print('end')\"",
+                os.getcwd(),
+                on_line=lambda name, line: lines.append(line),
+            )
         )
+        self.assertEqual(result["returncode"], 0)
+        self.assertEqual(lines, ["x" * 100000 + "\n", "end\n"])
+
+    @unittest.skipIf(not os.path.isdir("/proc"), "reads the process state")
+    def test_terminates_on_error(self):
+        pids = []
 
-    @patch("subprocess.run")
-    @patch("platform.system", return_value="Windows")
-    def test_execute_cmd_empty_command_windows(self, mock_platform, mock_subprocess):
-        exec_path = "C:\\some\\path"
-        cmd = ""
-        execute_cmd(exec_path, cmd)
+        def on_line(name, line):
+            pids.append(int(line))
+            raise RuntimeError("consumer failed")
 
-        expected_cmd = "pushd C:\\some\\path &&  && popd"
-        mock_subprocess.assert_called_once_with(
-            expected_cmd, shell=True, stderr=sys.stderr, stdout=sys.stdout
+        cmd = (
+            f'{PY} -c "import os, time; print(os.getpid(), flush=True); time.sleep(30)"'
         )
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run_command(cmd, os.getcwd(), on_line=on_line))
+        # the whole group got the signal, the shell's child may need a moment
+        for _ in range(50):
+            try:
+                with open("/proc/{}/stat".format(pids[0])) as f:
+                    state = f.read().rsplit(")", 1)[1].split()[0]
+            except FileNotFoundError:
+                state = "gone"
+            if state in ("gone", "Z", "X"):
+                break
+            time.sleep(0.05)
+        self.assertIn(state, ("gone", "Z", "X"))
@@ -0,0 +1,141 @@
+import io
+import os
+from unittest.mock import patch
+
+from app.libs.fanout import (
+    CANCELLED,
+    check_cmds,
+    failed,
+    fan_out,
+    fanout_table,
+    log_dir,
+    log_name,
+    run_project,
+)
+from app.libs.func import set_color
+from tests.helpers import TempDirTestCase, write_file
+
+PYPROJECT = """
+[tool.poetry]
+name = "{}"
+version = "0.1.0"
+
+[tool.poetry.scripts]
+hello = "example:hello"
+"""
+
+
+class TestFanout(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.logs = self.path("logs")
+        set_color(False)
+        self.addCleanup(set_color, True)
+
+    def project(self, name, content=None):
+        path = self.path(name)
+        content = PYPROJECT.format(name) if content is None else content
+        write_file(os.path.join(path, "pyproject.toml"), content)
+        return path
+
+    def test_log_name(self):
+        self.assertRegex(log_name("/src/a/b", "/src"), r"^a_b-[0-9a-f]{8}\.log$")
+        self.assertRegex(log_name("/src", "/src"), r"^project-[0-9a-f]{8}\.log$")
+        # same name, different parents
+        self.assertNotEqual(log_name("/x/app"), log_name("/y/app"))
+        self.assertNotEqual(log_name("/src/a/b", "/src"), log_name("/src/a_b", "/src"))
+
+    def test_log_dir_unique(self):
+        self.assertNotEqual(log_dir(), log_dir())
+
+    def test_check_cmds(self):
+        check_cmds("lock,pytest,hello")
+        with self.assertRaises(ValueError):
+            check_cmds("lock,init")
+
+    @patch("app.libs.sched.run_dag")
+    def test_run_project(self, mock_run_dag):
+        def run_dag(cmds, *args, out, **kwargs):
+            out.write("[hello] hi\n")
+            return [
+                {"cmd": c, "returncode": 0, "duration": 0.1, "timed_out": False}
+                for c in cmds
+            ]
+
+        mock_run_dag.side_effect = run_dag
+        log = os.path.join(self.logs, "a.log")
+        summary = run_project(self.project("a"), "hello", log)
+        self.assertEqual(summary["name"], "a")
+        self.assertEqual(summary["returncode"], 0)
+        self.assertEqual(summary["results"][0]["cmd"], "poetry run hello")
+        with open(log) as f:
+            self.assertIn("[hello] hi", f.read())
+
+    def test_run_project_unknown_script(self):
+        log = os.path.join(self.logs, "a.log")
+        summary = run_project(self.project("a"), "nope", log)
+        self.assertEqual(summary["returncode"], 2)
+        self.assertIn("nope", summary["error"])
+
+    def test_fan_out_keeps_order(self):
+        paths = [self.project("a"), self.project("b", "broken = [")]
+        out = io.StringIO()
+        summaries = fan_out(paths, "nope", 2, logs=self.logs, out=out)
+        self.assertEqual([s["path"] for s in summaries], paths)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+        self.assertIn("[2/2]", out.getvalue())
+        self.assertEqual(
+            sorted(os.listdir(self.logs)), sorted(log_name(p) for p in paths)
+        )
+
+    def test_fail_fast(self):
+        paths = [self.project(n) for n in "abc"]
+        summaries = fan_out(
+            paths, "nope", 1, fail_fast=True, logs=self.logs, out=io.StringIO()
+        )
+        self.assertEqual(summaries[0]["returncode"], 2)
+        self.assertEqual([s["error"] for s in summaries[1:]], [CANCELLED] * 2)
+
+    def test_worker_error_keeps_other_summaries(self):
+        paths = [self.project("a"), self.project("b")]
+        # the log dir is a file, run_project fails before its own error handling
+        logs = self.path("not-a-dir")
+        open(logs, "w").close()
+        summaries = fan_out(paths, "nope", 2, logs=logs, out=io.StringIO())
+        self.assertEqual([s["path"] for s in summaries], paths)
+        for summary in summaries:
+            self.assertEqual(summary["returncode"], 2)
+            self.assertIn("Error", summary["error"])
+            self.assertTrue(failed(summary))
+
+    def test_fanout_table(self):
+        table = fanout_table(
+            [
+                {
+                    "path": "/src/a",
+                    "returncode": 0,
+                    "duration": 1.5,
+                    "results": [],
+                    "error": None,
+                },
+                {
+                    "path": "/src/b",
+                    "returncode": 1,
+                    "duration": 2.0,
+                    "results": [{"cmd": "poetry run pytest", "returncode": 1}],
+                    "error": None,
+                },
+                {
+                    "path": "/src/c",
+                    "returncode": None,
+                    "duration": 0.0,
+                    "results": [],
+                    "error": CANCELLED,
+                },
+            ],
+            "/src",
+        )
+        self.assertIn("ok 1.50s", table)
+        self.assertIn("exit 1 (poetry run pytest) 2.00s", table)
+        self.assertIn("cancelled", table)
@@ -0,0 +1,98 @@
+import os
+import subprocess
+from unittest.mock import MagicMock, patch
+
+from app.libs import helpcache
+from app.libs.func import show_help
+from tests.helpers import TempDirTestCase, make_venv, write_file
+
+
+class TestHelpCache(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.path("project")
+        write_file(os.path.join(self.project, "poetry.lock"), "# lock 1\n")
+        no_venv = patch("app.libs.venv._poetry_env_path", return_value=None)
+        no_venv.start()
+        self.addCleanup(no_venv.stop)
+
+    def test_key_depends_on_entry_point_and_lock(self):
+        key = helpcache.help_key(self.project, "app", "app.main:run")
+        self.assertEqual(key, helpcache.help_key(self.project, "app", "app.main:run"))
+        self.assertNotEqual(key, helpcache.help_key(self.project, "app", "app.x:run"))
+        with open(os.path.join(self.project, "poetry.lock"), "w") as f:
+            f.write("# lock 2\n")
+        self.assertNotEqual(
+            key, helpcache.help_key(self.project, "app", "app.main:run")
+        )
+
+    def test_key_depends_on_the_poetry_venv(self):
+        venv = self.path("cache-dir-venv")
+        make_venv(venv)
+        site = os.path.join(venv, "lib", "python3.11", "site-packages")
+        os.makedirs(site)
+        with patch("app.libs.venv._poetry_env_path", return_value=venv):
+            key = helpcache.help_key(self.project, "app", "app.main:run")
+            # `poetry add` installs into site-packages
+            os.utime(site, ns=(1, 1))
+            self.assertNotEqual(
+                key, helpcache.help_key(self.project, "app", "app.main:run")
+            )
+
+    @patch("app.libs.helpcache.HELP_MAX_ENTRIES", 2)
+    @patch("app.libs.helpcache.subprocess.run")
+    def test_cache_is_bounded(self, mock_run):
+        mock_run.return_value = subprocess.CompletedProcess([], 0, "usage\n")
+        for i in range(4):
+            helpcache.fetch_help(self.project, "app", "a:b{}".format(i))
+        files = os.listdir(os.path.join(self.cache_dir, "help"))
+        self.assertEqual(len([f for f in files if f.endswith(".json")]), 2)
+
+    @patch("app.libs.helpcache.subprocess.run")
+    def test_fetch_help_is_cached(self, mock_run):
+        mock_run.return_value = subprocess.CompletedProcess([], 0, "usage: app\n")
+        self.assertIsNone(helpcache.cached_help(self.project, "app", "a:b"))
+        self.assertEqual(
+            helpcache.fetch_help(self.project, "app", "a:b"), "usage: app\n"
+        )
+        self.assertEqual(
+            helpcache.fetch_help(self.project, "app", "a:b"), "usage: app\n"
+        )
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual(
+            helpcache.cached_help(self.project, "app", "a:b"), "usage: app\n"
+        )
+
+    @patch("app.libs.helpcache.subprocess.run")
+    def test_failed_help_is_not_cached(self, mock_run):
+        mock_run.return_value = subprocess.CompletedProcess([], 1, "error\n")
+        self.assertIsNone(helpcache.fetch_help(self.project, "app", "a:b"))
+        self.assertIsNone(helpcache.cached_help(self.project, "app", "a:b"))
+
+    @patch("app.libs.helpcache.fetch_help")
+    def test_prefetcher(self, mock_fetch):
+        mock_fetch.side_effect = lambda toml_dir, script, entry: "help " + script
+        prefetcher = helpcache.HelpPrefetcher(self.project, {"a": "x:a", "b": "x:b"})
+        try:
+            self.assertEqual(prefetcher.get("b"), "help b")
+            self.assertIsNone(prefetcher.get("missing"))
+        finally:
+            prefetcher.close()
+        self.assertEqual(mock_fetch.call_count, 2)
+
+    @patch("app.libs.func.run_exec")
+    @patch("app.libs.helpcache.fetch_help", return_value=None)
+    def test_show_help_falls_back_to_run_exec(self, mock_fetch, mock_run_exec):
+        show_help("app", "a:b", self.project)
+        mock_run_exec.assert_called_once_with("poetry run app --help", self.project, 72)
+
+    @patch("app.libs.helpcache.subprocess.run")
+    def test_show_help_cache_hit_skips_prefetcher(self, mock_run):
+        mock_run.return_value = subprocess.CompletedProcess([], 0, "usage: app\n")
+        helpcache.fetch_help(self.project, "app", "a:b")
+        prefetcher = MagicMock()
+        with patch("builtins.print") as mock_print:
+            show_help("app", "a:b", self.project, prefetcher=prefetcher)
+        prefetcher.get.assert_not_called()
+        mock_print.assert_called_with("usage: app\n", end="")
@@ -0,0 +1,124 @@
+import json
+import os
+
+from click.testing import CliRunner
+
+from app.libs.index import connect, query, update_index, version_matches
+from app.ppcheck import main
+from tests.helpers import TempDirTestCase, write_file
+
+PYPROJECT = """
+[tool.poetry]
+name = "{name}"
+version = "0.1.0"
+
+[tool.poetry.dependencies]
+python = "^3.10"
+requests = "{requests}"
+
+[tool.poetry.group.dev.dependencies]
+pytest = "8.2.2"
+"""
+
+LOCK = """
+[[package]]
+name = "requests"
+version = "{version}"
+optional = false
+python-versions = ">=3.8"
+
+[metadata]
+lock-version = "2.0"
+python-versions = "^3.10"
+content-hash = "abc"
+"""
+
+
+class TestIndex(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.root = self.path("src")
+        self.project("old", "^2.28", "2.28.2")
+        self.project("new", "^2.31", "2.32.3")
+        self.project("unlocked", "*", None)
+        self.conn = connect(self.path("index.sqlite"))
+
+    def tearDown(self):
+        self.conn.close()
+
+    def project(self, name, requests, version):
+        path = os.path.join(self.root, name)
+        write_file(
+            os.path.join(path, "pyproject.toml"),
+            PYPROJECT.format(name=name, requests=requests),
+        )
+        if version:
+            write_file(os.path.join(path, "poetry.lock"), LOCK.format(version=version))
+
+    def test_query(self):
+        update_index(self.conn, self.root)
+        found = query(self.conn, "Requests")
+        self.assertEqual([r["project"] for r in found], ["new", "old", "unlocked"])
+        found = query(self.conn, "requests", spec="<2.31")
+        self.assertEqual(
+            [(r["project"], r["locked"]) for r in found], [("old", "2.28.2")]
+        )
+        self.assertEqual(len(query(self.conn, "pytest", group="dev")), 3)
+        self.assertEqual(query(self.conn, "pytest", group="main"), [])
+        self.assertEqual(len(query(self.conn, "pyt*")), 6)
+
+    def test_incremental(self):
+        self.assertEqual(update_index(self.conn, self.root)["indexed"], 3)
+        self.assertEqual(update_index(self.conn, self.root)["indexed"], 0)
+        self.project("old", "^2.31", "2.31.0")
+        counts = update_index(self.conn, self.root)
+        self.assertEqual(counts["indexed"], 1)
+        self.assertEqual(query(self.conn, "requests", spec="<2.31"), [])
+        os.remove(os.path.join(self.root, "unlocked", "pyproject.toml"))
+        self.assertEqual(update_index(self.conn, self.root)["removed"], 1)
+        self.assertEqual(len(query(self.conn, "requests")), 2)
+
+    def test_broken_project_drops_its_rows(self):
+        update_index(self.conn, self.root)
+        write_file(os.path.join(self.root, "old", "pyproject.toml"), "[tool.poetry\n")
+        counts = update_index(self.conn, self.root)
+        self.assertEqual((counts["indexed"], counts["failed"]), (0, 1))
+        self.assertEqual(
+            [r["project"] for r in query(self.conn, "requests")], ["new", "unlocked"]
+        )
+        # not parsed again until it changes
+        counts = update_index(self.conn, self.root)
+        self.assertEqual((counts["indexed"], counts["failed"]), (0, 0))
+
+    def test_invalid_spec_without_matches(self):
+        with self.assertRaises(ValueError):
+            query(self.conn, "not-indexed", spec="<<1")
+
+    def test_version_matches(self):
+        self.assertTrue(version_matches("2.30.0", "<2.31"))
+        self.assertFalse(version_matches("2.31", "<2.31.0"))
+        self.assertTrue(version_matches("1.4.5", "~=1.4.0"))
+        self.assertFalse(version_matches("1.5.0", "~=1.4.0"))
+        self.assertTrue(version_matches("2.3.1", "==2.*"))
+        self.assertTrue(version_matches("2.28.2", ">=2, <2.31"))
+        self.assertFalse(version_matches(None, "<3"))
+        with self.assertRaises(ValueError):
+            version_matches("1.0", "<<1")
+
+    def test_cli(self):
+        result = CliRunner().invoke(
+            main,
+            [
+                "query",
+                "requests",
+                "--spec",
+                "<2.31",
+                "--workspace",
+                self.root,
+                "--json",
+            ],
+        )
+        self.assertEqual(result.exit_code, 0, result.output)
+        lines = [json.loads(line) for line in result.output.splitlines()]
+        self.assertEqual([r["project"] for r in lines], ["old"])
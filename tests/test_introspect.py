@@ -0,0 +1,145 @@
+import os
+import sys
+import textwrap
+from unittest.mock import patch
+
+from app.libs.func import script_choice
+from app.libs.introspect import (
+    info_text,
+    inspect_entry,
+    inspect_scripts,
+    search_path,
+    split_entry_point,
+    summary,
+)
+from app.libs.venv import resolve_venv
+from tests.helpers import TempDirTestCase, write_file
+
+SOURCES = {
+    "tool/__init__.py": "raise RuntimeError('the package must not be imported')\n",
+    "tool/cli.py": '''
+        import click
+
+        @click.command()
+        @click.option("--name", "-n", help="who to greet")
+        @click.argument("path")
+        @click.version_option("1.0")
+        def hello(name, path):
+            """Say hello.
+
+            More text.
+            """
+    ''',
+    "tool/plain.py": '''
+        import argparse
+
+        def parser():
+            p = argparse.ArgumentParser()
+            p.add_argument("--verbose", action="store_true", help="more output")
+            return p
+
+        def main():
+            """Run plainly."""
+            parser().parse_args()
+
+        class App:
+            def run(self):
+                """Run the app."""
+    ''',
+    "tool/__main__.py": "from .cli import hello as main\n",
+    "tool/bad.py": "def broken(:\n",
+    "src/other/__init__.py": "def main():\n    pass\n",
+}
+
+
+class TestIntrospect(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for name, content in SOURCES.items():
+            write_file(self.path(name), textwrap.dedent(content))
+        self.paths = search_path(self.tmp.name)
+
+    def inspect(self, entry_point):
+        return inspect_entry(entry_point, self.paths)
+
+    def test_split_entry_point(self):
+        self.assertEqual(split_entry_point("a.b:c"), ("a.b", "c"))
+        self.assertEqual(split_entry_point("a:b.c [extra]"), ("a", "b.c"))
+        self.assertEqual(split_entry_point({"callable": "a:b"}), ("a", "b"))
+        for entry_point in ("example command", "a.b", {"reference": "bin/x"}):
+            with self.assertRaises(ValueError):
+                split_entry_point(entry_point)
+
+    def test_click(self):
+        info = self.inspect("tool.cli:hello")
+        self.assertTrue(info["ok"])
+        self.assertEqual(info["framework"], "click")
+        self.assertEqual(info["doc"], "Say hello.\n\nMore text.")
+        self.assertEqual(
+            info["options"],
+            [("--name, -n", "who to greet"), ("PATH", ""), ("--version", "")],
+        )
+        self.assertNotIn("tool", sys.modules)
+
+    def test_argparse(self):
+        info = self.inspect("tool.plain:main")
+        self.assertEqual(info["framework"], "argparse")
+        self.assertEqual(info["options"], [("--verbose", "more output")])
+        self.assertEqual(self.inspect("tool.plain:App.run")["doc"], "Run the app.")
+
+    @patch("app.libs.venv._poetry_env_path")
+    def test_search_path_uses_only_a_known_venv(self, mock_env):
+        external = self.path("external")
+        site = write_file(
+            os.path.join(external, "lib", "python3.12", "site-packages", "x.pth")
+        )
+        write_file(os.path.join(external, "pyvenv.cfg"))
+        self.assertNotIn(os.path.dirname(site), search_path(self.tmp.name))
+        mock_env.return_value = external
+        resolve_venv(self.tmp.name)
+        mock_env.reset_mock()
+        self.assertIn(os.path.dirname(site), search_path(self.tmp.name))
+        mock_env.assert_not_called()
+
+    def test_follows_reexport(self):
+        info = self.inspect("tool.__main__:main")
+        self.assertEqual(info["origin"], os.path.join(self.tmp.name, "tool", "cli.py"))
+        self.assertEqual(summary(info), "Say hello.")
+
+    def test_src_layout(self):
+        self.assertTrue(self.inspect("other:main")["ok"])
+
+    def test_broken(self):
+        cases = {
+            "missing:main": "module 'missing' not found",
+            "tool.cli:nope": "'nope' is not defined",
+            "tool.plain:App.nope": "'App.nope' is not defined",
+            "tool.bad:broken": "syntax error",
+            "example command": "not a module:function",
+        }
+        for entry_point, error in cases.items():
+            info = self.inspect(entry_point)
+            self.assertFalse(info["ok"])
+            self.assertIn(error, info["error"])
+            self.assertIn("broken", summary(info))
+
+    def test_inspect_scripts(self):
+        infos = inspect_scripts(
+            self.tmp.name, {"hello": "tool.cli:hello", "gone": "missing:main"}
+        )
+        self.assertEqual(list(infos), ["hello", "gone"])
+        self.assertTrue(infos["hello"]["ok"])
+        self.assertFalse(infos["gone"]["ok"])
+        self.assertIn("--name, -n  who to greet", info_text(infos["hello"]))
+        self.assertIn("broken entry point", info_text(infos["gone"]))
+
+    def test_script_choice(self):
+        info = self.inspect("tool.cli:hello")
+        self.assertEqual(
+            script_choice("hello", info),
+            ("poetry run hello  - Say hello.", "poetry run hello"),
+        )
+        self.assertEqual(
+            script_choice("hello", None), ("poetry run hello", "poetry run hello")
+        )
@@ -0,0 +1,149 @@
+import os
+
+from app.libs.cache import ProjectCache
+from app.libs.func import deps, info_dict
+from app.libs.lock import (
+    content_hash,
+    lock_is_fresh,
+    locked_version,
+    normalize,
+    parse_lock,
+    read_content_hash,
+)
+from tests.helpers import TempDirTestCase, write_file
+
+LOCK = """# This file is automatically @generated by Poetry 1.8.3 and should not be changed by hand.
+
+[[package]]
+name = "Black"
+version = "24.4.2"
+description = "The uncompromising code formatter. [not a table]"
+optional = false
+python-versions = ">=3.8"
+groups = ["dev"]
+files = [
+    {file = "black-24.4.2-py3-none-any.whl", hash = "sha256:d36ed1124bb81b32f8614555b34cc4259c3fbc7eec17870e8ff8ded335b58d8c"},
+    {file = "black-24.4.2.tar.gz", hash = "sha256:c872b53057f000085da66a19c55d68f6f8ddcac2642392ad3a355878406fbd4d"},
+]
+
+[package.dependencies]
+click = ">=8.0.0"
+"zope.interface" = "*"
+numpy = [
+    {version = ">=1.21", markers = "python_version < \\"3.12\\""},
+    {version = ">=1.26", markers = "python_version >= \\"3.12\\""},
+]
+tomli = {version = ">=1.1.0", markers = "python_version < \\"3.11\\""}
+
+[package.extras]
+d = ["aiohttp (>=3.7.4)"]
+
+[[package]]
+name = "click"
+version = "8.1.7"
+description = "Composable command line interface toolkit"
+category = "main"
+optional = false
+python-versions = ">=3.7"
+
+[metadata]
+lock-version = "2.0"
+python-versions = "^3.10"
+content-hash = "abc123"
+"""
+
+
+class TestLock(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.lock = write_file(self.path("poetry.lock"), LOCK)
+
+    def test_normalize(self):
+        self.assertEqual(normalize("Zope.Interface"), "zope-interface")
+        self.assertEqual(normalize("typing_extensions"), "typing-extensions")
+
+    def test_parse_lock(self):
+        index = parse_lock(self.lock)
+        self.assertEqual(sorted(index["packages"]), ["black", "click"])
+        black = index["packages"]["black"]
+        self.assertEqual(black["version"], "24.4.2")
+        self.assertEqual(black["groups"], ["dev"])
+        self.assertEqual(
+            black["dependencies"], ["click", "zope-interface", "numpy", "tomli"]
+        )
+        self.assertEqual(index["packages"]["click"]["groups"], ["main"])
+        self.assertEqual(index["content_hash"], "abc123")
+        self.assertEqual(index["lock_version"], "2.0")
+
+    def test_parse_repo_lock(self):
+        import tomli
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        path = os.path.join(root, "poetry.lock")
+        with open(path, "rb") as f:
+            expected = tomli.load(f)
+        index = parse_lock(path)
+        for package in expected["package"]:
+            self.assertEqual(locked_version(index, package["name"]), package["version"])
+        self.assertEqual(index["content_hash"], expected["metadata"]["content-hash"])
+
+    def test_content_hash_of_repo(self):
+        import tomli
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with open(os.path.join(root, "pyproject.toml"), "rb") as f:
+            pp_dict = tomli.load(f)
+        locked_hash = read_content_hash(os.path.join(root, "poetry.lock"))
+        self.assertEqual(content_hash(pp_dict), locked_hash)
+        self.assertTrue(lock_is_fresh(pp_dict, locked_hash))
+        pp_dict["tool"]["poetry"]["dependencies"]["requests"] = "^2.31"
+        self.assertFalse(lock_is_fresh(pp_dict, locked_hash))
+        self.assertIsNone(lock_is_fresh(pp_dict, None))
+
+    def test_content_hash_keys(self):
+        base = {"tool": {"poetry": {"dependencies": {"python": "^3.10"}}}}
+        changed = {"tool": {"poetry": dict(base["tool"]["poetry"], name="other")}}
+        # name, version, scripts, ... do not make the lock stale
+        self.assertEqual(content_hash(base), content_hash(changed))
+        with_group = {
+            "tool": {
+                "poetry": dict(
+                    base["tool"]["poetry"],
+                    group={"dev": {"dependencies": {"pytest": "*"}}},
+                )
+            }
+        }
+        self.assertNotEqual(content_hash(base), content_hash(with_group))
+        project = dict(base, project={"dependencies": ["requests>=2"]})
+        self.assertNotEqual(content_hash(base), content_hash(project))
+
+    def test_info_dict_lock_fresh(self):
+        pp_dict = {"tool": {"poetry": {"dependencies": {"click": "^8.0"}}}}
+        index = parse_lock(self.lock)
+        self.assertFalse(info_dict(pp_dict, index)["lock_fresh"])
+        index["content_hash"] = content_hash(pp_dict)
+        self.assertTrue(info_dict(pp_dict, index)["lock_fresh"])
+        self.assertIsNone(info_dict(pp_dict)["lock_fresh"])
+
+    def test_locked_version(self):
+        index = parse_lock(self.lock)
+        self.assertEqual(locked_version(index, "BLACK"), "24.4.2")
+        self.assertIsNone(locked_version(index, "missing"))
+        self.assertIsNone(locked_version(None, "black"))
+
+    def test_deps_with_lock_index(self):
+        pp_dict = {"tool": {"poetry": {"dependencies": {"click": "^8.0"}}}}
+        rows = deps(pp_dict, "dependencies", None, parse_lock(self.lock))
+        self.assertIn("8.1.7", rows[0][1])
+
+    def test_cached_lock_index(self):
+        write_file(self.path("pyproject.toml"), "[tool.poetry]\nname = 'x'\n")
+        cache = ProjectCache(os.path.join(self.cache_dir, "projects"))
+        project = cache.load(self.tmp.name)
+        self.assertIn("black", project.lock_index()["packages"])
+        project.flush()
+        self.assertIn("lock_index", cache.get(self.tmp.name))
+        with open(self.lock, "a") as f:
+            f.write("\n")
+        self.assertIsNone(cache.get(self.tmp.name))
@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+import unittest
+
+from app.libs.cache import ProjectCache
+from app.libs.func import deps, get_info
+from app.libs.lock import content_hash
+from app.libs.model import Project, as_project, lookup
+
+PP_DICT = {
+    "tool": {
+        "poetry": {
+            "name": "example",
+            "version": "0.1.0",
+            "description": "An example package",
+            "authors": ["Author <author@example.com>"],
+            "packages": [{"include": "example"}],
+            "scripts": {"hello": "example.cli:main"},
+            "dependencies": {"python": "^3.10", "requests": "^2.31"},
+            "dev": {"dependencies": {"black": "*"}},
+            "group": {"docs": {"dependencies": {"mkdocs": {"version": "^1.5"}}}},
+        }
+    }
+}
+
+
+class TestLookup(unittest.TestCase):
+
+    def test_existing_path(self):
+        obj = {"a": {"b": {"c": 123}}}
+        self.assertEqual(lookup(obj, "a.b.c"), 123)
+        self.assertEqual(lookup(obj, ("a", "b")), {"c": 123})
+        deep = {"a": {"b": {"c": {"d": {"e": {"f": {"g": 789}}}}}}}
+        self.assertEqual(lookup(deep, "a.b.c.d.e.f.g"), 789)
+
+    def test_missing_path(self):
+        obj = {"a": {"b": 1}}
+        self.assertIsNone(lookup(obj, "a.x"))
+        self.assertEqual(lookup(obj, "a.b.c", {}), {})
+        self.assertIsNone(lookup({}, "a"))
+        self.assertIsNone(lookup(None, "a"))
+        self.assertIsNone(lookup(["not", "a", "dict"], "a"))
+
+
+class TestProject(unittest.TestCase):
+
+    def test_dev_sections_discovers_groups(self):
+        pp_dict = {
+            "tool": {
+                "poetry": {
+                    "group": {
+                        "docs": {"dependencies": {"mkdocs": "*"}},
+                        "a.b": {"dependencies": {"x": "*"}},
+                    }
+                }
+            }
+        }
+        sections = Project.from_pyproject(pp_dict).dev_sections()
+        self.assertIn(("group", "docs", "dependencies"), sections)
+        self.assertEqual(dict(deps(pp_dict, sections, None)), {"mkdocs": "*", "x": "*"})
+
+    def test_get_info_shows_all_groups(self):
+        pp_dict = {
+            "tool": {
+                "poetry": {
+                    "name": "example",
+                    "version": "0.1.0",
+                    "description": "",
+                    "authors": [],
+                    "packages": [],
+                    "dependencies": {"dep1": "^1.0"},
+                    "group": {"lint": {"dependencies": {"ruff": "^0.4"}}},
+                }
+            }
+        }
+        self.assertIn("ruff", get_info(pp_dict))
+
+    def test_from_pyproject(self):
+        project = Project.from_pyproject(PP_DICT)
+        self.assertTrue(project.is_poetry)
+        self.assertEqual(project.name, "example")
+        self.assertEqual(project.packages, ("example",))
+        self.assertEqual(project.scripts, (("hello", "example.cli:main"),))
+        self.assertEqual(project.groups, ("docs",))
+        self.assertEqual(project.content_hash, content_hash(PP_DICT))
+        self.assertFalse(hasattr(project, "__dict__"))
+
+    def test_sections(self):
+        project = Project.from_pyproject(PP_DICT, False)
+        self.assertIsNone(project.content_hash)
+        self.assertEqual(project.section("dev.dependencies"), (("black", "*"),))
+        self.assertEqual(project.section(("dev", "dependencies")), (("black", "*"),))
+        self.assertEqual(project.section("dev-dependencies"), ())
+        self.assertEqual(
+            [name for _, name, _ in project.iter_deps(project.dev_sections())],
+            ["black", "mkdocs"],
+        )
+        self.assertEqual(
+            [name for _, name, _ in project.iter_deps()],
+            ["python", "requests", "black", "mkdocs"],
+        )
+
+    def test_roundtrip(self):
+        project = Project.from_pyproject(PP_DICT)
+        data = json.loads(json.dumps(project.to_dict()))
+        self.assertEqual(Project.from_dict(data).to_dict(), project.to_dict())
+        self.assertEqual(
+            Project.from_dict(data).section(("group", "docs", "dependencies")),
+            (("mkdocs", {"version": "^1.5"}),),
+        )
+
+    def test_lock_is_fresh(self):
+        project = Project.from_pyproject(PP_DICT)
+        self.assertTrue(project.lock_is_fresh(content_hash(PP_DICT)))
+        self.assertFalse(project.lock_is_fresh("0" * 64))
+        self.assertIsNone(project.lock_is_fresh(None))
+        self.assertIsNone(Project.from_pyproject(PP_DICT, False).lock_is_fresh("x"))
+
+    def test_not_poetry(self):
+        project = as_project({"project": {"name": "x"}})
+        self.assertFalse(project.is_poetry)
+        self.assertEqual(list(project.iter_deps()), [])
+
+    def test_as_project(self):
+        project = Project.from_pyproject(PP_DICT)
+        self.assertIs(as_project(project), project)
+
+    def test_cached_model(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "pyproject.toml"), "w") as f:
+                f.write('[tool.poetry]\nname = "cached"\nversion = "1.0"\n')
+            cache = ProjectCache(os.path.join(tmp, "cache"))
+            project = cache.load(tmp)
+            self.assertEqual(project.model.name, "cached")
+            project.flush()
+            self.assertEqual(cache.get(tmp)["model"]["name"], "cached")
+            self.assertEqual(cache.load(tmp).model.name, "cached")
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+
+from app.libs.cache import parse_pyproject
+from app.libs.prescan import parse_sections, scan_sections
+from tests.helpers import TempDirTestCase
+
+PYPROJECT = b"""
+[project]
+name = "example"
+
+[tool.black]
+line-length = 88
+
+[[tool.mypy.overrides]]
+module = "pkg.*"
+
+[tool.poetry]
+name = "example"
+version = "0.1.0"
+
+[tool.ruff]
+select = [
+    "E",
+]
+
+[ tool.poetry.group.dev.dependencies ]  # comment
+pytest = "^8.0"
+
+[tool.poetry.dependencies]
+python = "^3.10"
+"""
+
+
+class TestPrescan(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.toml = self.path("pyproject.toml")
+
+    def write(self, data: bytes):
+        with open(self.toml, "wb") as f:
+            f.write(data)
+
+    def test_scan_selects_sections(self):
+        text = scan_sections(PYPROJECT)
+        self.assertIn(b"[tool.poetry]", text)
+        self.assertIn(b"[project]", text)
+        self.assertIn(b"pytest", text)
+        self.assertNotIn(b"line-length", text)
+        self.assertNotIn(b"mypy", text)
+
+    def test_parse_matches_full_parse(self):
+        self.write(PYPROJECT)
+        pp_dict = parse_sections(self.toml)
+        full = parse_pyproject(self.toml)
+        self.assertEqual(pp_dict["tool"]["poetry"], full["tool"]["poetry"])
+        self.assertEqual(pp_dict["project"], full["project"])
+        self.assertNotIn("black", pp_dict["tool"])
+
+    def test_root_and_tool_keys_kept(self):
+        self.write(b'tool.poetry.name = "root"\n[tool.black]\nline-length = 88\n')
+        self.assertEqual(
+            parse_sections(self.toml), {"tool": {"poetry": {"name": "root"}}}
+        )
+        self.write(b'[tool]\npoetry.version = "1.0"\n[tool.black]\nline-length = 88\n')
+        self.assertEqual(
+            parse_sections(self.toml), {"tool": {"poetry": {"version": "1.0"}}}
+        )
+
+    def test_ambiguous_layouts(self):
+        self.assertIsNone(scan_sections(b'[tool.x]\na = """\n[tool.poetry]\n"""\n'))
+        self.assertIsNone(scan_sections(b'[tool."poetry"]\nname = "x"\n'))
+
+    def test_fallback_to_full_parse(self):
+        self.write(
+            b'[tool.x]\na = """\n[tool.poetry]\n"""\n[tool.poetry]\nname = "x"\n'
+        )
+        with patch("app.libs.cache.parse_pyproject", wraps=parse_pyproject) as full:
+            self.assertEqual(parse_sections(self.toml)["tool"]["poetry"]["name"], "x")
+            full.assert_called_once()
+
+    def test_broken_selection_falls_back(self):
+        # a nested array line looks like a header and cuts the table
+        self.write(b'[tool.poetry]\nname = "x"\nextras = [\n[1]\n]\n')
+        self.assertEqual(parse_sections(self.toml), parse_pyproject(self.toml))
+
+    def test_missing_and_empty(self):
+        self.assertEqual(parse_sections(self.toml), {})
+        self.write(b"")
+        self.assertEqual(parse_sections(self.toml), {})
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sys
+import unittest
+
+from click.testing import CliRunner
+
+from app.libs import profiling
+from app.libs.engine import run_command
+from app.ppcheck import main
+from tests.helpers import TempDirTestCase, write_file
+
+PYPROJECT = """
+[tool.poetry]
+name = "example"
+version = "0.1.0"
+description = "An example package"
+authors = ["Author <author@example.com>"]
+packages = [{include = "example"}]
+"""
+
+
+class TestProfiling(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        write_file(self.path("pyproject.toml"), PYPROJECT)
+        self.report = self.path("profile.txt")
+
+    def tearDown(self):
+        profiling.stop()
+
+    def invoke(self, *args):
+        return CliRunner(mix_stderr=False).invoke(main, list(args))
+
+    def test_session_report(self):
+        profiling.start(self.report, top=5)
+        self.assertTrue(profiling.active())
+        profiling.note_run(
+            {
+                "cmd": "poetry run pytest",
+                "duration": 1.5,
+                "utime": 1.2,
+                "stime": 0.1,
+                "peak_rss_kb": 50000,
+                "nvcsw": 10,
+                "nivcsw": 3,
+                "via": "venv",
+                "exclusive": False,
+            },
+            self.tmp.name,
+        )
+        report = profiling.stop()
+        self.assertFalse(profiling.active())
+        with open(self.report) as f:
+            self.assertEqual(f.read(), report)
+        self.assertIn("poetry run pytest", report)
+        self.assertIn("50000", report)
+        self.assertIn("include each other: poetry run pytest", report)
+        self.assertIn("highest of all commands so far in the session", report)
+        self.assertIn("top functions", report)
+        self.assertIn("top allocations", report)
+
+    def test_note_run_without_session(self):
+        profiling.note_run({"cmd": "x"}, self.tmp.name)
+        self.assertIsNone(profiling.stop())
+
+    def test_runs_text_unknown_usage(self):
+        text = profiling.runs_text([{"cmd": "poetry lock", "duration": 0.5}])
+        self.assertIn("poetry lock", text.splitlines()[1])
+        self.assertIn("-", text.splitlines()[1])
+
+    @unittest.skipIf(sys.platform == "win32", "no resource module")
+    def test_context_switches(self):
+        result = asyncio.run(
+            run_command("echo hello", self.tmp.name, on_line=lambda *a: None)
+        )
+        self.assertGreaterEqual(result["nvcsw"], 0)
+        self.assertGreaterEqual(result["nivcsw"], 0)
+
+    def test_cli_profile(self):
+        result = self.invoke("--profile", self.report, "info", self.tmp.name)
+        self.assertEqual(result.exit_code, 0)
+        with open(self.report) as f:
+            self.assertIn("ppcheck profile", f.read())
+
+    def test_cli_profile_default_command(self):
+        result = self.invoke(
+            "--profile", self.report, "--workspace", self.tmp.name, "--no-banner"
+        )
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("example", result.stdout)
+        self.assertTrue(os.path.isfile(self.report))
+
+    def test_cli_profile_equals_form(self):
+        result = self.invoke("--profile={}".format(self.report), "info", self.tmp.name)
+        self.assertEqual(result.exit_code, 0, result.stderr)
+        self.assertTrue(os.path.isfile(self.report))
+        result = self.invoke(
+            "--profile={}".format(self.report),
+            "--workspace",
+            self.tmp.name,
+            "--no-banner",
+        )
+        self.assertEqual(result.exit_code, 0, result.stderr)
+        self.assertIn("example", result.stdout)
@@ -6,27 +6,40 @@ from unittest.mock import MagicMock, patch
 
 import pyperclip
 
-from app.libs.func import (attr_exists, cout, create_table, deps, execute_cmd,
-                           get_info, run_exec, run_scripts, short, tabs)
+from app.libs.func import (
+    attr_exists,
+    cout,
+    create_table,
+    deps,
+    execute_cmd,
+    get_info,
+    run_exec,
+    run_scripts,
+    short,
+    tabs,
+)
 
 
 class TestFunctions(unittest.TestCase):
 
-    @patch("app.libs.func.subprocess.run")
+    @patch("app.libs.stats.record_run")
+    @patch("app.libs.func.execute_cmd")
     @patch("app.libs.func.print_title")
-    def test_run_exec(self, mock_print_title, mock_subprocess_run):
+    def test_run_exec(self, mock_print_title, mock_execute_cmd, mock_record_run):
+        mock_execute_cmd.return_value = {
+            "cmd": "echo Hello World",
+            "returncode": 0,
+            "duration": 0.1,
+            "timed_out": False,
+        }
         cmd = "echo Hello World"
         exec_path = os.getcwd()
 
-        run_exec(cmd, exec_path)
+        result = run_exec(cmd, exec_path)
         mock_print_title.assert_called()
-        _dest = "" if platform.system() == "Windows" else " > /dev/null"
-        mock_subprocess_run.assert_called_with(
-            f"pushd {exec_path}{_dest} && {cmd} && popd{_dest}",
-            shell=True,
-            stderr=sys.stderr,
-            stdout=sys.stdout,
-        )
+        mock_execute_cmd.assert_called_with(exec_path, cmd, None, False)
+        mock_record_run.assert_called_once()
+        self.assertEqual(result["returncode"], 0)
 
     @patch("inquirer.prompt")
     @patch("pyperclip.copy")
@@ -93,18 +106,11 @@ class TestFunctions(unittest.TestCase):
                 cout("Test"), "\x1b[38;5;15mTest\x1b[0m"
             )  # Default is white
 
-    @patch("app.libs.func.subprocess.run")
-    def test_execute_cmd(self, mock_subprocess_run):
-        if str(platform.platform()).startswith("mac"):
-            exec_path = os.getcwd()
-            cmd = "echo Hello"
-            execute_cmd(exec_path, cmd)
-            mock_subprocess_run.assert_called_with(
-                f"pushd {exec_path} > /dev/null && {cmd} && popd > /dev/null",
-                shell=True,
-                stderr=sys.stderr,
-                stdout=sys.stdout,
-            )
+    @patch("app.libs.engine.print_line")
+    def test_execute_cmd(self, mock_print_line):
+        result = execute_cmd(os.getcwd(), "echo Hello")
+        self.assertEqual(result["returncode"], 0)
+        mock_print_line.assert_called_with("stdout", "Hello\n")
 
     def test_attr_exists(self):
         obj_dct = {"key1": {"key2": "value"}}
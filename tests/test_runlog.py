@@ -0,0 +1,103 @@
+import io
+import os
+import unittest
+from unittest.mock import patch
+
+from app.libs import runlog
+from app.libs.func import execute_cmd
+from app.libs.sched import run_dag
+from tests.helpers import TempDirTestCase
+
+
+def result(cmd="poetry run pytest", returncode=0):
+    return {"cmd": cmd, "returncode": returncode, "duration": 1.0, "timed_out": False}
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_keeps_the_last_bytes(self):
+        buffer = runlog.RingBuffer(max_bytes=12)
+        for i in range(5):
+            buffer.append("stdout", "line{}\n".format(i))
+        self.assertEqual(
+            list(buffer.lines), [("stdout", "line3\n"), ("stdout", "line4\n")]
+        )
+        self.assertEqual(buffer.dropped, 3)
+
+    def test_counts_utf8_bytes(self):
+        # 4 chars, but 7 bytes each
+        buffer = runlog.RingBuffer(max_bytes=16)
+        for line in ("äöü\n", "äöü\n", "äöü\n"):
+            buffer.append("stdout", line)
+        self.assertEqual(buffer.size, 14)
+        self.assertEqual(len(buffer.lines), 2)
+        self.assertEqual(buffer.dropped, 1)
+
+    def test_keeps_one_long_line(self):
+        buffer = runlog.RingBuffer(max_bytes=2)
+        buffer.append("stderr", "a long line\n")
+        self.assertEqual(len(buffer.lines), 1)
+
+    def test_tee(self):
+        seen = []
+        buffer = runlog.RingBuffer()
+        buffer.tee(lambda name, line: seen.append(line))("stdout", "x\n")
+        self.assertEqual(seen, ["x\n"])
+        self.assertEqual(list(buffer.lines), [("stdout", "x\n")])
+
+
+class TestRunLog(TempDirTestCase):
+
+    def save(self, lines, **kwargs):
+        buffer = runlog.RingBuffer()
+        for name, line in lines:
+            buffer.append(name, line)
+        return runlog.save_run(result(**kwargs), self.tmp.name, buffer)
+
+    def test_save_list_replay(self):
+        first = self.save([("stdout", "ok\n")])
+        second = self.save([("stdout", "out\n"), ("stderr", "err\n")], returncode=1)
+        runs = runlog.list_runs()
+        self.assertEqual([r["id"] for r in runs], [second, first])
+        self.assertEqual(runs[0]["returncode"], 1)
+        self.assertEqual(runlog.list_runs(limit=1)[0]["id"], second)
+        self.assertEqual(runlog.list_runs(cmd="poetry lock"), [])
+        out, err = io.StringIO(), io.StringIO()
+        meta = runlog.replay(runlog.find_run("last"), out, err)
+        self.assertEqual(meta["id"], second)
+        self.assertEqual((out.getvalue(), err.getvalue()), ("out\n", "err\n"))
+        self.assertEqual(runlog.find_run(first[:-2]), runlog.find_run(first))
+
+    def test_find_run_errors(self):
+        with self.assertRaises(ValueError):
+            runlog.find_run("last")
+        self.save([])
+        self.save([])
+        with self.assertRaises(ValueError):
+            runlog.find_run("2")
+
+    def test_nothing_captured(self):
+        self.assertIsNone(runlog.save_run(result(), self.tmp.name, None))
+
+    def test_evict_oldest(self):
+        ids = [self.save([("stdout", os.urandom(2000).hex() + "\n")]) for _ in range(3)]
+        sizes = [
+            os.path.getsize(os.path.join(runlog.log_dir(), i + runlog.LOG_SUFFIX))
+            for i in ids
+        ]
+        runlog.evict(sizes[1] + sizes[2])
+        self.assertEqual([r["id"] for r in runlog.list_runs()], ids[:0:-1])
+
+    def test_execute_cmd_captures(self):
+        with patch("app.libs.engine.print_line") as mock_print_line:
+            res = execute_cmd(self.tmp.name, "echo captured")
+        mock_print_line.assert_called_with("stdout", "captured\n")
+        self.assertEqual(list(res["output"].lines), [("stdout", "captured\n")])
+
+    @patch("app.libs.sched.record_run")
+    def test_run_dag_saves_log(self, mock_record_run):
+        results = run_dag(["echo dag"], self.tmp.name, out=io.StringIO())
+        self.assertNotIn("output", results[0])
+        out = io.StringIO()
+        runlog.replay(runlog.find_run(results[0]["log"]), out)
+        self.assertEqual(out.getvalue(), "dag\n")
@@ -0,0 +1,91 @@
+import os
+import sys
+from unittest.mock import patch
+
+from app.libs.cls import EPoetryCmds
+from app.libs.sched import build_dag, cmd_label, run_dag
+from app.libs.stats import read_history
+from tests.helpers import TempDirTestCase
+
+
+class TestSched(TempDirTestCase):
+
+    def test_build_dag_only_selected(self):
+        graph = build_dag(
+            [EPoetryCmds.PYTEST.value, EPoetryCmds.LOCK.value, EPoetryCmds.CONFIG.value]
+        )
+        self.assertEqual(
+            list(graph),
+            [
+                EPoetryCmds.LOCK.value,
+                EPoetryCmds.PYTEST.value,
+                EPoetryCmds.CONFIG.value,
+            ],
+        )
+        self.assertEqual(graph[EPoetryCmds.PYTEST.value], {EPoetryCmds.LOCK.value})
+        self.assertEqual(graph[EPoetryCmds.CONFIG.value], set())
+
+    def test_build_dag_interactive_is_exclusive(self):
+        graph = build_dag(
+            [EPoetryCmds.CONFIG.value, EPoetryCmds.INIT.value, EPoetryCmds.BLACK.value]
+        )
+        self.assertEqual(graph[EPoetryCmds.INIT.value], {EPoetryCmds.CONFIG.value})
+        self.assertIn(EPoetryCmds.INIT.value, graph[EPoetryCmds.BLACK.value])
+
+    def test_build_dag_scripts_wait_for_install(self):
+        graph = build_dag(["poetry lock", "poetry install", "poetry run hello"])
+        self.assertEqual(
+            graph["poetry run hello"],
+            {EPoetryCmds.LOCK.value, EPoetryCmds.INSTALL.value},
+        )
+        self.assertEqual(build_dag(["poetry run hello"]), {"poetry run hello": set()})
+
+    def test_cmd_label(self):
+        self.assertEqual(cmd_label(EPoetryCmds.SHOW_TREE.value), "show_tree")
+
+    @patch("app.libs.sched.run_prefixed")
+    def test_run_dag_skips_after_failure(self, mock_run):
+        mock_run.side_effect = lambda cmd, *args: {
+            "cmd": cmd,
+            "returncode": 1 if cmd == EPoetryCmds.LOCK.value else 0,
+            "duration": 0.0,
+            "timed_out": False,
+        }
+        results = run_dag(
+            [
+                EPoetryCmds.LOCK.value,
+                EPoetryCmds.INSTALL.value,
+                EPoetryCmds.CONFIG.value,
+            ],
+            os.getcwd(),
+            2,
+        )
+        by_cmd = {r["cmd"]: r for r in results}
+        self.assertEqual(by_cmd[EPoetryCmds.LOCK.value]["returncode"], 1)
+        self.assertTrue(by_cmd[EPoetryCmds.INSTALL.value]["skipped"])
+        self.assertEqual(by_cmd[EPoetryCmds.CONFIG.value]["returncode"], 0)
+
+    @patch("app.libs.sched.run_prefixed")
+    def test_cache_clear_runs_after_a_failed_lock(self, mock_run):
+        mock_run.side_effect = lambda cmd, *args: {
+            "cmd": cmd,
+            "returncode": 1 if cmd == EPoetryCmds.LOCK.value else 0,
+            "duration": 0.0,
+            "timed_out": False,
+        }
+        cmds = [EPoetryCmds.LOCK.value, EPoetryCmds.CACHE.value]
+        self.assertEqual(build_dag(cmds)[EPoetryCmds.CACHE.value], {cmds[0]})
+        by_cmd = {r["cmd"]: r for r in run_dag(cmds, os.getcwd(), 2)}
+        self.assertFalse(by_cmd[EPoetryCmds.CACHE.value]["skipped"])
+        self.assertEqual(by_cmd[EPoetryCmds.CACHE.value]["returncode"], 0)
+
+    def test_run_dag_real_commands(self):
+        cmds = ['{} -c "print(1)"'.format(sys.executable)] * 1 + ["exit 3"]
+        results = run_dag(cmds, os.getcwd(), 2)
+        self.assertEqual(sorted(r["returncode"] for r in results), [0, 3])
+
+    def test_run_dag_records_history(self):
+        run_dag(["exit 0"], os.getcwd(), 1)
+        records = read_history()
+        self.assertEqual(records[-1]["cmd"], "exit 0")
+        self.assertEqual(records[-1]["project"], os.getcwd())
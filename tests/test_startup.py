@@ -0,0 +1,27 @@
+import subprocess
+import sys
+import unittest
+
+from app.ppcheck import BANNER, check
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_no_heavy_imports_on_startup(self):
+        code = (
+            "import sys, app.ppcheck;"
+            "print(','.join(m for m in ('inquirer', 'tomli', 'pyfiglet', 'jmespath',"
+            " 'pyperclip', 'colored', 'terminaltables') if m in sys.modules))"
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        self.assertEqual(proc.stdout.strip(), "")
+
+    def test_banner_matches_figlet(self):
+        from pyfiglet import Figlet
+
+        self.assertEqual(BANNER, Figlet(font="small").renderText("PPCHECK"))
+
+    def test_no_banner_option(self):
+        self.assertIn("--no-banner", [o for p in check.params for o in p.opts])
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.libs.stats import (
+    cmd_label,
+    percentile,
+    read_history,
+    record_run,
+    regressions,
+    stats_table,
+    summarize,
+)
+
+
+def run(cmd, duration, project="/p", returncode=0):
+    return {
+        "cmd": cmd,
+        "project": project,
+        "duration": duration,
+        "returncode": returncode,
+    }
+
+
+class TestStats(unittest.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_record_and_read(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.dict(os.environ, {"PPCHECK_DATA_DIR": tmp}):
+                record_run(
+                    {
+                        "cmd": "poetry lock",
+                        "returncode": 0,
+                        "duration": 1.5,
+                        "utime": 0.2,
+                    },
+                    tmp,
+                )
+                record_run({"cmd": "poetry lock", "returncode": 1, "duration": 2}, tmp)
+                records = read_history()
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["utime"], 0.2)
+        self.assertIsNone(records[1]["peak_rss_kb"])
+
+    def test_summarize(self):
+        records = [run("a", 1), run("a", 3, returncode=1), run("b", 2)]
+        summary = summarize(records, "cmd")
+        self.assertEqual(summary["a"]["runs"], 2)
+        self.assertEqual(summary["a"]["failed"], 1)
+        self.assertEqual(summary["a"]["max"], 3)
+        self.assertIsNone(summary["a"]["peak_rss_kb"])
+        self.assertIn("p95", stats_table(summary, "command"))
+
+    def test_peak_rss(self):
+        records = [
+            dict(run("a", 1), peak_rss_kb=2048),
+            dict(run("a", 1), peak_rss_kb=None),
+            # older records
+            dict(run("a", 1), maxrss_kb=4096),
+        ]
+        summary = summarize(records, "cmd")
+        self.assertEqual(summary["a"]["peak_rss_kb"], 4096)
+        self.assertIn("4.0 MiB", stats_table(summary, "command"))
+
+    def test_summarize_venv_runs_apart(self):
+        records = [
+            run("poetry run pytest", 3),
+            dict(run("poetry run pytest", 1), via="venv"),
+        ]
+        summary = summarize(records, cmd_label)
+        self.assertEqual(
+            sorted(summary), ["poetry run pytest", "poetry run pytest (venv)"]
+        )
+
+    def test_regressions(self):
+        records = [run("poetry install", 1.0) for _ in range(3)]
+        self.assertEqual(regressions(records + [run("poetry install", 2.0)]), [])
+        found = regressions(records + [run("poetry install", 3.5)])
+        self.assertEqual(found[0]["cmd"], "poetry install")
+        self.assertAlmostEqual(found[0]["factor"], 3.5)
+
+    def test_regressions_need_history(self):
+        self.assertEqual(regressions([run("a", 1), run("a", 10)]), [])
@@ -0,0 +1,82 @@
+import unittest
+
+from app.libs.func import cout, get_info, set_color
+from app.libs.table import dep_rows, deps_table, fit, page, stream_table, visible_len
+
+PP_DICT = {
+    "tool": {
+        "poetry": {
+            "dependencies": {"python": "^3.10", "click": {"version": "8.1.7"}},
+            "group": {"dev": {"dependencies": {"pytest": "8.2.2", "black": "*"}}},
+        }
+    }
+}
+
+
+class TestTable(unittest.TestCase):
+
+    def tearDown(self):
+        set_color(True)
+
+    def test_visible_len_ignores_colors(self):
+        self.assertEqual(visible_len(cout("abc", "red")), 3)
+
+    def test_fit(self):
+        self.assertEqual(fit("abc", 5), "abc  ")
+        self.assertEqual(fit("abcdefgh", 6), "abc...")
+        self.assertEqual(visible_len(fit(cout("abc", "red"), 5)), 5)
+
+    def test_stream_table_is_lazy(self):
+        consumed = []
+
+        def rows():
+            for i in range(10):
+                consumed.append(i)
+                yield [str(i), "x"]
+
+        lines = stream_table(rows(), ["a", "b"], sample=2)
+        self.assertEqual(next(lines), "+---+---+")
+        self.assertEqual(consumed, [0, 1])
+        self.assertEqual(len(list(lines)), 2 + 10 + 1)
+
+    def test_stream_table_caps_width(self):
+        lines = list(stream_table([["x" * 100]], ["a"], max_width=10))
+        self.assertEqual(len(lines[0]), 14)
+
+    def test_page(self):
+        self.assertEqual(list(page(iter(range(10)), 2, 3)), [3, 4, 5])
+        self.assertEqual(list(page(iter(range(3)), 0, 2)), [0, 1, 2])
+
+    def test_dep_rows_filter(self):
+        set_color(False)
+        self.assertEqual(
+            list(dep_rows(PP_DICT, group="main")),
+            [["main", "python", "^3.10"], ["main", "click", "version=8.1.7"]],
+        )
+        self.assertEqual([r[1] for r in dep_rows(PP_DICT, name="ES")], ["pytest"])
+
+    def test_deps_table(self):
+        set_color(False)
+        table = "\n".join(deps_table(PP_DICT, group="dev"))
+        self.assertIn("| dev   | black  | *          |", table)
+
+    def test_no_color(self):
+        set_color(False)
+        self.assertEqual(cout("Test", "red"), "Test")
+
+    def test_get_info_summarizes_large_projects(self):
+        pp_dict = {
+            "tool": {
+                "poetry": {
+                    "name": "example",
+                    "version": "0.1.0",
+                    "description": "",
+                    "authors": [],
+                    "packages": [],
+                    "dependencies": {"dep%s" % i: "*" for i in range(500)},
+                }
+            }
+        }
+        info = get_info(pp_dict)
+        self.assertIn("500 deps", info)
+        self.assertNotIn("dep499", info)
@@ -0,0 +1,79 @@
+import unittest
+
+from app.libs.func import set_color
+from app.libs.tree import (
+    TreeRenderer,
+    dependency_tree,
+    reverse_graph,
+    root_packages,
+    why_tree,
+)
+
+
+def package(name, version, dependencies=()):
+    return {"name": name, "version": version, "dependencies": list(dependencies)}
+
+
+LOCK_INDEX = {
+    "packages": {
+        "a": package("a", "1.0", ["b", "c"]),
+        "b": package("b", "2.0", ["c"]),
+        "c": package("c", "3.0", ["a"]),
+        "d": package("d", "4.0", ["c"]),
+    }
+}
+PP_DICT = {
+    "tool": {
+        "poetry": {
+            "dependencies": {"python": "^3.10", "A": "*"},
+            "group": {"dev": {"dependencies": {"d": "*"}}},
+        }
+    }
+}
+
+
+class TestTree(unittest.TestCase):
+
+    def setUp(self):
+        set_color(False)
+
+    def tearDown(self):
+        set_color(True)
+
+    def test_root_packages(self):
+        self.assertEqual(root_packages(PP_DICT), ["a", "d"])
+
+    def test_dependency_tree_marks_cycles(self):
+        self.assertEqual(
+            dependency_tree(PP_DICT, LOCK_INDEX, package="a").splitlines(),
+            [
+                "a 1.0",
+                "├── b 2.0",
+                "│   └── c 3.0",
+                "│       └── a 1.0 (circular)",
+                "└── c 3.0",
+                "    └── a 1.0 (circular)",
+            ],
+        )
+
+    def test_depth_limit(self):
+        self.assertEqual(
+            dependency_tree(PP_DICT, LOCK_INDEX, 1, "d").splitlines(),
+            ["d 4.0", "└── c 3.0 ..."],
+        )
+
+    def test_memoized_subtrees(self):
+        graph = {"r": ["x", "y"], "x": ["s"], "y": ["s"], "s": ["t"], "t": []}
+        calls = []
+        renderer = TreeRenderer(graph, lambda n: calls.append(n) or n)
+        lines = renderer.render("r")
+        self.assertEqual(lines.count("│   └── s"), 1)
+        self.assertEqual(calls.count("t"), 1)
+
+    def test_reverse_graph(self):
+        self.assertEqual(reverse_graph({"a": ["b"], "b": []}), {"a": [], "b": ["a"]})
+
+    def test_why_tree(self):
+        lines = why_tree(PP_DICT, LOCK_INDEX, "b").splitlines()
+        self.assertEqual(lines[0], "b 2.0")
+        self.assertEqual(lines[1], "└── a 1.0 (direct dependency)")
@@ -0,0 +1,76 @@
+import os
+import time
+from unittest.mock import patch
+
+from app.libs import uptodate
+from app.libs.cls import EPoetryCmds
+from app.libs.func import run_exec
+from app.libs.sched import run_dag
+from tests.helpers import TempDirTestCase, make_venv, write_file
+
+LOCK = EPoetryCmds.LOCK.value
+INSTALL = EPoetryCmds.INSTALL.value
+
+
+def ok(cmd, *args):
+    return {"cmd": cmd, "returncode": 0, "duration": 0.1, "timed_out": False}
+
+
+class TestUpToDate(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.path("project")
+        self.write("pyproject.toml", "[tool.poetry]\nname = 'x'\n")
+        self.write("poetry.lock", "# lock\n")
+        self.venv = os.path.join(self.project, ".venv")
+        make_venv(self.venv)
+        self.site = os.path.join(self.venv, "lib", "python3.11", "site-packages")
+        os.makedirs(self.site)
+
+    def write(self, name, content):
+        write_file(os.path.join(self.project, name), content)
+
+    def test_lock_fingerprint(self):
+        self.assertFalse(uptodate.is_up_to_date(LOCK, self.project))
+        uptodate.after_run(ok(LOCK), self.project)
+        self.assertTrue(uptodate.is_up_to_date(LOCK, self.project))
+        self.write("pyproject.toml", "[tool.poetry]\nname = 'y'\n")
+        self.assertFalse(uptodate.is_up_to_date(LOCK, self.project))
+
+    def test_failed_run_forgets(self):
+        uptodate.after_run(ok(LOCK), self.project)
+        uptodate.after_run(dict(ok(LOCK), returncode=1), self.project)
+        self.assertFalse(uptodate.is_up_to_date(LOCK, self.project))
+
+    def test_install_depends_on_venv(self):
+        uptodate.after_run(ok(INSTALL), self.project)
+        self.assertTrue(uptodate.is_up_to_date(INSTALL, self.project))
+        later = time.time() + 10
+        os.utime(self.site, (later, later))
+        self.assertFalse(uptodate.is_up_to_date(INSTALL, self.project))
+
+    def test_other_cmds_never_skipped(self):
+        uptodate.after_run(ok(EPoetryCmds.PYTEST.value), self.project)
+        self.assertFalse(uptodate.is_up_to_date(EPoetryCmds.PYTEST.value, self.project))
+
+    @patch("app.libs.stats.record_run")
+    @patch("app.libs.func.execute_cmd", side_effect=lambda path, cmd, *a: ok(cmd))
+    @patch("builtins.print")
+    def test_run_exec_skips_unless_forced(self, mock_print, mock_execute, mock_record):
+        run_exec(LOCK, self.project)
+        result = run_exec(LOCK, self.project)
+        self.assertTrue(result["up_to_date"])
+        self.assertEqual(mock_execute.call_count, 1)
+        run_exec(LOCK, self.project, force=True)
+        self.assertEqual(mock_execute.call_count, 2)
+
+    @patch("app.libs.sched.run_prefixed")
+    def test_run_dag_skips_up_to_date(self, mock_run):
+        mock_run.side_effect = ok
+        run_dag([LOCK, INSTALL], self.project)
+        results = run_dag([LOCK, INSTALL], self.project)
+        self.assertEqual(mock_run.call_count, 2)
+        self.assertTrue(all(r["up_to_date"] for r in results))
+        run_dag([LOCK, INSTALL], self.project, force=True)
+        self.assertEqual(mock_run.call_count, 4)
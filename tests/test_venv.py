@@ -0,0 +1,78 @@
+import os
+from unittest.mock import patch
+
+from app.libs import venv
+from app.libs.func import execute_cmd
+from tests.helpers import TempDirTestCase, make_venv, write_file
+
+
+class TestVenv(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.path("project")
+        write_file(
+            os.path.join(self.project, "pyproject.toml"), "[tool.poetry]\nname = 'x'\n"
+        )
+        os.environ.pop("PPCHECK_POETRY_RUN", None)
+
+    def test_in_project_venv(self):
+        local = os.path.join(self.project, ".venv")
+        make_venv(local)
+        cmd, env, via = venv.direct_cmd("poetry run tool --x", self.project)
+        self.assertEqual(via, "venv")
+        self.assertEqual(cmd, [os.path.join(venv.bin_dir(local), "tool"), "--x"])
+        self.assertEqual(env["VIRTUAL_ENV"], local)
+
+    def test_fallback_to_poetry_run(self):
+        make_venv(os.path.join(self.project, ".venv"))
+        for cmd in ("poetry run missing", "poetry lock", "echo hi"):
+            self.assertEqual(venv.direct_cmd(cmd, self.project), (cmd, None, "poetry"))
+        with patch.dict(os.environ, {"PPCHECK_POETRY_RUN": "1"}):
+            self.assertEqual(
+                venv.direct_cmd("poetry run tool", self.project)[2], "poetry"
+            )
+
+    @patch("app.libs.venv._poetry_env_path")
+    def test_poetry_env_is_cached_until_lock_changes(self, mock_env):
+        external = os.path.join(self.tmp.name, "external")
+        make_venv(external)
+        mock_env.return_value = external
+        self.assertEqual(venv.resolve_venv(self.project), external)
+        self.assertEqual(venv.resolve_venv(self.project), external)
+        self.assertEqual(mock_env.call_count, 1)
+        write_file(os.path.join(self.project, "poetry.lock"), "# lock\n")
+        venv.resolve_venv(self.project)
+        self.assertEqual(mock_env.call_count, 2)
+
+    @patch("app.libs.venv._poetry_env_path", return_value=None)
+    def test_unresolved(self, mock_env):
+        self.assertEqual(venv.direct_cmd("poetry run tool", self.project)[2], "poetry")
+        # a project without venv asks poetry only once
+        self.assertEqual(venv.direct_cmd("poetry run tool", self.project)[2], "poetry")
+        self.assertEqual(mock_env.call_count, 1)
+        venv.forget_missing_venv(self.project)
+        venv.resolve_venv(self.project)
+        self.assertEqual(mock_env.call_count, 2)
+
+    def test_argv_with_spaces(self):
+        project = os.path.join(self.tmp.name, "with space")
+        make_venv(os.path.join(project, ".venv"))
+        cmd, _, via = venv.direct_cmd('poetry run tool "a b" c', project)
+        self.assertEqual(via, "venv")
+        self.assertEqual(cmd[1:], ["a b", "c"])
+        result = execute_cmd(project, 'poetry run tool "a b"')
+        self.assertEqual(result["returncode"], 0)
+        cmd, _, _ = venv.direct_cmd("poetry run tool a | cat", project)
+        self.assertIsInstance(cmd, str)
+        self.assertTrue(cmd.endswith(" a | cat"))
+
+    @patch("app.libs.engine.print_line")
+    def test_execute_cmd_reports_via(self, mock_print_line):
+        local = os.path.join(self.project, ".venv")
+        make_venv(local)
+        result = execute_cmd(self.project, "poetry run tool a")
+        self.assertEqual(result["via"], "venv")
+        self.assertEqual(result["cmd"], "poetry run tool a")
+        self.assertEqual(result["returncode"], 0)
+        mock_print_line.assert_called_with("stdout", local + " a\n")
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from app.libs import watch
+from tests.helpers import TempDirTestCase, write_file
+
+
+async def _changes_after_write(watcher, root, path):
+    async def write():
+        await asyncio.sleep(0.05)
+        with open(path, "w") as f:
+            f.write("x = 1\n")
+
+    asyncio.get_running_loop().create_task(write())
+    return await asyncio.wait_for(watch.next_changes(watcher, root, 0.05), 5)
+
+
+class TestWatch(TempDirTestCase):
+
+    # below .venv, which is not watched
+    CACHE_DIR = os.path.join(".venv", "cache")
+    DATA_DIR = os.path.join(".venv", "data")
+
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, "pkg"))
+        os.makedirs(os.path.join(self.root, ".venv"))
+
+    def test_relevant(self):
+        self.assertTrue(
+            watch.relevant(os.path.join(self.root, "pkg", "a.py"), self.root)
+        )
+        self.assertFalse(
+            watch.relevant(os.path.join(self.root, "pkg", "a.pyc"), self.root)
+        )
+        self.assertFalse(
+            watch.relevant(os.path.join(self.root, ".venv", "x.py"), self.root)
+        )
+        self.assertFalse(watch.relevant(os.path.join(self.root, "a.py~"), self.root))
+
+    def test_polling_watcher(self):
+        async def main():
+            watcher = watch.PollingWatcher(self.root, interval=0.02)
+            path = os.path.join(self.root, "pkg", "a.py")
+            return path, await _changes_after_write(watcher, self.root, path)
+
+        path, changed = asyncio.run(main())
+        self.assertEqual(changed, {path})
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is linux only")
+    def test_inotify_watcher(self):
+        async def main():
+            watcher = watch.InotifyWatcher(self.root)
+            try:
+                path = os.path.join(self.root, "pkg", "a.py")
+                first = await _changes_after_write(watcher, self.root, path)
+                # new directories are watched too
+                os.makedirs(os.path.join(self.root, "new"))
+                await asyncio.sleep(0.05)
+                nested = os.path.join(self.root, "new", "b.py")
+                second = await _changes_after_write(watcher, self.root, nested)
+                ignored = os.path.join(self.root, ".venv", "c.py")
+                with open(ignored, "w") as f:
+                    f.write("")
+                await watcher.flush()
+                return path, first, nested, second
+            finally:
+                watcher.close()
+
+        path, first, nested, second = asyncio.run(main())
+        self.assertEqual(first, {path})
+        self.assertEqual(second, {nested})
+
+    def test_newer_changes_cancel_the_run(self):
+        write_file(self.path("pyproject.toml"), "[tool.poetry]\nname = 'x'\n")
+        runs = []
+        cancelled = []
+
+        async def fake_dag(cmds, exec_path, workers=None, timeout=None):
+            runs.append(cmds)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(cmds)
+                raise
+            return []
+
+        async def main():
+            task = asyncio.create_task(
+                watch.watch_async(self.root, "pytest", debounce=0.05, polling=True)
+            )
+            await asyncio.sleep(0.1)
+            with open(os.path.join(self.root, "pkg", "a.py"), "w") as f:
+                f.write("")
+            for _ in range(100):
+                if len(runs) == 2:
+                    break
+                await asyncio.sleep(0.05)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        with patch("app.libs.sched.run_dag_async", fake_dag), patch("builtins.print"):
+            asyncio.run(main())
+        self.assertEqual(runs, [["poetry run pytest"]] * 2)
+        self.assertEqual(len(cancelled), 2)
+
+    def watch(self, names, fake_dag, until, seconds=5):
+        async def main():
+            task = asyncio.create_task(
+                watch.watch_async(self.root, names, debounce=0.05, polling=True)
+            )
+            for _ in range(int(seconds / 0.05)):
+                if until():
+                    break
+                await asyncio.sleep(0.05)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        with patch("app.libs.sched.run_dag_async", fake_dag), patch(
+            "builtins.print"
+        ) as out:
+            asyncio.run(main())
+        return [" ".join(map(str, c.args)) for c in out.call_args_list]
+
+    def test_changes_during_a_writing_run_run_it_again(self):
+        write_file(self.path("pyproject.toml"), "[tool.poetry]\nname = 'x'\n")
+        runs = []
+
+        async def fake_dag(cmds, exec_path, workers=None, timeout=None):
+            runs.append(cmds)
+            with open(os.path.join(self.root, "poetry.lock"), "w") as f:
+                f.write(str(len(runs)))
+            if len(runs) == 1:
+                # a user edit while the lock runs
+                await asyncio.sleep(0.1)
+                with open(os.path.join(self.root, "pkg", "a.py"), "w") as f:
+                    f.write("")
+                await asyncio.sleep(1.2)
+            return []
+
+        self.watch("lock", fake_dag, lambda: False, seconds=3)
+        # the own writes to poetry.lock never trigger a run
+        self.assertEqual(runs, [["poetry lock"]] * 2)
+
+    def test_run_errors_are_printed(self):
+        write_file(self.path("pyproject.toml"), "[tool.poetry]\nname = 'x'\n")
+        runs = []
+
+        async def fake_dag(cmds, exec_path, workers=None, timeout=None):
+            runs.append(cmds)
+            raise RuntimeError("boom")
+
+        printed = self.watch("pytest", fake_dag, lambda: False, seconds=0.5)
+        self.assertIn("run failed: boom", printed[-1])
@@ -0,0 +1,82 @@
+import os
+
+from app.libs.workspace import (
+    find_projects,
+    project_summary,
+    summarize_projects,
+    workspace_table,
+)
+from tests.helpers import TempDirTestCase, write_file
+
+PYPROJECT = """
+[tool.poetry]
+name = "{name}"
+version = "0.1.0"
+
+[tool.poetry.scripts]
+run = "app:main"
+
+[tool.poetry.dependencies]
+python = "^3.10"
+click = "8.1.7"
+
+[tool.poetry.group.dev.dependencies]
+pytest = "8.2.2"
+"""
+
+
+class TestWorkspace(TempDirTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        for rel in ("a", "b/c", ".venv/x", "node_modules/y"):
+            self.project(rel, PYPROJECT.format(name=os.path.basename(rel)))
+        self.project("broken", "[tool.poetry\n")
+        self.project("other", "[project]\nname = 'other'\n")
+
+    def project(self, rel, content):
+        write_file(os.path.join(self.root, rel, "pyproject.toml"), content)
+
+    def test_find_projects_prunes(self):
+        found = [os.path.relpath(p, self.root) for p in find_projects(self.root)]
+        self.assertEqual(found, ["a", os.path.join("b", "c"), "broken", "other"])
+
+    def test_project_summary(self):
+        summary = project_summary(os.path.join(self.root, "a"))
+        self.assertEqual(summary["name"], "a")
+        self.assertEqual(summary["scripts"], 1)
+        self.assertEqual(summary["dependencies"], 2)
+        self.assertEqual(summary["dev_dependencies"], 1)
+        self.assertEqual(summary["lock"], "missing")
+        self.assertIsNone(summary["error"])
+
+    def test_project_summary_lock(self):
+        from app.libs.cache import parse_pyproject
+        from app.libs.lock import content_hash
+
+        path = os.path.join(self.root, "a")
+        pp_dict = parse_pyproject(os.path.join(path, "pyproject.toml"))
+        lock = os.path.join(path, "poetry.lock")
+        write_file(
+            lock, '[metadata]\ncontent-hash = "{}"\n'.format(content_hash(pp_dict))
+        )
+        self.assertEqual(project_summary(path)["lock"], "fresh")
+        write_file(lock, '[metadata]\ncontent-hash = "0000"\n')
+        self.assertEqual(project_summary(path)["lock"], "stale")
+
+    def test_project_summary_broken(self):
+        self.assertIsNotNone(
+            project_summary(os.path.join(self.root, "broken"))["error"]
+        )
+
+    def test_summarize_keeps_order(self):
+        paths = find_projects(self.root) * 4
+        summaries = summarize_projects(paths, workers=2)
+        self.assertEqual([s["path"] for s in summaries], paths)
+
+    def test_workspace_table(self):
+        table = workspace_table(summarize_projects(find_projects(self.root)), self.root)
+        self.assertIn("dev-deps", table)
+        self.assertIn("broken", table)
+        self.assertNotIn("other", table)